@@ -0,0 +1,101 @@
+"""
+Configuration des bancs de performance (pytest-benchmark) du pipeline route.
+
+Un CSV au format du Raspberry Pi (`timestamp,inch`, une mesure toutes les
+10 s) est généré pour `ROUTE_BENCH_MONTHS` mois (3 par défaut) : cycle
+journalier, dérive lente, bruit et quantification au 0.0005 inch (paliers).
+Une configuration temporaire, indépendante de config.yaml (store, caches et
+index qualité dans un dossier temporaire), est chargée avant tout import d'un
+module de data_route (les modules ne sont importés que dans les fixtures) : ce
+dossier se lance seul, les bancs sont ignorés si tests/ a déjà chargé sa
+propre configuration.
+"""
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+import yaml
+
+ROOT = Path(__file__).resolve().parents[1]
+for path in (ROOT, ROOT / "data_route"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+MONTHS = float(os.environ.get("ROUTE_BENCH_MONTHS", 3))
+WARM = os.environ.get("ROUTE_BENCH_WARM", "") == "1"     # caches conservés entre les tours
+ROUNDS = int(os.environ.get("ROUTE_BENCH_ROUNDS", 3))
+
+
+# ---------------------------------------------------------- données synthétiques
+def generate_measurements(path: Path, months: float, step_s: float = 10.0, seed: int = 0,
+                          start: str = "2025-03-01") -> int:
+    """
+    Écrit dans `path` un CSV synthétique du comparateur et renvoie son nombre
+    de lignes : cycle journalier (max vers 15 h, min vers 3 h), dérive lente,
+    bruit gaussien, quantification au pas du comparateur (paliers) et gigue
+    d'horodatage inférieure à la seconde. La gigue s'ajoute à chaque intervalle
+    (horodatages croissants, écarts ≥ `step_s`) : le filtre d'intervalle minimal
+    du chargeur (10 s) conserve toutes les lignes générées.
+    """
+    rng = np.random.default_rng(seed)
+    n = int(months * 30 * 86400 / (step_s + 0.45))  # écart moyen : step_s + 0,45 s de gigue
+    # Écarts en microsecondes entières : pas d'arrondi sous `step_s` après cumul
+    gaps_us = np.round((step_s + rng.uniform(0, 0.9, n)) * 1e6).astype(np.int64)
+    offsets_us = np.cumsum(gaps_us) - gaps_us[0]
+    ts = np.datetime64(start, "us") + offsets_us.astype("timedelta64[us]")
+    seconds = offsets_us / 1e6
+    hours = (seconds / 3600) % 24
+    inch = (0.5
+            + 0.02 * np.sin(2 * np.pi * (hours - 9) / 24)
+            + 0.002 * seconds / (30 * 86400)
+            + rng.normal(0, 0.0002, n))
+    inch = np.round(np.round(inch / 0.0005) * 0.0005, 4)
+    pd.DataFrame({"timestamp": np.datetime_as_string(ts, unit="us"), "inch": inch}).to_csv(
+        path, header=False, index=False)
+    return n
+
+
+def write_config(workdir: Path, csv_path: Path, warm: bool) -> Path:
+    """Configuration temporaire (store, caches et index qualité dans `workdir`)."""
+    config = {
+        "ssh": {"host": "localhost", "port": 22, "user": "bench", "password": ""},
+        "paths": {
+            "local_csv": str(csv_path),
+            "remote_csv": "/dev/null",
+            "local_backup_dir": str(workdir / "backups"),
+            "store_dir": str(workdir / "store"),
+            "cache_dir": str(workdir / "cache"),
+        },
+        "store": {"enabled": True},
+        "cache": {"enabled": warm},
+        "analysis": {"min_interval_seconds": 10, "window_half_width": 3.0},
+        "logging": {"level": "WARNING", "file": str(workdir / "bench.log")},
+    }
+    path = workdir / "config.yaml"
+    with path.open("w", encoding="utf-8") as f:
+        yaml.safe_dump(config, f)
+    return path
+
+
+@pytest.fixture(scope="session")
+def bench_ctx(tmp_path_factory):
+    """
+    Configuration temporaire chargée puis mesures synthétiques générées ;
+    contexte partagé des étapes (configuration, bornes des données).
+    """
+    if MONTHS * 30 < 14:
+        pytest.skip("ROUTE_BENCH_MONTHS : au moins 14 jours de données (ajustement des lois sur ≥ 10 jours)")
+    workdir = tmp_path_factory.mktemp("bench_route")
+    csv_path = workdir / "measurements.csv"
+    import config
+    cfg = config.load_config(write_config(workdir, csv_path, WARM))
+    if cfg["paths"]["local_csv"] != str(csv_path):
+        pytest.skip("configuration déjà chargée (tests/ collecté avec benchmarks/) : lancer benchmarks/ seul")
+    rows = generate_measurements(csv_path, MONTHS)
+    first_day = pd.read_csv(csv_path, header=None, usecols=[0], nrows=1)[0].str[:10].iloc[0]
+    last_day = (pd.Timestamp(first_day) + pd.Timedelta(days=int(MONTHS * 30))).strftime("%Y-%m-%d")
+    return {"cfg": cfg, "rows": rows, "first_day": first_day, "last_day": last_day,
+            "warm": WARM, "rounds": ROUNDS}
@@ -0,0 +1,203 @@
+"""
+Bancs des étapes du pipeline route (pytest-benchmark), regroupés par famille :
+ingestion, chargement, statistiques, figures. Chaque étape est chronométrée
+à froid (caches en mémoire vidés avant chaque tour, caches disque désactivés ;
+`ROUTE_BENCH_WARM=1` les conserve) sur `ROUTE_BENCH_ROUNDS` tours.
+
+    pytest benchmarks --benchmark-autosave
+    pytest benchmarks --benchmark-compare --benchmark-compare-fail=min:25%
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+COLORS = {'min': 'blue', 'max': 'red', 'mean': 'green', 'median': 'orange'}
+
+
+def build_cases(ctx):
+    """
+    Étapes par nom, dans l'ordre du pipeline (celui de STAGES) ; chacune range
+    son résultat dans `ctx` pour les suivantes. Les modules sont importés ici,
+    après le chargement de la configuration des bancs.
+    """
+    import shutil
+    import store
+    import quality
+    from data_loader import load_data
+    from aggregation import (HalfHourCube, aggregate_by_half_hour, extract_extremes,
+                             calculate_daily_stats, calculate_confidence_intervals)
+    from time_calculator import compute_daily_extrema_timestamps
+    from stats_calculator import (compute_extremes_stats, compute_parametric_ci, get_primary_peak_hours,
+                                  fit_distributions_hours, compute_value_extremes_stats,
+                                  compute_value_clusters, compute_value_cluster_stats)
+    import figures as fg
+
+    cfg = ctx["cfg"]
+    first, last = ctx["first_day"], ctx["last_day"]
+
+    def ingest():
+        shutil.rmtree(store.default_store_dir(), ignore_errors=True)
+        quality.index_path().unlink(missing_ok=True)
+        quality.update_exclusions()
+        return store.update_store()
+
+    def load(mode):
+        def run():
+            cfg["store"]["enabled"] = mode == "store"
+            ctx["df"] = load_data(first, last)
+            return ctx["df"]
+        return run
+
+    def daily():
+        ds, ctx["gmin"], ctx["gmax"] = calculate_daily_stats(ctx["df"])
+        ctx["daily"] = calculate_confidence_intervals(ctx["df"], ds)
+        return ctx["daily"]
+
+    def extrema():
+        ctx["extrema"] = compute_daily_extrema_timestamps(ctx["df"])
+        return ctx["extrema"]
+
+    def half_hour():
+        cube = HalfHourCube.from_frame(ctx["df"])
+        mean, med, ctx["jour_moyen"], ctx["jour_median"] = aggregate_by_half_hour(ctx["df"], cube)
+        ctx["extremes"] = extract_extremes(mean, med)
+        return mean
+
+    def extremes_stats():
+        ctx["ext_stats"] = compute_extremes_stats(ctx["df"])
+        return ctx["ext_stats"]
+
+    def laws():
+        # Heures des extrêmes reprises de l'étape précédente (calculate_central_times
+        # recalculerait les extrêmes journaliers, caches vidés)
+        ext = ctx["extrema"]
+        for lab in ("max", "min"):
+            t = ext[f"time_{lab}"].dt
+            ctx[f"{lab}_times"] = (t.hour + t.minute / 60 + t.second / 3600).to_numpy(dtype=float)
+        for lab in ("max", "min"):
+            cluster = get_primary_peak_hours(ctx[f"{lab}_times"], window_half_width=3.0)
+            law, params = fit_distributions_hours(cluster)
+            ctx[f"law_{lab}"], ctx[f"params_{lab}"] = law, params
+            ctx[f"ci_{lab}"] = compute_parametric_ci(law, params)
+        ctx["val_ext"] = compute_value_extremes_stats(ctx["daily"])
+        ctx["val_clusters"] = compute_value_clusters(ctx["daily"], window_half_width=0.1)
+        ctx["val_cluster_stats"] = compute_value_cluster_stats(ctx["daily"], window_half_width=0.1)
+        return ctx["max_times"]
+
+    def fig_jour():
+        ci_max, ci_min = ctx["ci_max"], ctx["ci_min"]
+        return fg.create_fig_jour(
+            ctx["jour_moyen"], "Jour moyen",
+            ctx["extremes"]["max_half_mean"], ctx["extremes"]["min_half_mean"],
+            "", "", ci_max["mode"], (ci_max["hi"] - ci_max["lo"]) / 2,
+            ci_min["mode"], (ci_min["hi"] - ci_min["lo"]) / 2,
+            COLORS, format_half_hour_func=lambda hh: None,
+        )
+
+    def fig_forecast():
+        df = ctx["df"]
+        ds = pd.date_range(df["timestamp"].max().ceil("h"), periods=7 * 24, freq="h")
+        yhat = np.full(len(ds), df["inch"].iloc[-1])
+        forecast = pd.DataFrame({"ds": ds, "yhat": yhat, "yhat_lower": yhat - 0.01, "yhat_upper": yhat + 0.01})
+        return fg.create_fig_forecast(df, forecast, horizon_days=7)
+
+    def step():
+        binned = ctx["df"].assign(inch_bin=(ctx["df"]["inch"] // 0.01) * 0.01)
+        return fg.create_fig_value_step(binned.groupby("inch_bin")["hour"].mean().reset_index(),
+                                        "Heure moyenne vs Valeur", color=COLORS["mean"])
+
+    daily_max = lambda: ctx["daily"]["max"].values
+    daily_min = lambda: ctx["daily"]["min"].values
+    return {
+        "store_et_qualite": ingest,
+        "load_data_csv": load("csv"),
+        "load_data_store": load("store"),
+        "calculate_daily_stats": daily,
+        "compute_daily_extrema_timestamps": extrema,
+        "aggregate_by_half_hour": half_hour,
+        "compute_extremes_stats": extremes_stats,
+        "lois_et_clusters": laws,
+        "create_fig_main": lambda: fg.create_fig_main(ctx["df"], ctx["daily"], ctx["gmin"], ctx["gmax"], COLORS),
+        "create_fig_values": lambda: fg.create_fig_values(ctx["extrema"], 25, COLORS),
+        "create_fig_hours": lambda: fg.create_fig_hours(ctx["min_times"], ctx["max_times"], 24),
+        "create_fig_jour": fig_jour,
+        "create_fig_hours_law_comparison": lambda: fg.create_fig_hours_law_comparison(
+            ctx["max_times"], ctx["min_times"], ctx["law_max"], ctx["params_max"],
+            ctx["law_min"], ctx["params_min"], 24, title="Δ Densités – Heures des extrêmes"),
+        "create_fig_qq_dual_laws": lambda: fg.create_fig_qq_dual_laws(
+            ctx["max_times"], ctx["min_times"],
+            ctx["ext_stats"]["max"]["law"], ctx["ext_stats"]["max"]["params"],
+            ctx["ext_stats"]["min"]["law"], ctx["ext_stats"]["min"]["params"],
+            ctx["law_max"], ctx["params_max"], ctx["law_min"], ctx["params_min"],
+            title="QQ plots – Heures des extrêmes"),
+        "create_fig_value_step": step,
+        "create_fig_values_timeseries": lambda: fg.create_fig_values_timeseries(ctx["daily"], COLORS),
+        "create_fig_diff_min_max_timeseries": lambda: fg.create_fig_diff_min_max_timeseries(
+            ctx["daily"], gray_color="rgba(128,128,128,0.6)"),
+        "create_fig_values_law_comparison": lambda: fg.create_fig_values_law_comparison(
+            daily_max(), daily_min(),
+            ctx["val_ext"]["max"]["law"], ctx["val_ext"]["max"]["params"],
+            ctx["val_ext"]["min"]["law"], ctx["val_ext"]["min"]["params"],
+            nbins=25, title="Δ Densités – Valeurs des extrêmes"),
+        "create_fig_qq_values": lambda: fg.create_fig_qq_values(
+            daily_max(), daily_min(),
+            ctx["val_clusters"]["cluster_max"], ctx["val_clusters"]["cluster_min"],
+            ctx["val_ext"]["max"]["law"], ctx["val_ext"]["max"]["params"],
+            ctx["val_ext"]["min"]["law"], ctx["val_ext"]["min"]["params"],
+            ctx["val_cluster_stats"]["max"]["law"], ctx["val_cluster_stats"]["max"]["params"],
+            ctx["val_cluster_stats"]["min"]["law"], ctx["val_cluster_stats"]["min"]["params"],
+            title="QQ plots – Valeurs des extrêmes"),
+        "create_fig_forecast": fig_forecast,
+    }
+
+
+# (groupe, étape) dans l'ordre du pipeline ; les groupes regroupent les bancs comparés
+STAGES = [
+    ("ingestion", "store_et_qualite"),
+    ("chargement", "load_data_csv"),
+    ("chargement", "load_data_store"),
+    ("statistiques", "calculate_daily_stats"),
+    ("statistiques", "compute_daily_extrema_timestamps"),
+    ("statistiques", "aggregate_by_half_hour"),
+    ("statistiques", "compute_extremes_stats"),
+    ("statistiques", "lois_et_clusters"),
+] + [("figures", name) for name in (
+    "create_fig_main", "create_fig_values", "create_fig_hours", "create_fig_jour",
+    "create_fig_hours_law_comparison", "create_fig_qq_dual_laws", "create_fig_value_step",
+    "create_fig_values_timeseries", "create_fig_diff_min_max_timeseries",
+    "create_fig_values_law_comparison", "create_fig_qq_values", "create_fig_forecast",
+)]
+
+
+def reset_caches():
+    """Vide les caches en mémoire (les caches disque sont désactivés sans ROUTE_BENCH_WARM)."""
+    import aggregation
+    import kde
+    import stats_calculator
+    import time_calculator
+    from cache import DiskCache
+    for module in (aggregation, stats_calculator, time_calculator):
+        for value in vars(module).values():
+            if isinstance(value, DiskCache):
+                value.clear_memory()
+    kde._DENSITIES.clear()
+
+
+@pytest.fixture(scope="session")
+def stages(bench_ctx):
+    """Étapes par nom, après un premier passage complet qui remplit le contexte."""
+    cases = build_cases(bench_ctx)
+    assert list(cases) == [name for _, name in STAGES]
+    for func in cases.values():
+        func()
+    return cases
+
+
+@pytest.mark.parametrize("group, name", STAGES, ids=[name for _, name in STAGES])
+def test_stage(benchmark, bench_ctx, stages, group, name):
+    benchmark.group = group
+    benchmark.extra_info["rows"] = bench_ctx["rows"]
+    setup = None if bench_ctx["warm"] else reset_caches
+    benchmark.pedantic(stages[name], setup=setup, rounds=bench_ctx["rounds"], iterations=1)
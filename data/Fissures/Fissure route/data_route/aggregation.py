@@ -1,67 +1,85 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
-from typing import Tuple, Dict
+from typing import Tuple, Dict, Optional
 import numpy as np
 import pandas as pd
 from scipy.stats import t
 
+from cache import DiskCache, cached_per_day, day_bounds
+
 
 # ---------------------------------------------------------------- daily-stats
+BASE_STATS = ['mean', 'median', 'std', 'count']
+_DAILY_CACHE = DiskCache("daily_stats")
+
+
+def _daily_base_stats(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Table incrémentale des statistiques de base (mean, median, std, count) par
+    jour. Chaque jour est identifié par l'empreinte de ses mesures : les jours
+    clos déjà présents dans le cache disque `daily_stats` ne sont pas recalculés,
+    seuls les jours nouveaux ou modifiés (en pratique le jour courant) passent
+    par une agrégation groupby.
+    """
+    ts, vals, days, lo, hi = day_bounds(pd.to_datetime(df['timestamp']).to_numpy(),
+                                        df['inch'].to_numpy(dtype=float))
+    if ts.size == 0:
+        return pd.DataFrame(columns=['day'] + BASE_STATS)
+
+    def compute(ts, vals, lengths):
+        sub = pd.DataFrame({'day': ts.astype('datetime64[D]'), 'inch': vals})
+        return list(sub.groupby('day', sort=True)['inch'].agg(BASE_STATS).itertuples(index=False, name=None))
+
+    base = pd.DataFrame(cached_per_day(_DAILY_CACHE, ts, vals, lo, hi, compute, kind="daily"), columns=BASE_STATS)
+    base.insert(0, 'day', pd.DatetimeIndex(days[lo]).date)
+    return base
+
+
 def calculate_daily_stats(df: pd.DataFrame):
     """
     Calcule pour chaque jour :
       - min et max en excluant :
           • les mesures EXACTEMENT à 00:00 ou 24:00,
           • tout palier traversant ces bordures (paliers dont l’un des extrêmes est à 00:00 ou 24:00),
-      - mean, median (toujours sur toutes les mesures),
+      - mean, median (toujours sur toutes les mesures), ainsi que std et count
+        (réutilisés par calculate_confidence_intervals),
       - day_start, day_end, noon,
       - diff_mm = (max - min)*25.4,
       - diff_global_max_mm et diff_global_min_mm.
+    Entièrement vectorisé ; seuls les jours dont les mesures ont changé sont
+    réagrégés (voir `_daily_base_stats`).
     """
     from time_calculator import compute_daily_extrema_timestamps
 
-    # Préparer timestamps et date
-    df = df.copy()
-    df['timestamp'] = pd.to_datetime(df['timestamp'])
-    df['day'] = df['timestamp'].dt.date
-
-    # 1) Moyenne et médiane sur toutes les mesures
-    daily = (
-        df.groupby('day')['inch']
-          .agg(['mean', 'median'])
-          .reset_index()
-    )
+    # 1) Moyenne, médiane, écart-type et effectif (table incrémentale)
+    base = _daily_base_stats(df)
+    daily = base[['day', 'mean', 'median']].copy()
 
     # 2) Calcul des bornes temporelles
     daily['day_start'] = pd.to_datetime(daily['day'])
     daily['day_end']   = daily['day_start'] + pd.Timedelta(days=1)
     daily['noon']      = daily['day_start'] + pd.Timedelta(hours=12)
 
-    # 3) Récupérer min/max absolus corrects via compute_daily_extrema_timestamps
+    # 3) Min/max absolus corrects via compute_daily_extrema_timestamps (jointure par jour)
     ext = compute_daily_extrema_timestamps(df)
-    ext = ext.set_index('day')
-
-    # 4) Assigner val_min et val_max au DataFrame daily
-    daily['min'] = np.nan
-    daily['max'] = np.nan
-    for idx, row in daily.iterrows():
-        d = row['day']
-        if d in ext.index:
-            daily.at[idx, 'min'] = ext.at[d, 'val_min']
-            daily.at[idx, 'max'] = ext.at[d, 'val_max']
-        # sinon laisser NaN
-        else:
-            print("\ncalculate_daily_stats: day not in index\n", d)
-
-    # 5) diff_mm
+    ext = ext[['day', 'val_min', 'val_max']].rename(columns={'val_min': 'min', 'val_max': 'max'})
+    daily = daily.merge(ext, on='day', how='left')
+    daily[['min', 'max']] = daily[['min', 'max']].astype(float)
+    missing = daily.loc[daily['min'].isna(), 'day'].tolist()
+    if missing:
+        print("\ncalculate_daily_stats: days not in index\n", missing)
+
+    # 4) diff_mm
     daily['diff_mm'] = (daily['max'] - daily['min']) * 25.4
 
-    # 6) Global min/max sur toutes les données
+    # 5) Global min/max sur toutes les données
     gmin = df['inch'].min()
     gmax = df['inch'].max()
     daily['diff_global_max_mm'] = (gmax - daily['max']) * 25.4
     daily['diff_global_min_mm'] = (daily['min'] - gmin) * 25.4
 
+    daily['std'] = base['std'].to_numpy()
+    daily['count'] = base['count'].to_numpy()
     return daily, gmin, gmax
 
 
@@ -69,37 +87,145 @@ def calculate_daily_stats(df: pd.DataFrame):
 def calculate_confidence_intervals(df: pd.DataFrame,
                                    daily_stats: pd.DataFrame,
                                    force_normal_test: bool = True):
-    ci_lo, ci_hi, normal = [], [], []
-    for day, g in df.groupby("day")['inch']:
-        n = len(g)
-        if n < 3:
-            ci_lo.append(np.nan)
-            ci_hi.append(np.nan)
-            normal.append(False)
-            continue
-        m, s = g.mean(), g.std(ddof=1)
-        margin = t.ppf(0.975, n - 1) * s / np.sqrt(n)
-        ci_lo.append(m - margin)
-        ci_hi.append(m + margin)
-        normal.append(force_normal_test)
-    daily_stats = daily_stats.copy()
-    daily_stats['ci_lower'] = ci_lo
-    daily_stats['ci_upper'] = ci_hi
-    daily_stats['normal'] = normal
-    return daily_stats
+    """
+    IC de Student à 95 % de la moyenne journalière, calculé en une opération
+    vectorielle à partir de mean/std/count (repris de daily_stats s'ils y sont,
+    sinon agrégés depuis df). Jours à moins de 3 mesures : IC NaN, normal=False.
+    """
+    if {'mean', 'std', 'count'}.issubset(daily_stats.columns):
+        agg = daily_stats[['day', 'mean', 'std', 'count']]
+    else:
+        agg = df.groupby('day')['inch'].agg(['mean', 'std', 'count']).reset_index()
+
+    n = agg['count'].to_numpy(dtype=float)
+    valid = n >= 3
+    with np.errstate(invalid='ignore', divide='ignore'):
+        margin = t.ppf(0.975, np.where(valid, n - 1, np.nan)) * agg['std'].to_numpy() / np.sqrt(n)
+    ci = pd.DataFrame({
+        'day': agg['day'].to_numpy(),
+        'ci_lower': np.where(valid, agg['mean'].to_numpy() - margin, np.nan),
+        'ci_upper': np.where(valid, agg['mean'].to_numpy() + margin, np.nan),
+        'normal': valid & force_normal_test,
+    })
+    daily_stats = daily_stats.drop(columns=['ci_lower', 'ci_upper', 'normal'], errors='ignore')
+    return daily_stats.merge(ci, on='day', how='left')
 
 
 # ---------------------------------------------------- agrégation ½-heure etc.
-def aggregate_by_half_hour(df: pd.DataFrame):
-    df_mean = df.groupby(['day', 'half_hour'])['inch'].mean().reset_index()
-    df_median = df.groupby(['day', 'half_hour'])['inch'].median().reset_index()
-
-    grid = pd.DataFrame({'half_hour': np.arange(0, 24, 0.5)})
-    jour_moyen = grid.merge(df_mean.groupby('half_hour')['inch'].mean().reset_index(),
-                            on='half_hour', how='left')
-    jour_median = grid.merge(df_median.groupby('half_hour')['inch'].median().reset_index(),
-                             on='half_hour', how='left')
-    return df_mean, df_median, jour_moyen, jour_median
+N_SLOTS = 48
+HALF_HOURS = np.arange(N_SLOTS) * 0.5
+_CUBE_CACHE = DiskCache("half_hour_cube")
+
+
+def _slot_stats(keys: np.ndarray, vals: np.ndarray, n_keys: int):
+    """
+    Moyenne, médiane et effectif de `vals` par clé entière (0 ≤ clé < n_keys),
+    en une passe : tri par (clé, valeur), sommes par bincount et médiane lue aux
+    positions centrales de chaque groupe. Clés sans valeur : NaN / 0.
+    """
+    order = np.lexsort((vals, keys))
+    k, v = keys[order], vals[order]
+    count = np.bincount(k, minlength=n_keys)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.bincount(k, weights=v, minlength=n_keys) / count
+    start = np.r_[0, np.cumsum(count)[:-1]]
+    filled = count > 0
+    lo = start[filled] + (count[filled] - 1) // 2
+    hi = start[filled] + count[filled] // 2
+    median = np.full(n_keys, np.nan)
+    median[filled] = (v[lo] + v[hi]) / 2
+    return mean, median, count
+
+
+class HalfHourCube:
+    """
+    Cube dense jour × 48 demi-heures des mesures (inch) : moyenne, médiane et
+    effectif par case (NaN / 0 pour une demi-heure sans mesure).
+
+    Chaque jour est identifié par l'empreinte de ses mesures : ses 48 cases
+    sont mémorisées dans le cache disque `half_hour_cube` et seules les
+    journées nouvelles ou modifiées (en pratique le jour courant) sont
+    réagrégées. Jour moyen, jour médian et demi-heures des extrêmes journaliers
+    sont ensuite des réductions NumPy sur les axes du cube.
+    """
+
+    def __init__(self, days: np.ndarray, mean: np.ndarray, median: np.ndarray, count: np.ndarray):
+        self.days = days            # datetime64[D], croissants
+        self.mean = mean            # (n_jours, 48)
+        self.median = median        # (n_jours, 48)
+        self.count = count          # (n_jours, 48)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "HalfHourCube":
+        ts = pd.to_datetime(df['timestamp']).to_numpy()
+        vals = df['inch'].to_numpy(dtype=float)
+        keep = ~np.isnan(vals)
+        ts, vals, days, lo, hi = day_bounds(ts[keep], vals[keep])
+        if ts.size == 0:
+            empty = np.empty((0, N_SLOTS))
+            return cls(days[:0], empty, empty.copy(), empty.astype(int))
+
+        def compute(ts, vals, lengths):
+            day_rank = np.repeat(np.arange(len(lengths)), lengths)
+            slot = (ts - ts.astype('datetime64[D]')) // np.timedelta64(30, 'm')
+            mean, median, count = (
+                a.reshape(len(lengths), N_SLOTS)
+                for a in _slot_stats(day_rank * N_SLOTS + slot.astype(int), vals, len(lengths) * N_SLOTS)
+            )
+            return list(zip(mean, median, count))
+
+        cells = cached_per_day(_CUBE_CACHE, ts, vals, lo, hi, compute, kind="half_hour")
+        mean, median, count = (np.vstack(col) for col in zip(*cells))
+        return cls(days[lo], mean, median, count)
+
+    def _long(self, values: np.ndarray) -> pd.DataFrame:
+        """Format long (day, half_hour, inch) des cases renseignées."""
+        d, s = np.nonzero(self.count > 0)
+        return pd.DataFrame({
+            'day': pd.DatetimeIndex(self.days[d]).date,
+            'half_hour': HALF_HOURS[s],
+            'inch': values[d, s],
+        })
+
+    def day_half_mean(self) -> pd.DataFrame:
+        return self._long(self.mean)
+
+    def day_half_median(self) -> pd.DataFrame:
+        return self._long(self.median)
+
+    def jour_moyen(self) -> pd.DataFrame:
+        """Moyenne, par demi-heure, des moyennes journalières."""
+        return pd.DataFrame({'half_hour': HALF_HOURS, 'inch': _nanreduce(np.nanmean, self.mean)})
+
+    def jour_median(self) -> pd.DataFrame:
+        """Médiane, par demi-heure, des médianes journalières."""
+        return pd.DataFrame({'half_hour': HALF_HOURS, 'inch': _nanreduce(np.nanmedian, self.median)})
+
+    def extreme_half_hours(self) -> Dict[str, pd.Series]:
+        """
+        Demi-heure (décimale) du max et du min de chaque jour, sur les cubes
+        moyenne et médiane (première demi-heure en cas d'égalité, comme idxmax).
+        """
+        index = pd.Index(pd.DatetimeIndex(self.days).date, name='day')
+        out = {}
+        for name, cube in (('mean', self.mean), ('median', self.median)):
+            for lab, fill, arg in (('max', -np.inf, np.argmax), ('min', np.inf, np.argmin)):
+                slot = arg(np.where(np.isnan(cube), fill, cube), axis=1)
+                out[f'{lab}_half_times_{name}'] = pd.Series(HALF_HOURS[slot], index=index)
+        return out
+
+
+def _nanreduce(func, cube: np.ndarray) -> np.ndarray:
+    """Réduction par colonne ignorant les NaN (colonne vide → NaN, sans avertissement)."""
+    out = np.full(cube.shape[1], np.nan)
+    filled = ~np.isnan(cube).all(axis=0)
+    out[filled] = func(cube[:, filled], axis=0)
+    return out
+
+
+def aggregate_by_half_hour(df: pd.DataFrame, cube: Optional[HalfHourCube] = None):
+    cube = cube or HalfHourCube.from_frame(df)
+    return cube.day_half_mean(), cube.day_half_median(), cube.jour_moyen(), cube.jour_median()
 
 
 def extract_extremes(df_mean: pd.DataFrame, df_median: pd.DataFrame) -> Dict[str, object]:
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""
+Caches adressés par contenu, persistés sur disque (pickle), partagés par les
+calculs coûteux du module route (extrêmes journaliers, ajustements de lois…).
+La clé est une empreinte SHA-1 des données et des paramètres du calcul : une
+donnée modifiée change la clé, aucune invalidation manuelle n'est nécessaire.
+"""
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import load_config
+
+cfg = load_config()
+
+
+def cache_enabled() -> bool:
+    return cfg.get("cache", {}).get("enabled", True)
+
+
+def cache_dir() -> Path:
+    """`paths.cache_dir` de config.yaml, sinon dossier `cache` à côté du CSV local."""
+    path = cfg["paths"].get("cache_dir")
+    if path:
+        return Path(path)
+    return Path(cfg["paths"]["local_csv"]).parent / "cache"
+
+
+def digest(*arrays: np.ndarray, **params: Any) -> str:
+    """Empreinte SHA-1 des tableaux (octets bruts + dtype) et des paramètres."""
+    h = hashlib.sha1()
+    for arr in arrays:
+        arr = np.ascontiguousarray(arr)
+        h.update(arr.dtype.str.encode())
+        h.update(arr.tobytes())
+    h.update(repr(sorted(params.items())).encode())
+    return h.hexdigest()
+
+
+def day_bounds(ts: np.ndarray, vals: np.ndarray) -> Tuple[np.ndarray, ...]:
+    """
+    Mesures triées par horodatage (tri stable) et bornes [lo, hi) de chaque
+    journée : renvoie (ts, vals, days, lo, hi).
+    """
+    order = np.argsort(ts, kind='stable')
+    ts, vals = ts[order], vals[order]
+    days = ts.astype('datetime64[D]')
+    cuts = np.flatnonzero(days[1:] != days[:-1]) + 1
+    return ts, vals, days, np.r_[0, cuts], np.r_[cuts, ts.size]
+
+
+def cached_per_day(cache: "DiskCache", ts: np.ndarray, vals: np.ndarray, lo: np.ndarray, hi: np.ndarray,
+                   compute: Callable[[np.ndarray, np.ndarray, np.ndarray], Sequence[Any]],
+                   **params: Any) -> List[Any]:
+    """
+    Résultat par journée ([lo, hi) dans ts / vals triés), mémorisé dans `cache`
+    sous l'empreinte des mesures du jour et de `params`. Les journées absentes
+    du cache sont calculées en un seul appel `compute(ts, vals, lengths)` sur
+    leurs mesures concaténées, qui renvoie un résultat par journée, dans l'ordre.
+    """
+    keys = [digest(ts[a:b], vals[a:b], **params) for a, b in zip(lo, hi)]
+    todo = [i for i, k in enumerate(keys) if k not in cache]
+    computed: Dict[int, Any] = {}
+    if todo:
+        rows = np.concatenate([np.arange(lo[i], hi[i]) for i in todo])
+        for i, value in zip(todo, compute(ts[rows], vals[rows], hi[todo] - lo[todo])):
+            cache[keys[i]] = computed[i] = value
+        cache.save()
+    return [computed[i] if i in computed else cache[k] for i, k in enumerate(keys)]
+
+
+class DiskCache:
+    """
+    Dictionnaire clé → résultat, un fichier pickle par clé
+    (`<cache_dir>/<name>/<clé>.pkl`) lu à la demande, avec une copie mémoire.
+    `save()` n'écrit que les clés ajoutées depuis le dernier appel, chacune via
+    un fichier temporaire unique puis `os.replace` : threads et processus
+    peuvent écrire en même temps sans corrompre une entrée. Au-delà de
+    `max_entries` (`cache.max_entries` de config.yaml), les entrées les moins
+    récemment utilisées sont retirées de la mémoire et du disque.
+    """
+
+    def __init__(self, name: str, max_entries: Optional[int] = None):
+        self.name = name
+        self.max_entries = max_entries or cfg.get("cache", {}).get("max_entries", 20000)
+        self._mem: "OrderedDict[str, Any]" = OrderedDict()
+        self._pending: Dict[str, Any] = {}
+        self._lock = threading.RLock()
+
+    @property
+    def path(self) -> Path:
+        return cache_dir() / self.name
+
+    def _remember(self, key: str, value: Any) -> None:
+        self._mem[key] = value
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.max_entries:
+            self._mem.popitem(last=False)
+
+    def _load(self, key: str) -> bool:
+        """Charge `key` en mémoire depuis le disque si besoin ; False si absente."""
+        with self._lock:
+            if key in self._mem:
+                self._mem.move_to_end(key)
+                return True
+            if not cache_enabled():
+                return False
+            path = self.path / f"{key}.pkl"
+            try:
+                with path.open("rb") as f:
+                    value = pickle.load(f)
+                os.utime(path)  # date de dernier usage (éviction LRU sur disque)
+            except (OSError, pickle.UnpicklingError, EOFError):
+                return False
+            self._remember(key, value)
+            return True
+
+    def __contains__(self, key: str) -> bool:
+        return self._load(key)
+
+    def __getitem__(self, key: str) -> Any:
+        with self._lock:
+            if not self._load(key):
+                raise KeyError(key)
+            return self._mem[key]
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._remember(key, value)
+            self._pending[key] = value
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            return self._mem[key] if self._load(key) else default
+
+    def clear_memory(self) -> None:
+        """Oublie la copie mémoire (le disque est conservé)."""
+        with self._lock:
+            self._mem.clear()
+            self._pending.clear()
+
+    def save(self) -> None:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not (pending and cache_enabled()):
+            return
+        self.path.mkdir(parents=True, exist_ok=True)
+        for key, value in pending.items():
+            with tempfile.NamedTemporaryFile(dir=self.path, suffix=".tmp", delete=False) as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(f.name, self.path / f"{key}.pkl")
+        self._prune()
+
+    def _prune(self) -> None:
+        files = list(self.path.glob("*.pkl"))
+        if len(files) <= self.max_entries:
+            return
+        stamped = []
+        for path in files:
+            try:
+                stamped.append((path.stat().st_mtime, path))
+            except OSError:  # déjà retiré par un autre processus
+                pass
+        stamped.sort()
+        for _, path in stamped[:len(stamped) - self.max_entries]:
+            try:
+                path.unlink()
+            except OSError:
+                pass
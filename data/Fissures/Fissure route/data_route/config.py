@@ -18,3 +18,14 @@ def load_config(path: Union[str, Path] = Path(__file__).parent / "config.yaml")
         with path.open(encoding="utf-8") as f:
             _CFG_CACHE = yaml.safe_load(f)
     return _CFG_CACHE
+
+
+def preload_config(cfg: Dict[str, Any]) -> None:
+    """
+    Installe `cfg` comme configuration déjà chargée. Sert d'initialiseur aux
+    processus de calcul (spawn/forkserver), qui réimportent les modules : ils
+    utilisent ainsi la configuration du processus parent, quel que soit le
+    fichier dont elle vient.
+    """
+    global _CFG_CACHE
+    _CFG_CACHE = cfg
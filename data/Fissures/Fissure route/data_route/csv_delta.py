@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+"""
+Lecture incrémentale d'un CSV en ajout seul (local ou distant via SFTP).
+
+Un consommateur (synchro SFTP, store Parquet, filtre qualité) mémorise un
+filigrane : l'offset jusqu'où il a lu et la dernière ligne complète lue
+(`tail`). Au passage suivant, la ligne relue juste avant l'offset doit être
+identique : sinon le fichier a été tronqué, tourné ou réécrit, et le
+consommateur repart de zéro. Seules les lignes complètes sont renvoyées ; une
+ligne en cours d'écriture sera relue entière au passage suivant.
+"""
+from typing import BinaryIO, Optional, Tuple
+
+
+def read_new_lines(f: BinaryIO, size: int, offset: int, tail: bytes) -> Optional[Tuple[bytes, bytes]]:
+    """
+    Lignes complètes de `f` (taille `size`) postérieures au filigrane
+    (`offset`, `tail`), et nouvelle dernière ligne complète : (lignes, tail).
+    None si le fichier ne prolonge pas le filigrane (plus court que l'offset ou
+    ligne frontière différente).
+    """
+    if size < offset or len(tail) > offset:
+        return None
+    boundary = offset - len(tail)
+    f.seek(boundary)
+    if hasattr(f, "prefetch"):  # fichier SFTP (paramiko) : requêtes de lecture en parallèle
+        f.prefetch(size - boundary)
+    chunk = f.read(size - boundary)
+    if not chunk.startswith(tail):
+        return None
+    raw = chunk[len(tail):]
+    raw = raw[:raw.rfind(b"\n") + 1]
+    if not raw:
+        return raw, tail
+    return raw, raw[raw.rfind(b"\n", 0, len(raw) - 1) + 1:]
@@ -1,74 +1,276 @@
 # -*- coding: utf-8 -*-
 import os
+import json
 import shutil
 import paramiko
 import pandas as pd
 from datetime import datetime, timedelta
 
 from pathlib import Path
+from typing import Any, Dict, Optional
 from config import load_config
+from csv_delta import read_new_lines
+from ssh_session import get_session
+from timestamps import parse_timestamps
+from quality import update_exclusions, excluded_mask
 cfg = load_config()
 
 
-def fetch_remote_csv() -> None:
+# ------------------------------------------------------ synchronisation delta
+def _sync_state_path(local_path: Path) -> Path:
+    """Fichier d'état de la synchronisation incrémentale (à côté du CSV local)."""
+    return local_path.with_name(local_path.name + ".sync.json")
+
+
+def _load_sync_state(local_path: Path) -> Optional[Dict[str, Any]]:
+    state_path = _sync_state_path(local_path)
+    if not state_path.exists():
+        return None
+    try:
+        with state_path.open(encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _save_sync_state(local_path: Path, offset: int, tail: bytes) -> None:
+    state = {
+        "offset": offset,
+        "tail": tail.decode("utf-8"),
+        "synced_at": datetime.now().isoformat(timespec="seconds"),
+    }
+    path = _sync_state_path(local_path)
+    tmp = path.with_suffix(".tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+
+def _state_from_local(local_path: Path) -> Optional[Dict[str, Any]]:
+    """
+    Reconstruit l'état (offset, dernière ligne complète) à partir du CSV local,
+    sans le modifier. Une éventuelle ligne incomplète en fin de fichier (copie
+    faite pendant une écriture du comparateur) reste hors de l'offset : elle est
+    tronquée par `_fetch_delta` juste avant l'ajout du delta, qui la relit entière.
+    None si le dernier bloc ne contient aucune ligne complète (fichier vide ou
+    ligne démesurée) : l'appelant repasse alors en import complet.
+    """
+    size = local_path.stat().st_size
+    with local_path.open("rb") as f:
+        f.seek(max(0, size - 4096))
+        block = f.read()
+    end = block.rfind(b"\n") + 1
+    if end == 0:
+        return None
+    offset = size - len(block) + end
+    start = block.rfind(b"\n", 0, end - 1) + 1
+    return {"offset": offset, "tail": block[start:end].decode("utf-8")}
+
+
+def _state_matches_local(local_path: Path, state: Dict[str, Any]) -> bool:
     """
-    Copie le CSV distant vers le chemin local défini dans config.yaml.
-    Sauvegarde horodatée du fichier local existant dans `local_backup_dir`.
+    L'état correspond-il au CSV local ? Taille égale à l'offset et dernière
+    ligne identique. Sinon (arrêt entre l'ajout du delta et l'écriture de
+    l'état, CSV local modifié ou restauré), ajouter à partir de cet offset
+    dupliquerait ou décalerait des lignes.
+    """
+    offset = int(state["offset"])
+    size = local_path.stat().st_size
+    with local_path.open("rb") as f:
+        return size == offset and read_new_lines(f, size, offset, state["tail"].encode("utf-8")) is not None
+
+
+def _fetch_delta(sftp: paramiko.SFTPClient, remote_path: str,
+                 local_path: Path, backup_dir: Path) -> bool:
+    """
+    Ajoute au CSV local les seules lignes apparues depuis la dernière synchro.
+
+    La dernière ligne synchronisée (`tail`) est relue côté distant juste avant
+    l'offset mémorisé : si elle ne correspond plus (fichier tronqué, tourné ou
+    réécrit), on renvoie False et l'appelant repasse en import complet. L'état
+    mémorisé est d'abord confronté au CSV local (taille, dernière ligne) ; en
+    cas d'écart il est reconstruit à partir du CSV local, et faute d'y trouver
+    une ligne complète on renvoie False (import complet).
+    Le delta est aussi écrit tel quel dans `backup_dir` (segment incrémental).
+    """
+    state = _load_sync_state(local_path)
+    if state is None or not _state_matches_local(local_path, state):
+        if state is not None:
+            print("État de synchro incohérent avec le CSV local → état recalculé depuis le CSV local.")
+        state = _state_from_local(local_path)
+        if state is None:
+            print("Aucune ligne complète en fin de CSV local → import complet.")
+            return False
+    offset = int(state["offset"])
+    tail = state["tail"].encode("utf-8")
+
+    remote_size = sftp.stat(remote_path).st_size
+    if remote_size < offset:
+        print("Fichier distant plus court que la copie locale → import complet.")
+        return False
+
+    with sftp.open(remote_path, "rb") as rf:
+        new = read_new_lines(rf, remote_size, offset, tail)
+    if new is None:
+        print("Ligne frontière différente côté distant → import complet.")
+        return False
+
+    delta, last_line = new
+    n_lines = delta.count(b"\n")
+    if not delta:
+        print("Aucune nouvelle mesure sur le Raspberry Pi.")
+        _save_sync_state(local_path, offset, tail)
+        return True
+
+    with local_path.open("rb+") as f:
+        # Ligne incomplète éventuelle au-delà de l'offset : remplacée par le delta
+        f.truncate(offset)
+        f.seek(offset)
+        f.write(delta)
+
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    segment = backup_dir / f"{local_path.stem}_{stamp}.delta{local_path.suffix}"
+    segment.write_bytes(delta)
+
+    _save_sync_state(local_path, offset + len(delta), last_line)
+    print(f"Delta synchronisé : {n_lines} lignes ({len(delta)} octets) → {local_path}")
+    print(f"Segment de sauvegarde → {segment}")
+    return True
+
+
+def fetch_remote_csv(incremental: Optional[bool] = None) -> None:
+    """
+    Met à jour le CSV local défini dans config.yaml à partir du CSV distant.
+
+    Mode incrémental (défaut, `sync.incremental` dans config.yaml) : seule la
+    fin du fichier distant postérieure au dernier offset synchronisé est lue
+    (lecture SFTP positionnée), vérifiée sur la ligne frontière puis ajoutée
+    au fichier local ; la sauvegarde se limite à ce segment.
+    Mode complet (premier import, incohérence détectée ou incremental=False) :
+    sauvegarde horodatée du fichier local existant puis copie intégrale.
+    La connexion SSH est celle de la session partagée (ssh_session).
     """
     local_path   = Path(cfg["paths"]["local_csv"])
     remote_path  = cfg["paths"]["remote_csv"]
     backup_dir   = Path(cfg["paths"]["local_backup_dir"])
-    host         = cfg["ssh"]["host"]
-    port         = cfg["ssh"]["port"]
-    user         = cfg["ssh"]["user"]
-    password     = cfg["ssh"]["password"]
+    if incremental is None:
+        incremental = cfg.get("sync", {}).get("incremental", True)
 
     backup_dir.mkdir(parents=True, exist_ok=True)
 
-    # ---------- Sauvegarde locale (si le fichier existe)
-    if local_path.exists():
-        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        backup_file = backup_dir / f"{local_path.stem}_{stamp}{local_path.suffix}"
-        shutil.copy2(local_path, backup_file)
-        print(f"Sauvegarde effectuée → {backup_file}")
-    else:
-        print("Aucun fichier local à sauvegarder (premier import).")
-
-    # ---------- Transfert SFTP
     try:
-        transport = paramiko.Transport((host, port))
-        transport.connect(username=user, password=password)
-        with paramiko.SFTPClient.from_transport(transport) as sftp:
+        with get_session().sftp() as sftp:
+            # ---------- Synchronisation delta
+            if incremental and local_path.exists():
+                if _fetch_delta(sftp, remote_path, local_path, backup_dir):
+                    return
+
+            # ---------- Sauvegarde locale (si le fichier existe)
+            if local_path.exists():
+                stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                backup_file = backup_dir / f"{local_path.stem}_{stamp}{local_path.suffix}"
+                shutil.copy2(local_path, backup_file)
+                print(f"Sauvegarde effectuée → {backup_file}")
+            else:
+                print("Aucun fichier local à sauvegarder (premier import).")
+
+            # ---------- Transfert SFTP complet
             sftp.get(remote_path, str(local_path))
-        transport.close()
+        state = _state_from_local(local_path)
+        if state is not None:
+            _save_sync_state(local_path, state["offset"], state["tail"].encode("utf-8"))
+        else:
+            _sync_state_path(local_path).unlink(missing_ok=True)
         print(f"Transfert réussi : {remote_path} → {local_path}")
     except Exception as exc:
         print(f"[ERREUR] transfert SFTP : {exc}")
 
 
+# ------------------------------------------------------ lecture du CSV local
+# Taille des blocs de la lecture en flux du CSV (mode sans store)
+CSV_CHUNK_ROWS = 200_000
+MIN_INTERVAL = pd.Timedelta(seconds=10)
+
+
+def _read_csv_window(local_path: str, start_day: pd.Timestamp, end_day: pd.Timestamp,
+                     ordered: bool = True) -> pd.DataFrame:
+    """
+    Lecture en flux du CSV local, ordonné par ajout (horodatages analysés par
+    `timestamps.parse_timestamps`, lignes mal formées signalées puis ignorées,
+    mesures de l'index qualité écartées) : les lignes antérieures à start_day
+    sont écartées bloc par bloc, la lecture s'arrête au premier horodatage
+    postérieur à end_day (23:59) et le filtre de fréquence (≥ 10 s depuis la
+    ligne précédente) est appliqué au fil de l'eau. La mémoire occupée est
+    proportionnelle à la fenêtre demandée, non à l'historique complet.
+    Si des lignes de la fenêtre sont hors ordre, la fenêtre est relue sans arrêt
+    anticipé (ordered=False), triée puis filtrée comme dans la version d'origine.
+    """
+    end = end_day + pd.Timedelta(days=1)
+    parts = []
+    prev_ts = None  # dernière ligne (brute) de la fenêtre, pour le filtre de fréquence
+    reader = pd.read_csv(local_path, header=None, names=['timestamp', 'inch'],
+                         dtype={'timestamp': 'S27'}, chunksize=CSV_CHUNK_ROWS)
+    for chunk in reader:
+        chunk['timestamp'] = parse_timestamps(chunk['timestamp'].to_numpy(), source=str(local_path))
+        chunk = chunk.dropna(subset=['timestamp'])
+        chunk = chunk[~excluded_mask(chunk['timestamp'])]
+        past_end = chunk['timestamp'] >= end
+        chunk = chunk[(chunk['timestamp'] >= start_day) & ~past_end]
+
+        if ordered and not chunk.empty:
+            diff = chunk['timestamp'].diff()
+            if prev_ts is not None:
+                diff.iloc[0] = chunk['timestamp'].iloc[0] - prev_ts
+            if (diff < pd.Timedelta(0)).any():
+                print("CSV local non ordonné : relecture triée de la fenêtre demandée.")
+                return _read_csv_window(local_path, start_day, end_day, ordered=False)
+            prev_ts = chunk['timestamp'].iloc[-1]
+            chunk = chunk[(diff >= MIN_INTERVAL) | diff.isna()]
+        parts.append(chunk)
+        if ordered and past_end.any():
+            break
+
+    df = pd.concat(parts, ignore_index=True)
+    if not ordered:
+        df = df.sort_values('timestamp')
+        diff = df['timestamp'].diff()
+        df = df[(diff >= MIN_INTERVAL) | diff.isna()]
+    df['inch'] = pd.to_numeric(df['inch'], errors='coerce')
+    return df
+
+
 def load_data(start_day_str: str, end_day_str: str) -> pd.DataFrame:
     """
-    Charge le CSV `local_path` dans un DataFrame, applique les filtres temporels
-    et renvoie le DataFrame filtré et formaté (colonnes additionnelles, etc.).
+    Charge les mesures de [start_day_str, end_day_str] dans un DataFrame, applique
+    les filtres temporels et renvoie le DataFrame filtré et formaté (colonnes
+    additionnelles, etc.).
+
+    Par défaut (`store.enabled` dans config.yaml) les mesures sont lues dans le
+    store Parquet partitionné par jour, mis à jour au préalable avec les nouvelles
+    lignes du CSV ; sinon le CSV `local_path` est lu en flux, limité à la fenêtre
+    demandée (`_read_csv_window`).
+    Les nouvelles lignes du CSV passent d'abord par le filtre qualité (quality) ;
+    les mesures de l'index d'exclusion sont écartées avant le filtre de fréquence.
     """
     start_day = pd.to_datetime(start_day_str)
     end_day = pd.to_datetime(end_day_str)
+    update_exclusions()
 
-    local_path = cfg["paths"]["local_csv"]  # depuis le YAML
+    if cfg.get("store", {}).get("enabled", True):
+        from store import update_store, read_store
+        update_store()
+        df = read_store(start_day, end_day)
 
-    df = pd.read_csv(local_path, header=None)
-    df.columns = ['timestamp', 'inch']
-    df['inch'] = pd.to_numeric(df['inch'], errors='coerce')
-    df['timestamp'] = pd.to_datetime(df['timestamp'])
-    df = df.sort_values('timestamp')
+        # Filtre temporel (du début à la fin, fin inclus jusqu'à 23:59 du jour end_day)
+        mask_time = (df['timestamp'] >= start_day) & (df['timestamp'] < (end_day + pd.Timedelta(days=1)))
+        df = df[mask_time & ~excluded_mask(df['timestamp'])]
 
-    # Filtre temporel (du début à la fin, fin inclus jusqu'à 23:59 du jour end_day)
-    mask_time = (df['timestamp'] >= start_day) & (df['timestamp'] < (end_day + pd.Timedelta(days=1)))
-    df = df[mask_time]
-
-    # Filtre sur la fréquence (conservation des points espacés d'au moins 10s ou premier point)
-    mask_freq = (df['timestamp'].diff() >= pd.Timedelta(seconds=10)) | (df['timestamp'].diff().isna())
-    df = df[mask_freq]
+        # Filtre sur la fréquence (conservation des points espacés d'au moins 10s ou premier point)
+        mask_freq = (df['timestamp'].diff() >= MIN_INTERVAL) | (df['timestamp'].diff().isna())
+        df = df[mask_freq]
+    else:
+        local_path = cfg["paths"]["local_csv"]  # depuis le YAML
+        df = _read_csv_window(local_path, start_day, end_day)
 
     # Ajout de colonnes temporelles et unité métrique
     df['day'] = df['timestamp'].dt.date
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""
+Décimation des séries temporelles affichées : réduit le nombre de points envoyés
+au navigateur tout en conservant les extrêmes visibles à la résolution courante.
+"""
+import numpy as np
+
+
+def minmax_decimate(x: np.ndarray, y: np.ndarray, max_points: int) -> np.ndarray:
+    """
+    Indices triés des points conservés parmi (x, y), x croissant (numérique ou
+    datetime64). L'intervalle [x[0], x[-1]] est découpé en `max_points // 2`
+    seaux de même durée ; dans chaque seau non vide on garde le point de
+    valeur minimale et celui de valeur maximale (plus le premier et le dernier
+    point de la série). Les valeurs NaN sont ignorées.
+    """
+    n = len(x)
+    if n <= max_points:
+        return np.arange(n)
+
+    valid = np.flatnonzero(~np.isnan(y))
+    if len(valid) <= max_points:
+        return valid
+    xv = np.asarray(x)[valid].astype("int64")
+    yv = np.asarray(y)[valid]
+
+    n_buckets = max(max_points // 2, 1)
+    edges = np.linspace(xv[0], xv[-1], n_buckets + 1)
+    bucket = np.searchsorted(edges[1:-1], xv, side="right")
+
+    # Tri par (seau, valeur) : premier de chaque seau = min, dernier = max
+    order = np.lexsort((yv, bucket))
+    b = bucket[order]
+    starts = np.flatnonzero(np.r_[True, b[1:] != b[:-1]])
+    ends = np.r_[starts[1:], len(b)] - 1
+
+    keep = np.concatenate(([0, len(valid) - 1], order[starts], order[ends]))
+    return valid[np.unique(keep)]
@@ -1,10 +1,28 @@
 # -*- coding: utf-8 -*-
 import plotly.graph_objects as go
+import plotly.io as pio
 import numpy as np
 import pandas as pd
 from stats_calculator import get_primary_peak_hours, compute_hdi
 from typing import List, Tuple
 
+from config import load_config
+from decimation import minmax_decimate
+from kde import kde_density
+
+cfg = load_config()
+
+FIGURES_CFG = cfg.get("figures", {})
+# Nombre maximal de points de la trace « Mesures » de la figure principale
+MAX_POINTS = FIGURES_CFG.get("max_points", 20000)
+# Rendu des traces scatter : "svg", "webgl" ou "auto" (WebGL au-delà du seuil)
+BACKEND = FIGURES_CFG.get("backend", "auto")
+WEBGL_THRESHOLD = FIGURES_CFG.get("webgl_threshold", 5000)
+# Budget par figure (points de toutes les traces, taille du JSON envoyé)
+BUDGET_POINTS = FIGURES_CFG.get("budget_points", 100000)
+BUDGET_BYTES = FIGURES_CFG.get("budget_bytes", 5_000_000)
+MAIN_STATS = ('min', 'max', 'mean', 'median')
+
 
 def filter_constant_plateaus(data: List[Tuple[pd.Timestamp, float]]) -> List[Tuple[pd.Timestamp, float]]:
     """
@@ -37,31 +55,129 @@ def filter_constant_plateaus(data: List[Tuple[pd.Timestamp, float]]) -> List[Tup
     return filtered
 
 
+def plateau_change_mask(values: np.ndarray) -> np.ndarray:
+    """
+    Masque des points conservés par `filter_constant_plateaus` (premier et dernier
+    point de chaque palier), calculé de façon vectorisée.
+    """
+    if len(values) <= 1:
+        return np.ones(len(values), dtype=bool)
+    changes = values[1:] != values[:-1]
+    return np.concatenate(([True], changes)) | np.concatenate((changes, [True]))
+
+
+def main_measurement_points(df, x_range=None, max_points=None):
+    """
+    Points de la trace « Mesures » : débuts/fins de palier, restreints à la
+    fenêtre `x_range` (un point de part et d'autre pour prolonger le tracé)
+    puis décimés par seaux min/max à `max_points` au plus.
+    """
+    pts = df.iloc[plateau_change_mask(df['inch'].values)]
+    if x_range is not None:
+        ts = pts['timestamp'].values
+        lo = np.searchsorted(ts, pd.Timestamp(x_range[0]).to_datetime64(), side='left')
+        hi = np.searchsorted(ts, pd.Timestamp(x_range[1]).to_datetime64(), side='right')
+        pts = pts.iloc[max(lo - 1, 0):hi + 1]
+    keep = minmax_decimate(pts['timestamp'].values, pts['inch'].values, max_points or MAX_POINTS)
+    return pts.iloc[keep]
+
+
+def _iso(dates):
+    return dates.dt.strftime('%Y-%m-%dT%H:%M:%S').to_numpy(dtype=object)
+
+
+def _per_day(*columns):
+    """Entrelace les colonnes (une ligne par jour) en une séquence plate."""
+    return np.column_stack(columns).ravel()
+
+
+def main_daily_layers(daily_stats):
+    """
+    (x, y, customdata) des traces journalières de la figure principale, dans
+    l'ordre des traces 1 à 13 : courbes à midi (min, max, mean, median), paliers
+    [day_start, day_end] de ces statistiques, rectangles d'IC (normal puis non
+    paramétrique) et étiquettes Δ (jour, vs max global, vs min global).
+    Chaque jour occupe un nombre fixe de points, séparés par NaN, ce qui permet
+    de prolonger ces traces jour par jour (extendData). customdata = valeur en mm.
+    """
+    ds = daily_stats
+    start, end, noon = _iso(ds['day_start']), _iso(ds['day_end']), _iso(ds['noon'])
+    gap = np.full(len(ds), np.nan)
+    layers = []
+
+    for stat in MAIN_STATS:
+        y = ds[stat].to_numpy(dtype=float)
+        layers.append((noon, y, y[:, None] * 25.4))
+    for stat in MAIN_STATS:
+        v = ds[stat].to_numpy(dtype=float)
+        y = _per_day(v, v, gap)
+        layers.append((_per_day(start, end, end), y, y[:, None] * 25.4))
+
+    # Rectangles d'IC : polygones fermés, vides (NaN) pour les jours sans IC
+    normal = ds['normal'].fillna(False).to_numpy(dtype=bool)
+    for lo_col, hi_col, keep in (('ci_lower', 'ci_upper', normal),
+                                 ('ci_lower_np', 'ci_upper_np', ~normal)):
+        lo = np.where(keep, ds.get(lo_col, pd.Series(gap)).to_numpy(dtype=float), np.nan)
+        hi = np.where(keep, ds.get(hi_col, pd.Series(gap)).to_numpy(dtype=float), np.nan)
+        y = _per_day(lo, lo, hi, hi, lo, gap)
+        layers.append((_per_day(start, end, end, start, start, start), y, y[:, None] * 25.4))
+
+    # Étiquettes Δ (texte tiré de customdata via texttemplate)
+    for base, offset, col in (('mean', 0.0035, 'diff_mm'),
+                              ('max', 0.0035, 'diff_global_max_mm'),
+                              ('min', -0.0035, 'diff_global_min_mm')):
+        diff = ds[col].to_numpy(dtype=float)
+        y = np.where(np.isnan(diff), np.nan, ds[base].to_numpy(dtype=float) + offset)
+        layers.append((noon, y, diff[:, None]))
+    return layers
+
+
+def _main_daily_styles(colors):
+    """Styles des traces de `main_daily_layers` (même ordre)."""
+    styles = [
+        dict(mode='lines+markers', marker=dict(color=colors[stat]), line=dict(color=colors[stat]),
+             name=stat.capitalize(), legendgroup=stat,
+             hovertemplate=f"{stat.capitalize()}<br>%{{y:.3f}} inch")
+        for stat in MAIN_STATS
+    ]
+    styles += [
+        dict(mode='lines', line=dict(color=colors[stat], width=2), opacity=0.8,
+             legendgroup=stat, showlegend=False, hoverinfo='skip')
+        for stat in MAIN_STATS
+    ]
+    styles += [
+        dict(mode='lines', fill='toself', fillcolor=fill, line=dict(width=0),
+             name=name, hoverinfo='skip')
+        for fill, name in (('rgba(0,128,0,0.2)', 'IC 95 % (normal)'),
+                           ('rgba(128,0,128,0.2)', 'IC 95 % (non param.)'))
+    ]
+    styles += [
+        dict(mode='text', texttemplate=template, textfont=dict(color=colors[stat], size=12),
+             legendgroup=stat, showlegend=False, hoverinfo='skip')
+        for stat, template in (('mean', "Δ = %{customdata[0]:.1f} mm"),
+                               ('max', "Δ max = %{customdata[0]:.1f} mm"),
+                               ('min', "Δ min = %{customdata[0]:.1f} mm"))
+    ]
+    return styles
+
+
 def create_fig_main(df, daily_stats, global_min, global_max, colors):
     """
     Figure principale :
     - la série brute “Mesures” est allégée aux seuls débuts/fins de palier constant,
+      puis décimée (min/max par seau) à `figures.max_points` points ; le callback
+      de zoom de main_route la recalcule à la résolution de la fenêtre visible,
     - les plateaux min/max journaliers sont calculés via ``compute_daily_extrema_timestamps``
       (appelé dans ``calculate_daily_stats``), garantissant qu’aucun palier traversant
-      n’est pris en compte.
+      n’est pris en compte,
+    - paliers, IC et annotations journaliers sont regroupés en quelques traces
+      vectorisées (``main_daily_layers``) au lieu d'une forme par jour.
     """
 
     fig = go.Figure()
 
-    # Correction 1 : Réduire les points affichés aux seuls changements de valeur (début/fin de plateau)
-    if not df.empty:
-        if len(df) > 1:
-            changes = df['inch'].values[1:] != df['inch'].values[:-1]
-            mask1 = np.concatenate(([True], changes))
-            mask2 = np.concatenate((changes, [True]))
-            mask_points = mask1 | mask2
-        else:
-            mask_points = np.array([True], dtype=bool)
-        df_points = df.iloc[mask_points]
-    else:
-        df_points = df
-
     # Nuage de points des mesures (points de changement, transparence pour densité)
+    df_points = main_measurement_points(df)
     fig.add_trace(go.Scatter(
         x=df_points['timestamp'], y=df_points['inch'],
         mode='markers',
@@ -71,57 +187,11 @@ def create_fig_main(df, daily_stats, global_min, global_max, colors):
         hovertemplate='Time: %{x}<br>Inclinaison: %{y:.3f} inch<br>%{customdata[0]:.1f} mm'
     ))
 
-    # Correction 2 : les valeurs min/max quotidiennes sont désormais calculées
-    # uniquement via ``compute_daily_extrema_timestamps`` dans
-    # ``calculate_daily_stats``. On se contente donc d'utiliser les colonnes
-    # 'min' et 'max' déjà présentes dans ``daily_stats``.
-    daily_stats = daily_stats.copy()
-
-    # Lignes horizontales pour min, max, mean, median de chaque jour + trace de ces stats
-    for stat in ['min', 'max', 'mean', 'median']:
-        for _, row in daily_stats.iterrows():
-            if not np.isnan(row[stat]):
-                fig.add_shape(
-                    type="line",
-                    x0=row['day_start'], x1=row['day_end'],
-                    y0=row[stat], y1=row[stat],
-                    line=dict(color=colors[stat], width=2, dash='solid'),
-                    opacity=0.8, xref="x", yref="y"
-                )
-        fig.add_trace(go.Scatter(
-            x=daily_stats['noon'], y=daily_stats[stat],
-            mode='lines+markers',
-            marker=dict(color=colors[stat]),
-            line=dict(color=colors[stat]),
-            name=stat.capitalize(),
-            hovertemplate=f"{stat.capitalize()}<br>%{{y:.3f}} inch"
-        ))
-    # Intervalle de confiance (vert si normal assumé, violet si non-param)
-    for _, row in daily_stats.iterrows():
-        if (
-                row['normal']
-                and not np.isnan(row.get('ci_lower'))
-                and not np.isnan(row.get('ci_upper'))
-        ):
-            fig.add_shape(
-                type="rect",
-                x0=row['day_start'], x1=row['day_end'],
-                y0=row['ci_lower'], y1=row['ci_upper'],
-                fillcolor='rgba(0,128,0,0.2)',
-                line=dict(width=0), xref="x", yref="y"
-            )
-        elif (
-                not row['normal']
-                and not np.isnan(row.get('ci_lower_np', np.nan))
-                and not np.isnan(row.get('ci_upper_np', np.nan))
-        ):
-            fig.add_shape(
-                type="rect",
-                x0=row['day_start'], x1=row['day_end'],
-                y0=row['ci_lower_np'], y1=row['ci_upper_np'],
-                fillcolor='rgba(128,0,128,0.2)',
-                line=dict(width=0), xref="x", yref="y"
-            )
+    # Les valeurs min/max quotidiennes proviennent de ``compute_daily_extrema_timestamps``
+    # (colonnes 'min' et 'max' de ``daily_stats``).
+    for (x, y, custom), style in zip(main_daily_layers(daily_stats), _main_daily_styles(colors)):
+        fig.add_trace(go.Scatter(x=x, y=y, customdata=custom, **style))
+
     # Lignes pointillées pour global min et global max
     fig.add_shape(
         type="line",
@@ -139,40 +209,12 @@ def create_fig_main(df, daily_stats, global_min, global_max, colors):
         line=dict(color=colors['min'], dash='dot', width=2),
         opacity=0.8, layer="above"
     )
-    # Annotations pour les écarts en mm (différences quotidienne et vs global)
-    for _, row in daily_stats.iterrows():
-        if not np.isnan(row.get('diff_mm')):
-            fig.add_annotation(
-                x=row['noon'],
-                y=row['mean'] + 0.0035,
-                text=f"Δ = {row['diff_mm']:.1f} mm",
-                showarrow=False,
-                font=dict(color=colors['mean'], size=12),
-                xref="x", yref="y"
-            )
-        if not np.isnan(row.get('diff_global_max_mm')):
-            fig.add_annotation(
-                x=row['noon'],
-                y=row['max'] + 0.0035,
-                text=f"Δ max = {row['diff_global_max_mm']:.1f} mm",
-                showarrow=False,
-                font=dict(color=colors['max'], size=12),
-                xref="x", yref="y"
-            )
-        if not np.isnan(row.get('diff_global_min_mm')):
-            fig.add_annotation(
-                x=row['noon'],
-                y=row['min'] - 0.0035,
-                text=f"Δ min = {row['diff_global_min_mm']:.1f} mm",
-                showarrow=False,
-                font=dict(color=colors['min'], size=12),
-                xref="x", yref="y"
-            )
     fig.update_layout(
         title="Figure Principale - Évolution de l'inclinaison",
         xaxis_title="Temps",
         yaxis_title="Inclinaison (inch)",
-        hovermode="closest"
+        hovermode="closest",
+        uirevision='main'  # conserve le zoom lorsque les données sont remplacées
     )
     return fig
 
@@ -279,10 +321,9 @@ def create_fig_values(daily_extrema_df, nbinsy_values, colors):
     fig.update_traces(opacity=0.7)
 
     # 6) Ajout des KDE (courbes de densité lissées) si échantillon > 1
-    if len(max_vals) > 1:
-        from scipy.stats import gaussian_kde
-        kde_max = gaussian_kde(max_vals)
-        kde_min = gaussian_kde(min_vals)
+    kde_max = kde_density(max_vals)
+    kde_min = kde_density(min_vals)
+    if kde_max is not None and kde_min is not None:
         y_range = np.linspace(value_min, value_max, 200)
         # Mise à l’échelle des densités pour obtenir une probabilité par bin
         kde_max_vals = kde_max(y_range) * bin_width
@@ -387,12 +428,9 @@ def create_fig_hours(min_times, max_times, nbinsx_hours):
     fig.update_traces(opacity=0.7)
 
     # 4) Ajout des KDE si données suffisantes
-    from scipy.stats import gaussian_kde
-    valid_min = hrs_min[~np.isnan(hrs_min)]
-    valid_max = hrs_max[~np.isnan(hrs_max)]
-    if len(valid_min) > 1 and len(valid_max) > 1:
-        kde_hours_min = gaussian_kde(valid_min)
-        kde_hours_max = gaussian_kde(valid_max)
+    kde_hours_min = kde_density(hrs_min, period=24.0)
+    kde_hours_max = kde_density(hrs_max, period=24.0)
+    if kde_hours_min is not None and kde_hours_max is not None:
         kde_hours_min_vals = kde_hours_min(x_range_hours)
         kde_hours_max_vals = kde_hours_max(x_range_hours)
         fig.add_trace(go.Scatter(
@@ -998,3 +1036,176 @@ def create_fig_forecast(df: pd.DataFrame, forecast_df: pd.DataFrame, horizon_day
         hovermode="closest"
     )
     return fig
+
+
+# ---------------------------------------------------------- Rendu et budget des figures
+def _n_points(trace) -> int:
+    for key in ('x', 'y'):
+        values = getattr(trace, key, None)
+        if values is not None:
+            return len(values)
+    return 0
+
+
+def _fill_groups(traces) -> List[List[int]]:
+    """
+    Indices des traces regroupés par remplissage : une trace `fill='tonext*'`
+    remplit jusqu'à la trace précédente, qui doit donc partager son backend.
+    """
+    groups: List[List[int]] = []
+    for i, trace in enumerate(traces):
+        if groups and str(getattr(trace, 'fill', None) or '').startswith('tonext'):
+            groups[-1].append(i)
+        else:
+            groups.append([i])
+    return groups
+
+
+def _use_webgl(traces) -> bool:
+    """
+    Groupe de remplissage éligible à Scattergl : uniquement des traces scatter
+    sans texte (Scattergl gère `tozero*` et `tonext*`), converti en bloc.
+    """
+    if any(t.type != 'scatter' or 'text' in (t.mode or '') for t in traces):
+        return False
+    return BACKEND == 'webgl' or (BACKEND == 'auto' and max(_n_points(t) for t in traces) > WEBGL_THRESHOLD)
+
+
+def _dropped_keys(src: dict, dst: dict, prefix: str = '') -> List[str]:
+    """Propriétés de `src` absentes de `dst` (écartées par skip_invalid), en notation pointée."""
+    dropped = []
+    for key, value in src.items():
+        if key not in dst:
+            dropped.append(prefix + key)
+        elif isinstance(value, dict) and isinstance(dst[key], dict):
+            dropped += _dropped_keys(value, dst[key], f"{prefix}{key}.")
+    return dropped
+
+
+def _to_webgl(trace, name: str, index: int):
+    src = trace.to_plotly_json()
+    src.pop('type', None)
+    converted = go.Scattergl(src, skip_invalid=True)
+    dropped = _dropped_keys(src, converted.to_plotly_json())
+    if dropped:
+        print(f"[AVERTISSEMENT] {name} : propriétés ignorées en WebGL (trace {index}) : {', '.join(dropped)}")
+    return converted
+
+
+def _decimate_trace(trace, max_points: int) -> None:
+    """Décimation min/max d'une trace scatter à x croissant (sinon inchangée)."""
+    x = np.asarray(trace.x)
+    if len(x) <= max_points or x.dtype.kind not in 'iufM' or np.any(x[1:] < x[:-1]):
+        return
+    y = np.asarray(trace.y, dtype=float)
+    keep = minmax_decimate(x, y, max_points)
+    trace.x, trace.y = x[keep], y[keep]
+    if trace.customdata is not None:
+        trace.customdata = np.asarray(trace.customdata)[keep]
+
+
+def apply_render_policy(fig, name: str):
+    """
+    Applique à `fig` (en place) le backend de rendu `figures.backend` et le
+    budget de taille de la figure : au-delà de `figures.budget_points` points,
+    les traces scatter à x croissant sont décimées proportionnellement ; tout
+    dépassement, y compris d'un JSON de plus de `figures.budget_bytes` octets,
+    est signalé en console.
+    """
+    n_points = sum(_n_points(t) for t in fig.data)
+    if n_points > BUDGET_POINTS:
+        ratio = BUDGET_POINTS / n_points
+        for trace in fig.data:
+            if trace.type in ('scatter', 'scattergl'):
+                _decimate_trace(trace, max(int(_n_points(trace) * ratio), 2))
+        reduced = sum(_n_points(t) for t in fig.data)
+        print(f"[BUDGET] {name} : {n_points} points > {BUDGET_POINTS}, réduits à {reduced}.")
+
+    traces = list(fig.data)
+    webgl = [i for group in _fill_groups(traces) if _use_webgl([traces[j] for j in group]) for i in group]
+    if webgl:
+        for i in webgl:
+            traces[i] = _to_webgl(traces[i], name, i)
+        fig.data = []
+        fig.add_traces(traces)
+
+    n_bytes = len(pio.to_json(fig, validate=False))
+    if n_bytes > BUDGET_BYTES:
+        print(f"[BUDGET] {name} : {n_bytes / 1e6:.1f} Mo de JSON > {BUDGET_BYTES / 1e6:.1f} Mo.")
+    return fig
+
+
+# ---------------------------------------------------------- Mise à jour incrémentale (mode live)
+# Chaque fonction `extend_*` renvoie la charge utile `extendData` de dcc.Graph,
+# `(mise_à_jour, indices_des_traces)`, qui ajoute de nouveaux points aux traces
+# de la figure créée par le `create_*` correspondant (même ordre de traces).
+
+def extend_fig_main(df_new, daily_new):
+    """
+    Nouvelles mesures (trace 0, réduite aux débuts/fins de palier) et couches
+    journalières des jours nouvellement clos (traces 1 à 13). Le troisième
+    élément (maxPoints d'extendData) borne chaque trace côté navigateur au
+    budget `figures.max_points` : dans un onglet resté ouvert, les points les
+    plus anciens de la trace 0 sont abandonnés (un zoom ou un rechargement
+    recalcule la trace décimée sur tout l'historique).
+    """
+    pts = df_new.iloc[plateau_change_mask(df_new['inch'].values)]
+    layers = [(pts['timestamp'].values, pts['inch'].values, pts[['mm']].values)]
+    layers += main_daily_layers(daily_new)
+    update = {
+        'x': [x for x, _, _ in layers],
+        'y': [y for _, y, _ in layers],
+        'customdata': [c for _, _, c in layers],
+    }
+    return update, list(range(len(layers))), MAX_POINTS
+
+
+def extend_fig_values_timeseries(daily_new):
+    """Jours nouvellement clos : bande min/max (traces 0-1) et courbes (traces 2-5)."""
+    ds = daily_new.sort_values('day_start')
+    stats = ['max', 'min', 'min', 'mean', 'median', 'max']
+    update = {
+        'x': [ds['day_start'].values] * len(stats),
+        'y': [ds[stat].values for stat in stats],
+    }
+    return update, list(range(len(stats)))
+
+
+def extend_fig_diff_min_max_timeseries(daily_new):
+    update = {
+        'x': [daily_new['day_start'].values],
+        'y': [(daily_new['max'] - daily_new['min']).values],
+    }
+    return update, [0]
+
+
+def apply_extension(fig, extension):
+    """
+    Applique côté serveur une charge `extendData` à la figure `fig` (en place).
+    Un éventuel maxPoints est ignoré : la copie serveur est ramenée au budget
+    par `rebudget_fig_main`.
+    """
+    update, indices = extension[:2]
+    for key, arrays in update.items():
+        for idx, new in zip(indices, arrays):
+            if len(new) == 0:
+                continue
+            trace = fig.data[idx]
+            old = trace[key]
+            trace[key] = new if old is None else np.concatenate([np.asarray(old), np.asarray(new)])
+    return fig
+
+
+def rebudget_fig_main(fig, df):
+    """
+    Trace « Mesures » (trace 0) de la figure principale recalculée sur `df` au
+    budget `figures.max_points` lorsque les prolongements successifs (mode
+    live) l'ont fait dépasser ; les couches journalières (un point par jour)
+    restent telles quelles.
+    """
+    if _n_points(fig.data[0]) <= MAX_POINTS:
+        return fig
+    pts = main_measurement_points(df)
+    fig.data[0].x, fig.data[0].y = pts['timestamp'].values, pts['inch'].values
+    fig.data[0].customdata = pts[['mm']].values
+    return fig
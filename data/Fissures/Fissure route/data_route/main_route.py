@@ -3,20 +3,30 @@
 Point d’entrée Dash – inclut les onglets “Distributions & Analyses” (heures et valeurs),
 l’onglet de corrélation Heure/Valeur et l’onglet de prévisions Prophet.
 """
+import json
 import os
+import threading
+import time
 import warnings
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
 from datetime import datetime
+from functools import lru_cache
 import pandas as pd
 import numpy as np
 import dash
-from dash import dcc, html
+from dash import dcc, html, Input, Output, State, Patch, no_update
+from dash.exceptions import PreventUpdate
 from rich.console import Console
 from rich.table import Table
 from rich.panel import Panel
 import paramiko
+import plotly.graph_objects as go
 
 from data_loader import load_data, fetch_remote_csv
-from aggregation import aggregate_by_half_hour, extract_extremes, calculate_daily_stats, calculate_confidence_intervals
+from quality import pending_since
+from ssh_session import get_session
+from profiling import stage, mark, print_stage_summary, write_trace
+from aggregation import HalfHourCube, aggregate_by_half_hour, extract_extremes, calculate_daily_stats, calculate_confidence_intervals
 from stats_calculator import (
     compute_confidence_intervals_hours,
     compute_extremes_stats,
@@ -39,9 +49,17 @@ from figures import (
     create_fig_diff_min_max_timeseries,
     create_fig_values_law_comparison,
     create_fig_qq_values,
-    create_fig_forecast
+    create_fig_forecast,
+    extend_fig_main,
+    extend_fig_values_timeseries,
+    extend_fig_diff_min_max_timeseries,
+    apply_extension,
+    rebudget_fig_main,
+    apply_render_policy,
+    main_measurement_points,
+    main_daily_layers,
 )
-from time_calculator import get_extreme_half_hours, calculate_central_times
+from time_calculator import calculate_central_times
 from time_calculator import compute_daily_extrema_timestamps
 from prophet import Prophet  # import du modèle Prophet pour les prévisions
 
@@ -63,159 +81,154 @@ REMOTE_CSV     = cfg["paths"]["remote_csv"]
 BACKUP_DIR     = cfg["paths"]["local_backup_dir"]
 MIN_DT_SECONDS = cfg["analysis"]["min_interval_seconds"]
 WINDOW_HALF    = cfg["analysis"]["window_half_width"]
+# Période de rafraîchissement du mode live (s) ; 0 → tableau de bord statique
+LIVE_INTERVAL_S = cfg.get("live", {}).get("interval_seconds", 0)
 
-hostname = cfg["ssh"]["host"]
-port     = cfg["ssh"]["port"]
 username = cfg["ssh"]["user"]
-password = cfg["ssh"]["password"]
+STATUS_TIMEOUT = cfg["ssh"].get("status_timeout", 15)
+STATUS_CACHE = Path(LOCAL_CSV).with_name("pi_status.json")
 
 console = Console()
 
+# Les quatre sondes (disque, mémoire, service, date du CSV) en une seule commande
+# distante ; les sorties sont séparées par STATUS_SEP.
+STATUS_SEP = "---8<---"
+STATUS_COMMAND = f" ; echo '{STATUS_SEP}' ; ".join([
+    f"df -h /home/{username} | awk 'NR==2{{print $2, $3, $4, $5}}'",
+    "free -m | awk 'NR==2{print $2, $3, $3*100/$2}'",
+    "systemctl is-active comparator.service",
+    f"stat -c %y {REMOTE_CSV}",
+])
 
-def print_system_status():
-    console = Console()
-    # Connexion SSH au Raspberry Pi
-    client = paramiko.SSHClient()
-    client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-    client.connect(hostname, port=port, username=username, password=password, timeout=10)
-
-    # Disk usage sur /home
-    stdin, stdout, stderr = client.exec_command(f"df -h /home/{username}")
-    out = stdout.read().decode().splitlines()
-    if len(out) > 1:
-        parts = out[1].split()
-        total, used, avail, percent = parts[1], parts[2], parts[3], parts[4]
-    else:
-        total = used = avail = percent = "N/A"
-
-    # Memory usage
-    stdin, stdout, stderr = client.exec_command("free -m | awk 'NR==2{print $2, $3, $3*100/$2}'")
-    mem_vals = stdout.read().decode().split()
-    if len(mem_vals) == 3:
-        mem_total_m, mem_used_m, mem_percent = mem_vals
-        mem_total_gb = float(mem_total_m) / 1024
-        mem_used_gb = float(mem_used_m) / 1024
-    else:
-        mem_total_gb = mem_used_gb = mem_percent = "N/A"
-
-    # Service status
-    stdin, stdout, stderr = client.exec_command("systemctl is-active comparator.service")
-    svc_status = stdout.read().decode().strip() or "unknown"
-
-    # Last CSV timestamp
-    stdin, stdout, stderr = client.exec_command(f"stat -c %y {REMOTE_CSV}")
-    ts_line = stdout.read().decode().strip()
-    last_ts = ts_line.split('.')[0] if ts_line else "unknown"
-
-    client.close()
 
+def probe_system_status() -> dict:
+    """
+    Interroge le Raspberry Pi via la session SSH partagée. Le dernier état obtenu
+    est conservé dans STATUS_CACHE ; si le Pi ne répond pas, cet état est renvoyé
+    avec `offline=True`.
+    """
+    try:
+        with stage("sonde d'état du Pi (SSH)"):
+            out = get_session().exec(STATUS_COMMAND, timeout=STATUS_TIMEOUT)
+    except (OSError, EOFError, paramiko.SSHException) as exc:
+        print(f"[ERREUR] sonde d'état du Pi : {exc}")
+        return _cached_status()
+
+    disk, mem, svc, stamp = (part.split() for part in (out.split(STATUS_SEP) + [""] * 4)[:4])
+    status = {
+        'disk': disk if len(disk) == 4 else None,           # total, used, avail, percent
+        'mem': [float(v) for v in mem] if len(mem) == 3 else None,  # total_m, used_m, percent
+        'service': svc[0] if svc else "unknown",
+        'last_csv_update': " ".join(stamp[:2]).split('.')[0] if stamp else "unknown",
+        'probed_at': datetime.now().isoformat(timespec="seconds"),
+        'offline': False,
+    }
+    STATUS_CACHE.parent.mkdir(parents=True, exist_ok=True)
+    with STATUS_CACHE.open("w", encoding="utf-8") as f:
+        json.dump(status, f)
+    return status
+
+
+def _cached_status() -> dict:
+    status = {}
+    if STATUS_CACHE.exists():
+        with STATUS_CACHE.open(encoding="utf-8") as f:
+            status = json.load(f)
+    status['offline'] = True
+    return status
+
+
+def print_system_status(status: dict):
     table = Table(show_header=True, header_style="bold cyan")
     table.add_column("Resource", style="dim")
     table.add_column("Status")
-    table.add_row("Disk Usage", f"{used}/{total} ({percent}) on Pi")
-    table.add_row("Memory Usage", f"{mem_used_gb:.1f}/{mem_total_gb:.1f} GB ({float(mem_percent):.1f}%) on Pi")
-    table.add_row("ComparatorSvc", svc_status)
-    table.add_row("Last CSV update", last_ts)
 
-    console.print(Panel(table, title="Raspberry Pi Status", expand=False))
-
-
-# ---------------------------------------------------------- 1. FETCH / LOAD
-print_system_status()
-fetch_remote_csv()
-df = load_data(START_DAY_STR, END_DAY_STR)
-
-# ─── Supprime les deux mesures erronées ────────────────────────────────────────
-err_ts = [
-    "2025-05-25T13:18:06.391823",
-    "2025-05-25T13:18:06.687862"
-]
-df = df[~df['timestamp'].isin(pd.to_datetime(err_ts))]
-# ───────────────────────────────────────────────────────────────────────────────
-
-# ---------------------------------------------------------- 2. Statistiques quotidiennes
-daily_stats, gmin, gmax = calculate_daily_stats(df)
-daily_stats = calculate_confidence_intervals(df, daily_stats)
-
-# ---------------------------------------------------------- 3. Heures centrales des extrêmes
-daily_extrema_df = compute_daily_extrema_timestamps(df)
-min_times, max_times = calculate_central_times(df, daily_stats)
-min_times = np.array(min_times, dtype=float)
-max_times = np.array(max_times, dtype=float)
-
-# ---------------------------------------------------------- 4. Agrégation par demi-heure
-df_half_mean, df_half_med, jour_moyen, jour_median = aggregate_by_half_hour(df)
-ext_hr = get_extreme_half_hours(df_half_mean, df_half_med)
-extremes = extract_extremes(df_half_mean, df_half_med)
-
-
-# ---------------------------------------------------------- 5. Bootstrap IC (½-h)
-def _ic(series):
-    res = compute_confidence_intervals_hours(series.dropna().values)
-    lo, hi = res['ic_boot_mean_lo'], res['ic_boot_mean_hi']
-    return (lo + hi) / 2, (hi - lo) / 2, f"IC bootstrap [{lo:.2f} h – {hi:.2f} h]"
+    if status.get('disk'):
+        total, used, avail, percent = status['disk']
+        table.add_row("Disk Usage", f"{used}/{total} ({percent}) on Pi")
+    else:
+        table.add_row("Disk Usage", "N/A")
+    if status.get('mem'):
+        mem_total_m, mem_used_m, mem_percent = status['mem']
+        table.add_row("Memory Usage",
+                      f"{mem_used_m / 1024:.1f}/{mem_total_m / 1024:.1f} GB ({mem_percent:.1f}%) on Pi")
+    else:
+        table.add_row("Memory Usage", "N/A")
+    table.add_row("ComparatorSvc", status.get('service', "unknown"))
+    table.add_row("Last CSV update", status.get('last_csv_update', "unknown"))
 
+    title = "Raspberry Pi Status"
+    if status.get('offline'):
+        probed_at = status.get('probed_at')
+        title += f" – hors ligne (dernier état : {probed_at})" if probed_at else " – hors ligne"
+    console.print(Panel(table, title=title, expand=False))
 
-centers = {}
-for key, ser in (
-        ('jour_moyen_max', ext_hr['max_half_times_mean']),
-        ('jour_moyen_min', ext_hr['min_half_times_mean']),
-        ('jour_median_max', ext_hr['max_half_times_median']),
-        ('jour_median_min', ext_hr['min_half_times_median'])
-):
-    centers[key] = _ic(ser)
-
-# ---------------------------------------------------------- 6. Statistiques d'extrêmes journaliers
-ext_stats = compute_extremes_stats(df)
-
-# 1. Heures brutes d'extrêmes
-h_min = min_times
-h_max = max_times
-
-# 2. Isolation du cluster principal (heures)
-h_max_cluster = get_primary_peak_hours(h_max, window_half_width=WINDOW_HALF)
-h_min_cluster = get_primary_peak_hours(h_min, window_half_width=WINDOW_HALF)
-
-# 3. Ajustement de lois et IC95 paramétriques sur le cluster (pour Jour MOYEN)
-law_max_cl, params_max_cl = fit_distributions_hours(h_max_cluster)
-ci_max_cl = compute_parametric_ci(law_max_cl, params_max_cl)
-jm_center_max = ci_max_cl['mode']
-jm_margin_max = (ci_max_cl['hi'] - ci_max_cl['lo']) / 2
-jm_annot_max = (
-        f"Cluster MAX → {law_max_cl}  params=["
-        + ", ".join(f"{p:.2f}" for p in params_max_cl)
-        + f"],  IC95=[{ci_max_cl['lo']:.2f},{ci_max_cl['hi']:.2f}]  mode={ci_max_cl['mode']:.2f}"
-)
 
-law_min_cl, params_min_cl = fit_distributions_hours(h_min_cluster)
-ci_min_cl = compute_parametric_ci(law_min_cl, params_min_cl)
-jm_center_min = ci_min_cl['mode']
-jm_margin_min = (ci_min_cl['hi'] - ci_min_cl['lo']) / 2
-jm_annot_min = (
-        f"Cluster MIN → {law_min_cl}  params=["
-        + ", ".join(f"{p:.2f}" for p in params_min_cl)
-        + f"],  IC95=[{ci_min_cl['lo']:.2f},{ci_min_cl['hi']:.2f}]  mode={ci_min_cl['mode']:.2f}"
-)
+# ---------------------------------------------------------- 1. FETCH / LOAD
+# Données partagées par les callbacks, chargées par `load_pipeline()` au
+# lancement et non à l'import : les processus de calcul (spawn/forkserver)
+# réimportent le module principal.
+df = daily_stats = gmin = gmax = fig_main = None
+
+# Version des données : incrémentée (mode live) à chaque nouveau jour, elle
+# invalide les analyses et le contenu des onglets mémorisés.
+data_version = 0
+
+
+def load_pipeline():
+    """Rapatriement, chargement, statistiques quotidiennes et figure principale."""
+    global df, daily_stats, gmin, gmax, fig_main
+    # La sonde d'état tourne en parallèle du rapatriement et du chargement des données.
+    probe_pool = ThreadPoolExecutor(max_workers=1)
+    status_probe = probe_pool.submit(probe_system_status)
+    probe_pool.shutdown(wait=False)
+    with stage("rapatriement du CSV (SFTP)"):
+        fetch_remote_csv()
+    with stage("chargement des mesures") as st:
+        df = _decided(load_data(START_DAY_STR, END_DAY_STR))
+        st.rows = len(df)
+    try:
+        print_system_status(status_probe.result(timeout=STATUS_TIMEOUT))
+    except FuturesTimeout:
+        print_system_status(_cached_status())
+
+    # ------------------------------------------------------ 2. Statistiques quotidiennes
+    with stage("statistiques quotidiennes", rows=len(df)):
+        daily_stats, gmin, gmax = calculate_daily_stats(df)
+        daily_stats = calculate_confidence_intervals(df, daily_stats)
+
+    # Figure principale (série temporelle complète avec stats quotidiennes) : seule
+    # figure construite au démarrage, les autres onglets sont calculés à l'ouverture.
+    with stage("figure principale", rows=len(df)):
+        fig_main = apply_render_policy(
+            create_fig_main(df, daily_for_figures(df, daily_stats), gmin, gmax, colors), 'fig_main'
+        )
+    print_stage_summary("Démarrage – étapes du pipeline")
+    write_trace()
+
+
+def _decided(data: pd.DataFrame) -> pd.DataFrame:
+    """
+    Mesures déjà jugées par le filtre qualité : les dernières lignes du CSV,
+    encore en attente, ne sont publiées (figure, statistiques) qu'au
+    rafraîchissement suivant, une fois leur sort connu.
+    """
+    since = pending_since()
+    return data if since is None else data[data['timestamp'] < since]
+
+
+def closed_days(data: pd.DataFrame, daily: pd.DataFrame) -> pd.DataFrame:
+    """Statistiques des jours clos (antérieurs au dernier jour présent dans les mesures)."""
+    return daily[daily['day'] < data['day'].max()]
+
+
+def daily_for_figures(data: pd.DataFrame, daily: pd.DataFrame) -> pd.DataFrame:
+    """
+    En mode live, les séries journalières ne montrent que les jours clos : le
+    jour courant y est ajouté (extendData) une fois terminé.
+    """
+    return closed_days(data, daily) if LIVE_INTERVAL_S else daily
 
-# Pour le jour médian, on réutilise les mêmes paramètres que jour moyen
-md_center_max, md_margin_max, md_annot_max = jm_center_max, jm_margin_max, jm_annot_max
-md_center_min, md_margin_min, md_annot_min = jm_center_min, jm_margin_min, jm_annot_min
-
-# Debug : affichage console des résultats bootstrap sur extrêmes quotidiens
-print("\n──────── Bootstrap : Heures extrêmes quotidiennes ────────")
-for lab in ("max", "min"):
-    s = ext_stats[lab]
-    ci = s['ci']
-    print(f"{lab.upper()} → {s['law']}  params={s['params']}  "
-          f"µ CI95 [{ci['mean_lo']:.2f},{ci['mean_hi']:.2f}]  "
-          f"médiane CI95 [{ci['median_lo']:.2f},{ci['median_hi']:.2f}]  "
-          f"σ CI95 [{ci['sigma_lo']:.2f},{ci['sigma_hi']:.2f}]")
-
-# ---------------------------------------------------------- 7. Préparation pour analyses des valeurs
-# Bins de 0.01 inch et agrégation pour valeur vs heure
-df['inch_bin'] = (df['inch'] // 0.01) * 0.01
-df_bin_mean = df.groupby('inch_bin')['hour'].mean().reset_index()
-df_bin_med = df.groupby('inch_bin')['hour'].median().reset_index()
 
 # Couleurs utilisées dans les figures
 colors = {
@@ -225,100 +238,208 @@ colors = {
     'median': 'rgba(255,165,0,0.8)'  # orange pour médiane
 }
 
-# ---------------------------------------------------------- 8. Création des figures
-# Figure principale (série temporelle complète avec stats quotidiennes)
-fig_main = create_fig_main(df, daily_stats, gmin, gmax, colors)
 
-# Distributions des valeurs extrêmes (MAX/MIN) avec KDE et clusters
-nbinsy_values = 25
-fig_values = create_fig_values(daily_extrema_df, nbinsy_values, colors)
+# ---------------------------------------------------------- 3-7. Analyses (à la demande)
+def _ic(series):
+    res = compute_confidence_intervals_hours(series.dropna().values)
+    lo, hi = res['ic_boot_mean_lo'], res['ic_boot_mean_hi']
+    return (lo + hi) / 2, (hi - lo) / 2, f"IC bootstrap [{lo:.2f} h – {hi:.2f} h]"
 
-# Distributions des heures extrêmes (MIN/MAX) avec KDE et clusters
-nbinsx_hours = 24
-fig_hours = create_fig_hours(min_times, max_times, nbinsx_hours)
-
-# Série temporelle des valeurs quotidiennes (min, max, moyenne, médiane)
-fig_values_ts = create_fig_values_timeseries(daily_stats, colors)
-# Série temporelle de la différence Max–Min chaque jour
-fig_diff_ts = create_fig_diff_min_max_timeseries(daily_stats, gray_color='rgba(128,128,128,0.6)')
-
-# Δ densités (écart empiriques vs théoriques) pour les heures des extrêmes (lois ajustées)
-fig_diff_hours = create_fig_hours_law_comparison(
-    max_times, min_times,
-    # lois ajustées sur cluster (jours types)
-    law_max_cl, params_max_cl,
-    law_min_cl, params_min_cl,
-    nbinsx_hours,
-    title="Δ Densités – Heures des extrêmes"
-)
 
-# Calcul des lois optimales pour les valeurs extrêmes journalières (max et min)
-val_ext_stats = compute_value_extremes_stats(daily_stats)
-# Δ densités + PDF pour valeurs extrêmes (empirique vs lois ajustées)
-fig_diff_values = create_fig_values_law_comparison(
-    daily_stats['max'].values,
-    daily_stats['min'].values,
-    val_ext_stats['max']['law'], val_ext_stats['max']['params'],
-    val_ext_stats['min']['law'], val_ext_stats['min']['params'],
-    nbins=nbinsy_values,
-    title="Δ Densités – Valeurs des extrêmes"
-)
+def _cluster_annotation(label, law, params, ci):
+    return (
+            f"Cluster {label} → {law}  params=["
+            + ", ".join(f"{p:.2f}" for p in params)
+            + f"],  IC95=[{ci['lo']:.2f},{ci['hi']:.2f}]  mode={ci['mode']:.2f}"
+    )
+
+
+@lru_cache(maxsize=2)
+def analyses(version: int) -> dict:
+    """
+    Statistiques des onglets « Distributions & Analyses » pour la version
+    `version` des données (mémorisées : un onglet rouvert ne recalcule rien).
+    """
+    a = {}
+    # ------------------------------------------------------ 3. Heures centrales des extrêmes
+    with stage("extrêmes journaliers", rows=len(df)):
+        a['daily_extrema_df'] = compute_daily_extrema_timestamps(df)
+        min_times, max_times = calculate_central_times(df, daily_stats)
+        a['min_times'] = np.array(min_times, dtype=float)
+        a['max_times'] = np.array(max_times, dtype=float)
+
+    # ------------------------------------------------------ 4. Agrégation par demi-heure
+    with stage("agrégation par demi-heure", rows=len(df)):
+        cube = HalfHourCube.from_frame(df)
+        df_half_mean, df_half_med, a['jour_moyen'], a['jour_median'] = aggregate_by_half_hour(df, cube)
+        ext_hr = cube.extreme_half_hours()
+        a['extremes'] = extract_extremes(df_half_mean, df_half_med)
+
+    # ------------------------------------------------------ 5. Bootstrap IC (½-h)
+    a['centers'] = {}
+    with stage("bootstrap IC (½-h)", rows=len(ext_hr['max_half_times_mean'])):
+        for key, ser in (
+                ('jour_moyen_max', ext_hr['max_half_times_mean']),
+                ('jour_moyen_min', ext_hr['min_half_times_mean']),
+                ('jour_median_max', ext_hr['max_half_times_median']),
+                ('jour_median_min', ext_hr['min_half_times_median'])
+        ):
+            a['centers'][key] = _ic(ser)
+
+    # ------------------------------------------------------ 6. Statistiques d'extrêmes journaliers
+    with stage("lois + bootstrap des extrêmes journaliers", rows=len(a['max_times'])):
+        ext_stats = a['ext_stats'] = compute_extremes_stats(df)
+
+    # Isolation du cluster principal (heures), ajustement de lois et IC95
+    # paramétriques sur le cluster (pour Jour MOYEN ; le jour médian réutilise
+    # les mêmes paramètres)
+    with stage("clusters d'heures + ajustements", rows=len(a['max_times'])):
+        for lab in ("max", "min"):
+            cluster = get_primary_peak_hours(a[f'{lab}_times'], window_half_width=WINDOW_HALF)
+            law, params = fit_distributions_hours(cluster)
+            ci = compute_parametric_ci(law, params)
+            a[f'law_{lab}_cl'], a[f'params_{lab}_cl'] = law, params
+            a[f'jm_center_{lab}'] = ci['mode']
+            a[f'jm_margin_{lab}'] = (ci['hi'] - ci['lo']) / 2
+            a[f'jm_annot_{lab}'] = _cluster_annotation(lab.upper(), law, params, ci)
+
+    # Debug : affichage console des résultats bootstrap sur extrêmes quotidiens
+    print("\n──────── Bootstrap : Heures extrêmes quotidiennes ────────")
+    for lab in ("max", "min"):
+        s = ext_stats[lab]
+        ci = s['ci']
+        print(f"{lab.upper()} → {s['law']}  params={s['params']}  "
+              f"µ CI95 [{ci['mean_lo']:.2f},{ci['mean_hi']:.2f}]  "
+              f"médiane CI95 [{ci['median_lo']:.2f},{ci['median_hi']:.2f}]  "
+              f"σ CI95 [{ci['sigma_lo']:.2f},{ci['sigma_hi']:.2f}]")
+
+    # ------------------------------------------------------ 7. Préparation pour analyses des valeurs
+    # Bins de 0.01 inch et agrégation pour valeur vs heure
+    with stage("valeur vs heure (bins 0.01 inch)", rows=len(df)):
+        binned = df.assign(inch_bin=(df['inch'] // 0.01) * 0.01)
+        a['df_bin_mean'] = binned.groupby('inch_bin')['hour'].mean().reset_index()
+        a['df_bin_med'] = binned.groupby('inch_bin')['hour'].median().reset_index()
+
+    # Lois optimales et clusters pour les valeurs extrêmes journalières (max et min)
+    with stage("lois et clusters des valeurs extrêmes", rows=len(daily_stats)):
+        a['val_ext_stats'] = compute_value_extremes_stats(daily_stats)
+        a['val_clusters'] = compute_value_clusters(daily_stats, window_half_width=0.1)
+        a['val_cluster_stats'] = compute_value_cluster_stats(daily_stats, window_half_width=0.1)
+    return a
+
+
+# ---------------------------------------------------------- 8. Création des figures (à la demande)
+nbinsy_values = 25
+nbinsx_hours = 24
 
-# QQ-plots des heures des extrêmes (global vs cluster)
-fig_qq_hours = create_fig_qq_dual_laws(
-    max_times, min_times,
-    # lois globales ajustées (console)
-    ext_stats['max']['law'], ext_stats['max']['params'],
-    ext_stats['min']['law'], ext_stats['min']['params'],
-    # lois ajustées sur clusters (jours types)
-    law_max_cl, params_max_cl,
-    law_min_cl, params_min_cl,
-    title="QQ plots – Heures des extrêmes"
-)
 
-# Clusters de valeurs (autour du pic de densité principal) et lois ajustées sur ces clusters
-val_clusters = compute_value_clusters(daily_stats, window_half_width=0.1)
-val_cluster_stats = compute_value_cluster_stats(daily_stats, window_half_width=0.1)
-
-# QQ-plots des valeurs extrêmes (global vs cluster, avec annotations sur lois clusters)
-fig_qq_values = create_fig_qq_values(
-    daily_stats['max'].values,
-    daily_stats['min'].values,
-    val_clusters['cluster_max'],
-    val_clusters['cluster_min'],
-    # lois globales ajustées
-    val_ext_stats['max']['law'], val_ext_stats['max']['params'],
-    val_ext_stats['min']['law'], val_ext_stats['min']['params'],
-    # lois ajustées sur clusters
-    val_cluster_stats['max']['law'], val_cluster_stats['max']['params'],
-    val_cluster_stats['min']['law'], val_cluster_stats['min']['params'],
-    title="QQ plots – Valeurs des extrêmes"
-)
+@lru_cache(maxsize=2)
+def distribution_figures(version: int) -> dict:
+    """Figures communes aux deux onglets d'analyse."""
+    a = analyses(version)
+    return {
+        # Distributions des valeurs extrêmes (MAX/MIN) avec KDE et clusters
+        'fig_values': create_fig_values(a['daily_extrema_df'], nbinsy_values, colors),
+        # Distributions des heures extrêmes (MIN/MAX) avec KDE et clusters
+        'fig_hours': create_fig_hours(a['min_times'], a['max_times'], nbinsx_hours),
+    }
+
+
+@lru_cache(maxsize=2)
+def hours_figures(version: int) -> dict:
+    a = analyses(version)
+    ext_stats = a['ext_stats']
+    figs = dict(distribution_figures(version))
+
+    # Figures "Jour moyen" et "Jour médian" (évolution sur 24h)
+    figs['fig_jour_moyen'] = create_fig_jour(
+        a['jour_moyen'], "Jour moyen",
+        a['extremes']['max_half_mean'], a['extremes']['min_half_mean'],
+        a['jm_annot_max'], a['jm_annot_min'],
+        a['jm_center_max'], a['jm_margin_max'],
+        a['jm_center_min'], a['jm_margin_min'],
+        colors,
+        format_half_hour_func=lambda hh: None,  # la fonction format_half_hour n'est pas utilisée dans la figure
+    )
+    figs['fig_jour_median'] = create_fig_jour(
+        a['jour_median'], "Jour médian",
+        a['extremes']['max_half_median'], a['extremes']['min_half_median'],
+        a['jm_annot_max'], a['jm_annot_min'],
+        a['jm_center_max'], a['jm_margin_max'],
+        a['jm_center_min'], a['jm_margin_min'],
+        colors,
+        format_half_hour_func=lambda hh: None,
+        base_data=a['jour_moyen']
+    )
+
+    # Δ densités (écart empiriques vs théoriques) pour les heures des extrêmes (lois ajustées)
+    figs['fig_diff_hours'] = create_fig_hours_law_comparison(
+        a['max_times'], a['min_times'],
+        # lois ajustées sur cluster (jours types)
+        a['law_max_cl'], a['params_max_cl'],
+        a['law_min_cl'], a['params_min_cl'],
+        nbinsx_hours,
+        title="Δ Densités – Heures des extrêmes"
+    )
+
+    # QQ-plots des heures des extrêmes (global vs cluster)
+    figs['fig_qq_hours'] = create_fig_qq_dual_laws(
+        a['max_times'], a['min_times'],
+        # lois globales ajustées (console)
+        ext_stats['max']['law'], ext_stats['max']['params'],
+        ext_stats['min']['law'], ext_stats['min']['params'],
+        # lois ajustées sur clusters (jours types)
+        a['law_max_cl'], a['params_max_cl'],
+        a['law_min_cl'], a['params_min_cl'],
+        title="QQ plots – Heures des extrêmes"
+    )
+    return {name: apply_render_policy(fig, name) for name, fig in figs.items()}
+
+
+@lru_cache(maxsize=2)
+def values_figures(version: int) -> dict:
+    a = analyses(version)
+    val_ext_stats, val_clusters, val_cluster_stats = (
+        a['val_ext_stats'], a['val_clusters'], a['val_cluster_stats']
+    )
+    daily_fig = daily_for_figures(df, daily_stats)
+    figs = dict(distribution_figures(version))
+
+    # Série temporelle des valeurs quotidiennes (min, max, moyenne, médiane)
+    figs['fig_values_ts'] = create_fig_values_timeseries(daily_fig, colors)
+    # Série temporelle de la différence Max–Min chaque jour
+    figs['fig_diff_ts'] = create_fig_diff_min_max_timeseries(daily_fig, gray_color='rgba(128,128,128,0.6)')
+
+    # Δ densités + PDF pour valeurs extrêmes (empirique vs lois ajustées)
+    figs['fig_diff_values'] = create_fig_values_law_comparison(
+        daily_stats['max'].values,
+        daily_stats['min'].values,
+        val_ext_stats['max']['law'], val_ext_stats['max']['params'],
+        val_ext_stats['min']['law'], val_ext_stats['min']['params'],
+        nbins=nbinsy_values,
+        title="Δ Densités – Valeurs des extrêmes"
+    )
+
+    # QQ-plots des valeurs extrêmes (global vs cluster, avec annotations sur lois clusters)
+    figs['fig_qq_values'] = create_fig_qq_values(
+        daily_stats['max'].values,
+        daily_stats['min'].values,
+        val_clusters['cluster_max'],
+        val_clusters['cluster_min'],
+        # lois globales ajustées
+        val_ext_stats['max']['law'], val_ext_stats['max']['params'],
+        val_ext_stats['min']['law'], val_ext_stats['min']['params'],
+        # lois ajustées sur clusters
+        val_cluster_stats['max']['law'], val_cluster_stats['max']['params'],
+        val_cluster_stats['min']['law'], val_cluster_stats['min']['params'],
+        title="QQ plots – Valeurs des extrêmes"
+    )
+    return {name: apply_render_policy(fig, name) for name, fig in figs.items()}
 
-# Figures "Jour moyen" et "Jour médian" (évolution sur 24h)
-fig_jour_moyen = create_fig_jour(
-    jour_moyen, "Jour moyen",
-    extremes['max_half_mean'], extremes['min_half_mean'],
-    jm_annot_max, jm_annot_min,
-    jm_center_max, jm_margin_max,
-    jm_center_min, jm_margin_min,
-    colors,
-    format_half_hour_func=lambda hh: None,  # la fonction format_half_hour n'est pas utilisée dans la figure
-)
-fig_jour_median = create_fig_jour(
-    jour_median, "Jour médian",
-    extremes['max_half_median'], extremes['min_half_median'],
-    md_annot_max, md_annot_min,
-    md_center_max, md_margin_max,
-    md_center_min, md_margin_min,
-    colors,
-    format_half_hour_func=lambda hh: None,
-    base_data=jour_moyen
-)
 
 # Figures de corrélation Heure vs Valeur (heure moyenne et médiane auxquelles chaque valeur est atteinte)
-# fig_val_step_mean = create_fig_value_step(df_bin_mean, "Heure moyenne vs Valeur", color=colors['mean'])
-# fig_val_step_med = create_fig_value_step(df_bin_med, "Heure médiane vs Valeur", color=colors['median'])
+# fig_val_step_mean = create_fig_value_step(analyses(data_version)['df_bin_mean'], "Heure moyenne vs Valeur", color=colors['mean'])
+# fig_val_step_med = create_fig_value_step(analyses(data_version)['df_bin_med'], "Heure médiane vs Valeur", color=colors['median'])
 
 # ---------------------------------------------------------- 9. Prévisions basées sur Prophet
 # # Préparation des données pour Prophet
@@ -332,56 +453,270 @@ fig_jour_median = create_fig_jour(
 # # Figure de prévision (historique + projection avec IC95)
 # fig_forecast = create_fig_forecast(df, forecast_df, horizon_days=horizon_days)
 
-# ---------------------------------------------------------- 10. Configuration Dash et onglets
-app = dash.Dash(__name__)
-app.layout = html.Div([
-    dcc.Tabs(children=[
-        dcc.Tab(label="Figure principale", children=[
-            dcc.Graph(figure=fig_main, style={'height': '90vh'})
-        ]),
-        dcc.Tab(label="Distributions & Analyses : heures", children=[
-            html.Div([
-                html.Div([
-                    dcc.Graph(figure=fig_values, style={'height': '45vh'}),
-                    dcc.Graph(figure=fig_hours, style={'height': '45vh'}),
-                ], style={'width': '33%', 'display': 'inline-block'}),
-                html.Div([
-                    dcc.Graph(figure=fig_jour_moyen, style={'height': '45vh'}),
-                    dcc.Graph(figure=fig_jour_median, style={'height': '45vh'})
-                ], style={'width': '33%', 'display': 'inline-block'}),
-                html.Div([
-                    dcc.Graph(figure=fig_diff_hours, style={'height': '45vh'}),
-                    dcc.Graph(figure=fig_qq_hours, style={'height': '45vh'})
-                ], style={'width': '33%', 'display': 'inline-block'})
-            ])
-        ]),
-        dcc.Tab(label="Distributions & Analyses : valeurs", children=[
-            html.Div([
-                html.Div([
-                    dcc.Graph(figure=fig_values, style={'height': '45vh'}),
-                    dcc.Graph(figure=fig_hours, style={'height': '45vh'}),
-                ], style={'width': '33%', 'display': 'inline-block'}),
-                html.Div([
-                    dcc.Graph(figure=fig_values_ts, style={'height': '45vh'}),
-                    dcc.Graph(figure=fig_diff_ts, style={'height': '45vh'})
-                ], style={'width': '33%', 'display': 'inline-block'}),
-                html.Div([
-                    dcc.Graph(figure=fig_diff_values, style={'height': '45vh'}),
-                    dcc.Graph(figure=fig_qq_values, style={'height': '45vh'})
-                ], style={'width': '33%', 'display': 'inline-block'})
-            ])
+# ---------------------------------------------------------- 10. Mode live
+# Un dcc.Interval déclenche le rapatriement du delta du CSV distant ; chaque
+# navigateur reçoit, via extendData, les points postérieurs à son propre état
+# (dcc.Store) au lieu de figures reconstruites intégralement.
+# `_live_lock` ne protège que la lecture/le remplacement des données partagées
+# (df, daily_stats, fig_main, data_version) ; le rapatriement et les calculs se
+# font hors verrou, sous `_refresh_lock` (un seul rafraîchissement à la fois).
+_live_lock = threading.Lock()
+_refresh_lock = threading.Lock()
+_last_refresh = time.monotonic()
+
+
+def _live_state(data=None, daily=None):
+    """Dernière mesure et dernier jour clos actuellement tracés."""
+    data = df if data is None else data
+    closed = closed_days(data, daily_stats if daily is None else daily)
+    return {
+        'last_ts': data['timestamp'].max().isoformat(),
+        'last_day': closed['day_start'].max().isoformat() if not closed.empty else None,
+    }
+
+
+def _new_closed_days(last_day, data=None, daily=None):
+    closed = closed_days(df if data is None else data, daily_stats if daily is None else daily)
+    if last_day is not None:
+        closed = closed[closed['day_start'] > pd.Timestamp(last_day)]
+    return closed
+
+
+def refresh_live_data():
+    """
+    Rapatrie le delta du CSV distant et intègre les nouvelles mesures. Les
+    statistiques quotidiennes (caches incrémentaux) ne sont recalculées qu'à
+    l'apparition d'un nouveau jour, qui change aussi la version des données ;
+    la figure principale serveur est prolongée (puis ramenée au budget de
+    points) pour qu'un rechargement de page reparte de l'état courant.
+    Rapatriement, chargement et calculs se font sur des copies, hors de
+    `_live_lock`, qui n'est pris que pour publier le nouvel état : un Pi qui
+    ne répond pas ne bloque pas les autres callbacks.
+    """
+    global df, daily_stats, gmin, gmax, fig_main, data_version, _last_refresh
+    if not _refresh_lock.acquire(blocking=False):
+        return  # rafraîchissement déjà en cours (autre client)
+    try:
+        if time.monotonic() - _last_refresh < LIVE_INTERVAL_S / 2:
+            return  # plusieurs onglets ouverts : un seul rapatriement par période
+        _last_refresh = time.monotonic()
+
+        with _live_lock:
+            data, daily, g_min, g_max, fig = df, daily_stats, gmin, gmax, fig_main
+        state = _live_state(data, daily)
+        last_ts = pd.Timestamp(state['last_ts'])
+        fetch_remote_csv()
+        new = load_data(last_ts.strftime('%Y-%m-%d'), datetime.now().strftime('%Y-%m-%d'))
+        new = _decided(new[new['timestamp'] > last_ts])
+        if new.empty:
+            return
+        new_day = new['day'].max() > data['day'].max()
+        data = pd.concat([data, new], ignore_index=True)
+        if new_day:
+            daily, g_min, g_max = calculate_daily_stats(data)
+            daily = calculate_confidence_intervals(data, daily)
+        fig = go.Figure(fig)
+        apply_extension(fig, extend_fig_main(new, _new_closed_days(state['last_day'], data, daily)))
+        rebudget_fig_main(fig, data)
+
+        with _live_lock:
+            df, daily_stats, gmin, gmax, fig_main = data, daily, g_min, g_max, fig
+            if new_day:
+                data_version += 1
+        print(f"Mode live : {len(new)} nouvelles mesures (dernière : {new['timestamp'].max()}).")
+    finally:
+        _refresh_lock.release()
+
+
+# ---------------------------------------------------------- 11. Configuration Dash et onglets
+# Les onglets d'analyse sont remplis par `render_tab` à leur ouverture.
+app = dash.Dash(__name__, suppress_callback_exceptions=True)
+
+
+def _column(*figures):
+    return html.Div([
+        dcc.Graph(figure=fig, style={'height': '45vh'}) if isinstance(fig, go.Figure) else fig
+        for fig in figures
+    ], style={'width': '33%', 'display': 'inline-block'})
+
+
+@lru_cache(maxsize=4)
+def tab_content(tab: str, version: int):
+    """
+    Contenu d'un onglet d'analyse pour la version `version` des données ; les
+    étapes calculées à cette occasion sont résumées en console.
+    """
+    since = mark()
+    with stage(f"onglet {tab}"):
+        content = _tab_content(tab, version)
+    print_stage_summary(f"Onglet « {tab} » – données v{version}", since)
+    write_trace()
+    return content
+
+
+def _tab_content(tab: str, version: int):
+    if tab == 'hours':
+        figs = hours_figures(version)
+        return html.Div([
+            _column(figs['fig_values'], figs['fig_hours']),
+            _column(figs['fig_jour_moyen'], figs['fig_jour_median']),
+            _column(figs['fig_diff_hours'], figs['fig_qq_hours']),
+        ])
+    figs = values_figures(version)
+    closed = closed_days(df, daily_stats)
+    return html.Div([
+        _column(figs['fig_values'], figs['fig_hours']),
+        _column(
+            dcc.Graph(id='fig-values-ts', figure=figs['fig_values_ts'], style={'height': '45vh'}),
+            dcc.Graph(id='fig-diff-ts', figure=figs['fig_diff_ts'], style={'height': '45vh'}),
+        ),
+        _column(figs['fig_diff_values'], figs['fig_qq_values']),
+        # Dernier jour clos tracé dans les séries journalières de cet onglet
+        dcc.Store(id='live-state-daily',
+                  data=closed['day_start'].max().isoformat() if not closed.empty else None),
+    ])
+
+
+def serve_layout():
+    """Layout servi à chaque chargement de page (figure principale à l'état courant)."""
+    with _live_lock:
+        live_state, figure = _live_state(), fig_main
+    return html.Div([
+        dcc.Tabs(id='tabs', value='main', children=[
+            dcc.Tab(label="Figure principale", value='main', children=[
+                dcc.Graph(id='fig-main', figure=figure, style={'height': '90vh'})
+            ]),
+            dcc.Tab(label="Distributions & Analyses : heures", value='hours', children=[
+                dcc.Loading(html.Div(id='tab-hours'))
+            ]),
+            dcc.Tab(label="Distributions & Analyses : valeurs", value='values', children=[
+                dcc.Loading(html.Div(id='tab-values'))
+            ]),
+            # dcc.Tab(label="Heure vs Valeur", children=[
+            #     html.Div([
+            #         dcc.Graph(figure=fig_val_step_mean, style={'height': '50vh'}),
+            #         dcc.Graph(figure=fig_val_step_med, style={'height': '50vh'})
+            #     ])
+            # ]),
+            # dcc.Tab(label="Prévisions", children=[
+            #     dcc.Graph(figure=fig_forecast, style={'height': '90vh'})
+            # ])
         ]),
-        # dcc.Tab(label="Heure vs Valeur", children=[
-        #     html.Div([
-        #         dcc.Graph(figure=fig_val_step_mean, style={'height': '50vh'}),
-        #         dcc.Graph(figure=fig_val_step_med, style={'height': '50vh'})
-        #     ])
-        # ]),
-        # dcc.Tab(label="Prévisions", children=[
-        #     dcc.Graph(figure=fig_forecast, style={'height': '90vh'})
-        # ])
+        dcc.Interval(id='live-interval', interval=max(LIVE_INTERVAL_S, 1) * 1000,
+                     disabled=not LIVE_INTERVAL_S),
+        dcc.Store(id='live-state', data=live_state),
     ])
-])
+
+
+app.layout = serve_layout
+
+# Un verrou par version des données : les onglets d'une même version sont
+# construits l'un après l'autre (les analyses ne sont calculées qu'une fois).
+_version_locks = {}
+
+
+@app.callback(
+    Output('tab-hours', 'children'),
+    Output('tab-values', 'children'),
+    Input('tabs', 'value'),
+)
+def render_tab(tab):
+    if tab == 'main':
+        raise PreventUpdate
+    with _live_lock:
+        version = data_version
+        lock = _version_locks.setdefault(version, threading.Lock())
+        for old in [v for v in _version_locks if v < version]:
+            del _version_locks[old]
+    # lru_cache ne protège pas un premier calcul concurrent : deux callbacks
+    # (onglets ou navigateurs) calculeraient chacun analyses(version)
+    with lock:
+        content = tab_content(tab, version)
+    return (content, no_update) if tab == 'hours' else (no_update, content)
+
+
+@app.callback(
+    Output('fig-main', 'extendData'),
+    Output('live-state', 'data'),
+    Input('live-interval', 'n_intervals'),
+    State('live-state', 'data'),
+    prevent_initial_call=True,
+)
+def push_live_updates(_, state):
+    refresh_live_data()
+    with _live_lock:
+        data, daily = df, daily_stats
+    new = data[data['timestamp'] > pd.Timestamp(state['last_ts'])]
+    closed = _new_closed_days(state['last_day'], data, daily)
+    if new.empty and closed.empty:
+        raise PreventUpdate
+    return extend_fig_main(new, closed), _live_state(data, daily)
+
+
+@app.callback(
+    Output('fig-values-ts', 'extendData'),
+    Output('fig-diff-ts', 'extendData'),
+    Output('live-state-daily', 'data'),
+    Input('live-state', 'data'),
+    State('live-state-daily', 'data'),
+    prevent_initial_call=True,
+)
+def push_live_daily_updates(_, last_day):
+    """Jours nouvellement clos ajoutés aux séries journalières de l'onglet valeurs (s'il est ouvert)."""
+    with _live_lock:
+        closed = _new_closed_days(last_day)
+    if closed.empty:
+        raise PreventUpdate
+    return (
+        extend_fig_values_timeseries(closed),
+        extend_fig_diff_min_max_timeseries(closed),
+        closed['day_start'].max().isoformat(),
+    )
+
+
+@app.callback(
+    Output('fig-main', 'figure'),
+    Input('fig-main', 'relayoutData'),
+    State('live-state', 'data'),
+    prevent_initial_call=True,
+)
+def rezoom_main(relayout, state):
+    """
+    Zoom/dézoom de la figure principale : la trace « Mesures » est recalculée à
+    la résolution de la fenêtre visible. Les couches journalières sont renvoyées
+    dans l'état connu du client, les ajouts extendData étant perdus lorsque la
+    figure est remplacée.
+    """
+    relayout = relayout or {}
+    if relayout.get('xaxis.autorange'):
+        x_range = None
+    elif 'xaxis.range[0]' in relayout:
+        x_range = (relayout['xaxis.range[0]'], relayout['xaxis.range[1]'])
+    elif 'xaxis.range' in relayout:
+        x_range = tuple(relayout['xaxis.range'])
+    else:
+        raise PreventUpdate
+
+    with _live_lock:
+        data = df[df['timestamp'] <= pd.Timestamp(state['last_ts'])]
+        daily = daily_stats
+        if LIVE_INTERVAL_S:
+            daily = closed_days(df, daily_stats)
+            daily = (daily[daily['day_start'] <= pd.Timestamp(state['last_day'])]
+                     if state['last_day'] is not None else daily.iloc[:0])
+
+    pts = main_measurement_points(data, x_range)
+    patched = Patch()
+    patched['data'][0]['x'] = pts['timestamp'].values
+    patched['data'][0]['y'] = pts['inch'].values
+    patched['data'][0]['customdata'] = pts[['mm']].values
+    for i, (x, y, custom) in enumerate(main_daily_layers(daily), start=1):
+        patched['data'][i]['x'] = x
+        patched['data'][i]['y'] = y
+        patched['data'][i]['customdata'] = custom
+    return patched
+
 
 if __name__ == "__main__":
+    load_pipeline()
     app.run_server(debug=False, port=8051)
@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+"""
+Instrumentation des étapes du pipeline route : durée, temps CPU du thread,
+pic de mémoire résidente (RSS) et nombre de lignes traitées par étape.
+
+    with stage("chargement") as st:
+        df = load_data(...)
+        st.rows = len(df)
+
+Les étapes peuvent être imbriquées (pile par thread). Le temps CPU est celui
+du thread qui exécute l'étape (`time.thread_time`) : le travail délégué à
+d'autres threads ou processus n'y figure pas. Sous Linux, le pic RSS est
+celui du processus pendant l'étape (VmHWM remis à zéro via
+/proc/self/clear_refs) ; ailleurs, seul le pic du processus depuis son
+lancement est disponible et le tableau l'indique.
+
+`print_stage_summary` affiche le tableau récapitulatif (rich) ; `write_trace`
+ajoute les nouvelles étapes au fichier `profiling.trace_file` de config.yaml,
+au format Chrome trace (tableau JSON, chrome://tracing ou
+https://ui.perfetto.dev). Seules les `profiling.max_records` dernières étapes
+sont conservées en mémoire.
+"""
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Deque, Optional, Set
+
+try:
+    import resource
+except ImportError:  # Windows : pas de pic RSS
+    resource = None
+
+from rich.console import Console
+from rich.table import Table
+
+from config import load_config
+
+cfg = load_config()
+PROFILING_CFG = cfg.get("profiling", {})
+ENABLED = PROFILING_CFG.get("enabled", True)
+TRACE_FILE = PROFILING_CFG.get("trace_file")
+MAX_RECORDS = PROFILING_CFG.get("max_records", 2000)
+
+_T0 = time.perf_counter()
+_records: Deque["Stage"] = deque(maxlen=MAX_RECORDS)
+_count = 0                       # étapes enregistrées depuis le lancement (numéro de la suivante)
+_open: Set["Stage"] = set()      # étapes en cours (tous threads), pour le suivi du pic RSS
+_trace = {"path": None, "written": 0}
+_lock = threading.Lock()
+_local = threading.local()
+
+
+def _status_mb(field: str) -> Optional[float]:
+    """Champ `field` (VmRSS, VmHWM…) de /proc/self/status, en Mo."""
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            match = re.search(rf"^{field}:\s+(\d+) kB", f.read(), re.M)
+    except OSError:
+        return None
+    return int(match.group(1)) / 1024 if match else None
+
+
+def _can_reset_peak() -> bool:
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return _status_mb("VmHWM") is not None
+    except OSError:
+        return False
+
+
+# Pic RSS par étape (Linux) ; sinon pic du processus depuis son lancement
+STAGE_PEAK = ENABLED and sys.platform.startswith("linux") and _can_reset_peak()
+
+
+def peak_rss_mb() -> Optional[float]:
+    """
+    Pic de mémoire résidente (Mo) : depuis la dernière remise à zéro sous Linux
+    (VmHWM), depuis le lancement du processus ailleurs.
+    """
+    if STAGE_PEAK:
+        return _status_mb("VmHWM")
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024  # octets (macOS) / Ko
+
+
+def _collect_peak() -> None:
+    """
+    Reporte le pic courant sur les étapes en cours puis le remet à zéro : une
+    étape qui commence ou finit ne fait pas perdre leur pic aux autres.
+    Appelé sous `_lock`.
+    """
+    peak = peak_rss_mb()
+    if peak is None:
+        return
+    for rec in _open:
+        rec.rss_peak = max(rec.rss_peak, peak)
+    if STAGE_PEAK:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+
+
+class Stage:
+    """Mesures d'une étape ; `rows` est renseigné par l'appelant."""
+
+    def __init__(self, name: str, depth: int, rows: Optional[int] = None):
+        self.name = name
+        self.depth = depth
+        self.rows = rows
+        self.seq = None
+        self.thread = threading.get_ident()
+        self.start = self.wall = self.cpu = 0.0
+        self.rss_before = self.rss_peak = None
+
+
+@contextmanager
+def stage(name: str, rows: Optional[int] = None):
+    global _count
+    rec = Stage(name, len(getattr(_local, "stack", ())), rows)
+    if not ENABLED:
+        yield rec
+        return
+    _local.stack = getattr(_local, "stack", []) + [name]
+    with _lock:
+        _collect_peak()
+        rec.rss_before = _status_mb("VmRSS") if STAGE_PEAK else peak_rss_mb()
+        if rec.rss_before is not None:
+            rec.rss_peak = rec.rss_before
+            _open.add(rec)
+    cpu0 = time.thread_time()
+    rec.start = time.perf_counter()
+    try:
+        yield rec
+    finally:
+        rec.wall = time.perf_counter() - rec.start
+        rec.cpu = time.thread_time() - cpu0
+        _local.stack = _local.stack[:-1]
+        with _lock:
+            _collect_peak()
+            _open.discard(rec)
+            rec.seq, _count = _count, _count + 1
+            _records.append(rec)
+
+
+def mark() -> int:
+    """Position courante dans l'historique des étapes (pour un résumé partiel)."""
+    with _lock:
+        return _count
+
+
+def _since(seq: int):
+    with _lock:
+        return [r for r in _records if r.seq >= seq]
+
+
+def print_stage_summary(title: str = "Étapes du pipeline", since: int = 0) -> None:
+    if not ENABLED:
+        return
+    records = sorted(_since(since), key=lambda r: r.start)
+    if not records:
+        return
+    table = Table(title=title)
+    peak, grow = (("RSS pic étape (Mo)", "+RSS étape (Mo)") if STAGE_PEAK
+                  else ("RSS pic processus (Mo)", "+pic processus (Mo)"))
+    for col, justify in (("Étape", "left"), ("Durée (s)", "right"), ("CPU thread (s)", "right"),
+                         ("CPU/durée", "right"), (peak, "right"), (grow, "right"), ("Lignes", "right")):
+        table.add_column(col, justify=justify)
+    for r in records:
+        rss = "" if r.rss_peak is None else f"{r.rss_peak:.0f}"
+        diff = "" if r.rss_peak is None else f"{r.rss_peak - r.rss_before:+.0f}"
+        ratio = f"{r.cpu / r.wall:.0%}" if r.wall >= 0.01 else ""  # en deçà : résolution des horloges
+        table.add_row("  " * r.depth + r.name, f"{r.wall:.2f}", f"{r.cpu:.2f}", ratio,
+                      rss, diff, "" if r.rows is None else f"{r.rows:,}".replace(",", " "))
+    Console().print(table)
+
+
+def write_trace(path=None) -> Optional[Path]:
+    """
+    Ajoute au fichier de trace les étapes terminées depuis le dernier appel
+    (événements « X » du format Chrome trace, un fil par thread) et le pic RSS
+    de chacune (compteur). Le fichier est recréé au premier appel du processus
+    (ou si `path` change) ; le tableau JSON reste ouvert, ce que le format
+    autorise, pour que chaque appel n'écrive que la fin du fichier.
+    """
+    path = path or TRACE_FILE
+    if not (ENABLED and path):
+        return None
+    path = Path(path)
+    pid = os.getpid()
+    with _lock:
+        if _trace["path"] != path:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text("[\n", encoding="utf-8")
+            _trace.update(path=path, written=0)
+        records = sorted((r for r in _records if r.seq >= _trace["written"]), key=lambda r: r.seq)
+        _trace["written"] = _count
+        events = []
+        for r in records:
+            ts = (r.start - _T0) * 1e6
+            events.append({
+                "name": r.name, "ph": "X", "pid": pid, "tid": r.thread,
+                "ts": ts, "dur": r.wall * 1e6,
+                "args": {"thread_cpu_s": round(r.cpu, 4), "rows": r.rows, "rss_peak_mb": r.rss_peak},
+            })
+            if r.rss_peak is not None:
+                events.append({"name": "RSS pic (Mo)", "ph": "C", "pid": pid, "ts": ts + r.wall * 1e6,
+                               "args": {"rss": round(r.rss_peak, 1)}})
+        if events:
+            with path.open("a", encoding="utf-8") as f:
+                f.write("".join(json.dumps(e) + ",\n" for e in events))
+    return path
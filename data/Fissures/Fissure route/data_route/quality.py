@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+"""
+Filtre qualité des mesures du comparateur, appliqué à l'ingestion.
+
+Les nouvelles lignes du CSV local (depuis le dernier offset analysé) passent
+une seule fois par des détecteurs à règles :
+  - pic isolé (filtre de Hampel : écart à la médiane glissante centrée
+    supérieur à `hampel_sigmas` × MAD et à `hampel_min_mm`),
+  - saut impossible (écart à la médiane des mesures précédentes supérieur à
+    `max_jump_mm`),
+  - horodatage en double (seule la première occurrence est conservée).
+Les `hampel_half_window` dernières lignes d'un bloc n'ont pas encore leurs
+voisines suivantes : elles restent en attente (`pending`) et sont jugées avec
+le bloc suivant.
+Les horodatages écartés sont ajoutés à un index d'exclusion persisté
+(`<csv>.quality.json`, à côté du CSV local) que les chargeurs appliquent ensuite
+comme un simple masque, sans relancer la détection. Les exclusions manuelles
+(`quality.exclude` de config.yaml) sont ajoutées au masque à chaque lecture.
+"""
+import io
+import json
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from config import load_config
+from csv_delta import read_new_lines
+from timestamps import parse_iso_us
+
+cfg = load_config()
+QUALITY_CFG = cfg.get("quality", {})
+ENABLED = QUALITY_CFG.get("enabled", True)
+HAMPEL_HALF_WINDOW = QUALITY_CFG.get("hampel_half_window", 5)   # points de part et d'autre
+HAMPEL_SIGMAS = QUALITY_CFG.get("hampel_sigmas", 6.0)
+HAMPEL_MIN_MM = QUALITY_CFG.get("hampel_min_mm", 0.25)          # écart minimal (paliers : MAD nulle)
+MAX_JUMP_MM = QUALITY_CFG.get("max_jump_mm", 1.0)
+# Mesures erronées relevées à la main (config.yaml, `quality.exclude`)
+EXCLUDE = QUALITY_CFG.get("exclude", [])
+REASONS = ("hampel", "saut", "doublon")
+
+_mask_cache: Dict[str, Any] = {"key": None}
+
+
+def index_path(csv_path: Optional[Union[str, Path]] = None) -> Path:
+    csv_path = Path(csv_path or cfg["paths"]["local_csv"])
+    return csv_path.with_name(csv_path.name + ".quality.json")
+
+
+def _empty_index() -> Dict[str, Any]:
+    return {"csv_offset": 0, "tail": "", "context": {"timestamp": [], "mm": []},
+            "pending": {"timestamp": [], "mm": []}, "excluded": {r: [] for r in REASONS}}
+
+
+def _load_index(path: Path) -> Dict[str, Any]:
+    if not path.exists():
+        return _empty_index()
+    try:
+        with path.open(encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return _empty_index()
+
+
+def _save_index(path: Path, index: Dict[str, Any]) -> None:
+    tmp = path.with_suffix(".tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        json.dump(index, f)
+    tmp.replace(path)
+
+
+# ---------------------------------------------------------- détecteurs
+def detect_outliers(ts_ns: np.ndarray, mm: np.ndarray, n_context: int = 0,
+                    n_pending: int = 0) -> Dict[str, np.ndarray]:
+    """
+    Masques booléens (un par règle) des lignes à écarter, dans l'ordre du
+    fichier. Les `n_context` premières lignes (fin du bloc précédent) servent
+    seulement de voisinage et ne sont jamais signalées, pas plus que les
+    `n_pending` dernières (fenêtre centrée incomplète, décision différée). La
+    MAD du filtre de Hampel est approchée par la médiane glissante des écarts
+    à la médiane.
+    """
+    s = pd.Series(mm)
+    k = HAMPEL_HALF_WINDOW
+    rolling = dict(window=2 * k + 1, center=True, min_periods=k + 1)
+    med = s.rolling(**rolling).median()
+    dev = (s - med).abs()
+    mad = dev.rolling(**rolling).median()
+    hampel = (dev > HAMPEL_SIGMAS * 1.4826 * mad) & (dev > HAMPEL_MIN_MM)
+
+    previous = s.shift(1).rolling(k, min_periods=1).median()
+    jump = (s - previous).abs() > MAX_JUMP_MM
+
+    duplicate = pd.Series(ts_ns).duplicated()
+
+    hampel, jump, duplicate = (m.to_numpy(copy=True) for m in (hampel, jump & ~hampel, duplicate))
+    for mask in (hampel, jump, duplicate):
+        mask[:n_context] = False
+        mask[len(mask) - n_pending:] = False
+    return {"hampel": hampel, "saut": jump, "doublon": duplicate}
+
+
+# ---------------------------------------------------------- ingestion
+def update_exclusions(csv_path: Optional[Union[str, Path]] = None) -> int:
+    """
+    Analyse les lignes complètes du CSV ajoutées depuis le dernier passage et
+    complète l'index d'exclusion. Comme pour le store, la dernière ligne
+    analysée (`tail`) permet de détecter un CSV réécrit (nouvelle analyse
+    complète). Les `hampel_half_window` dernières lignes sont jugées au
+    passage suivant. Renvoie le nombre de nouvelles exclusions.
+    """
+    if not ENABLED:
+        return 0
+    csv_path = Path(csv_path or cfg["paths"]["local_csv"])
+    path = index_path(csv_path)
+    index = _load_index(path)
+    offset = int(index["csv_offset"])
+    tail = index["tail"].encode("utf-8")
+    size = csv_path.stat().st_size
+
+    with csv_path.open("rb") as f:
+        new = read_new_lines(f, size, offset, tail)
+        if new is None:
+            print("Index qualité incohérent avec le CSV local → nouvelle analyse complète.")
+            index, offset = _empty_index(), 0
+            new = read_new_lines(f, size, 0, b"")
+
+    raw, last_line = new
+    if not raw:
+        return 0
+
+    chunk = pd.read_csv(io.BytesIO(raw), header=None, names=["timestamp", "inch"],
+                        dtype={"timestamp": "S27"})
+    ts_ns, valid = parse_iso_us(chunk["timestamp"].to_numpy())
+    mm = pd.to_numeric(chunk["inch"], errors="coerce").to_numpy() * 25.4
+    keep = valid & ~np.isnan(mm)
+    ts_ns, mm = ts_ns[keep], mm[keep]
+
+    # Voisinage déjà jugé + lignes en attente du bloc précédent + nouvelles lignes ;
+    # les k dernières lignes restent en attente de leurs voisines suivantes
+    context, pending = index["context"], index.get("pending", {"timestamp": [], "mm": []})
+    all_ts = np.concatenate([np.asarray(context["timestamp"], dtype=np.int64),
+                             np.asarray(pending["timestamp"], dtype=np.int64), ts_ns])
+    all_mm = np.concatenate([np.asarray(context["mm"], dtype=np.float64),
+                             np.asarray(pending["mm"], dtype=np.float64), mm])
+    n_context = len(context["timestamp"])
+    first_pending = max(n_context, len(all_ts) - HAMPEL_HALF_WINDOW)
+    flags = detect_outliers(all_ts, all_mm, n_context=n_context, n_pending=len(all_ts) - first_pending)
+
+    n_new = 0
+    for reason, mask in flags.items():
+        found = np.datetime_as_string(all_ts[mask].view("datetime64[ns]"), unit="us").tolist()
+        index["excluded"][reason].extend(found)
+        n_new += len(found)
+        if found:
+            print(f"[QUALITÉ] {reason} : {len(found)} mesure(s) écartée(s) ({', '.join(found[:3])})")
+
+    # Voisinage conservé pour le prochain bloc : dernières mesures jugées et
+    # retenues, puis lignes en attente
+    retained = ~np.logical_or.reduce(list(flags.values()))
+    retained[first_pending:] = False
+    n_keep = 2 * HAMPEL_HALF_WINDOW
+    index["context"] = {"timestamp": all_ts[retained][-n_keep:].tolist(),
+                        "mm": all_mm[retained][-n_keep:].tolist()}
+    index["pending"] = {"timestamp": all_ts[first_pending:].tolist(),
+                        "mm": all_mm[first_pending:].tolist()}
+    index["csv_offset"], index["tail"] = offset + len(raw), last_line.decode("utf-8")
+    _save_index(path, index)
+    return n_new
+
+
+def pending_since(csv_path: Optional[Union[str, Path]] = None) -> Optional[pd.Timestamp]:
+    """
+    Horodatage de la première ligne en attente de décision (`pending`), None
+    si aucune (ou filtre inactif). Les lignes à partir de cet horodatage
+    peuvent encore être écartées au passage suivant.
+    """
+    path = index_path(csv_path)
+    if not ENABLED or not path.exists():
+        return None
+    pending = _load_index(path).get("pending", {"timestamp": []})["timestamp"]
+    return pd.Timestamp(min(pending), unit="ns") if pending else None
+
+
+# ---------------------------------------------------------- masque des chargeurs
+def _to_ns(stamps) -> np.ndarray:
+    ns = pd.to_datetime(pd.Series(stamps, dtype=object), format="ISO8601").to_numpy("datetime64[ns]")
+    return np.unique(ns.view(np.int64))
+
+
+def excluded_ns(csv_path: Optional[Union[str, Path]] = None):
+    """
+    Horodatages exclus (int64 ns, triés) : (à écarter, en double). Les premiers
+    regroupent l'index persisté et les exclusions manuelles ; pour les seconds
+    seule la première occurrence est conservée.
+    """
+    path = index_path(csv_path)
+    key = (str(path), path.stat().st_mtime_ns if path.exists() else None)
+    if _mask_cache["key"] != key:
+        drop, duplicates = list(EXCLUDE), []
+        if ENABLED and path.exists():
+            excluded = _load_index(path)["excluded"]
+            drop += excluded["hampel"] + excluded["saut"]
+            duplicates = excluded["doublon"]
+        _mask_cache.update(key=key, drop=_to_ns(drop), duplicates=_to_ns(duplicates))
+    return _mask_cache["drop"], _mask_cache["duplicates"]
+
+
+def _isin_sorted(values: np.ndarray, sorted_ns: np.ndarray) -> np.ndarray:
+    if not len(sorted_ns):
+        return np.zeros(len(values), dtype=bool)
+    pos = np.searchsorted(sorted_ns, values).clip(max=len(sorted_ns) - 1)
+    return sorted_ns[pos] == values
+
+
+def excluded_mask(timestamps: pd.Series, csv_path: Optional[Union[str, Path]] = None) -> np.ndarray:
+    """Masque booléen des lignes écartées par l'index d'exclusion."""
+    drop, duplicates = excluded_ns(csv_path)
+    values = timestamps.to_numpy("datetime64[ns]").view(np.int64)
+    mask = _isin_sorted(values, drop)
+    if len(duplicates):
+        mask |= _isin_sorted(values, duplicates) & timestamps.duplicated().to_numpy()
+    return mask
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+Session SSH partagée avec le Raspberry Pi : un seul `paramiko.Transport`,
+ouvert à la première utilisation puis réutilisé (canaux multiplexés) par la
+sonde d'état, la synchronisation SFTP et les rafraîchissements du mode live.
+Un échec de connexion récent est mémorisé pour qu'un Pi hors ligne ne coûte
+qu'un seul délai d'attente.
+"""
+import socket
+import threading
+import time
+from typing import Optional
+
+import paramiko
+
+from config import load_config
+
+cfg = load_config()
+
+
+class SSHSession:
+    def __init__(self, host: str, port: int, user: str, password: str,
+                 timeout: float = 10.0, retry_after: float = 60.0):
+        self.host, self.port = host, port
+        self.user, self.password = user, password
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self._transport: Optional[paramiko.Transport] = None
+        self._failed_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def transport(self) -> paramiko.Transport:
+        """Transport actif (connexion établie ou rétablie si nécessaire)."""
+        with self._lock:
+            if self._transport is not None and self._transport.is_active():
+                return self._transport
+            if self._failed_at is not None and time.monotonic() - self._failed_at < self.retry_after:
+                raise paramiko.SSHException(f"{self.host} injoignable (échec récent, nouvel essai différé)")
+            try:
+                sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+                transport = paramiko.Transport(sock)
+                transport.banner_timeout = self.timeout
+                transport.auth_timeout = self.timeout
+                transport.start_client(timeout=self.timeout)
+                transport.auth_password(self.user, self.password)
+            except (OSError, paramiko.SSHException, EOFError):
+                self._failed_at = time.monotonic()
+                raise
+            self._transport, self._failed_at = transport, None
+            return transport
+
+    def exec(self, command: str, timeout: Optional[float] = None) -> str:
+        """Exécute `command` sur un nouveau canal et renvoie sa sortie standard."""
+        timeout = timeout or self.timeout
+        channel = self.transport().open_session(timeout=timeout)
+        try:
+            channel.settimeout(timeout)
+            channel.exec_command(command)
+            chunks = []
+            while True:
+                chunk = channel.recv(32768)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+            return b"".join(chunks).decode(errors="replace")
+        finally:
+            channel.close()
+
+    def sftp(self) -> paramiko.SFTPClient:
+        return paramiko.SFTPClient.from_transport(self.transport())
+
+    def close(self) -> None:
+        with self._lock:
+            if self._transport is not None:
+                self._transport.close()
+                self._transport = None
+
+
+_SESSION: Optional[SSHSession] = None
+_SESSION_LOCK = threading.Lock()
+
+
+def get_session() -> SSHSession:
+    """Session partagée construite depuis la section `ssh` de config.yaml."""
+    global _SESSION
+    with _SESSION_LOCK:
+        if _SESSION is None:
+            ssh = cfg["ssh"]
+            _SESSION = SSHSession(
+                ssh["host"], ssh["port"], ssh["user"], ssh["password"],
+                timeout=ssh.get("timeout", 10),
+            )
+        return _SESSION
@@ -1,19 +1,29 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
 import math, warnings
-from typing import Tuple, Dict, Optional
+from typing import Callable, Tuple, Dict, Optional
 import numpy as np
 import pandas as pd
 import scipy.stats as st
 from scipy import special as sps
-from scipy.stats import gaussian_kde
 from scipy.signal import find_peaks
 from scipy.stats import truncnorm, logistic, weibull_min, norm
 
+from cache import DiskCache, digest
+from kde import kde_density
+
 # -------------------------------------------------------------------- config
 A, B = 0.0, 24.0
 TWOPI_24 = 2 * math.pi / 24
 warnings.filterwarnings("ignore", category=RuntimeWarning)
+# Taille maximale d'un bloc de tirages bootstrap (valeurs float64, ~16 Mo)
+BOOT_MAX_CELLS = 2_000_000
+
+_BOOT_STATS: Dict[str, Callable[[np.ndarray], np.ndarray]] = {
+    "mean": lambda m: m.mean(axis=1),
+    "median": lambda m: np.median(m, axis=1),
+    "std": lambda m: m.std(axis=1, ddof=1),
+}
 
 LAWS: Dict[str, st.rv_continuous] = {
     # "uniform": st.uniform,
@@ -23,6 +33,18 @@ LAWS: Dict[str, st.rv_continuous] = {
     "weibull_min": st.weibull_min,
 }
 
+# Lois candidates pour les valeurs (inch) des extrêmes journaliers
+VALUE_LAWS: Dict[str, st.rv_continuous] = {
+    "norm": norm,
+    "logistic": logistic,
+    "weibull_min": weibull_min,
+    "truncnorm": truncnorm,
+}
+
+# Ajustements en cache (échantillon × loi) : quelques dizaines par version des
+# données, borné pour que le dossier ne grossisse pas indéfiniment en mode live
+_FIT_CACHE = DiskCache("fits", max_entries=2000)
+
 
 # ----------------------------------------------------------------- helpers
 def _loglik_trunc(dist, x: np.ndarray, p: Tuple) -> Tuple[float, float]:
@@ -33,7 +55,10 @@ def _loglik_trunc(dist, x: np.ndarray, p: Tuple) -> Tuple[float, float]:
 
 
 def _dir_est_vonmises(theta: np.ndarray) -> Tuple[float, float]:
-    C, S = np.cos(theta).mean(), np.sin(theta).mean()
+    return _dir_est_vonmises_cs(np.cos(theta).mean(), np.sin(theta).mean())
+
+
+def _dir_est_vonmises_cs(C: float, S: float) -> Tuple[float, float]:
     mu = math.atan2(S, C)
     R = math.hypot(C, S)
     if R < 1e-6:
@@ -46,9 +71,21 @@ def _dir_est_vonmises(theta: np.ndarray) -> Tuple[float, float]:
     return max(k, 0.0), mu
 
 
+def _sample_stats(x: np.ndarray) -> Dict[str, float]:
+    """Statistiques suffisantes calculées une fois et partagées par toutes les lois."""
+    th = x * TWOPI_24
+    C, S = np.cos(th).mean(), np.sin(th).mean()
+    mu, sigma = st.norm.fit(x)
+    return {"n": len(x), "mu": mu, "sigma": sigma, "C": C, "S": S, "R": math.hypot(C, S)}
+
+
 # ---------------------------------------------------------------- fit (1 loi)
-def _fit_one(name: str, x: np.ndarray) -> Tuple[str, Optional[float], Optional[Tuple]]:
-    n = len(x)
+def _fit_mle(name: str, x: np.ndarray, ss: Dict[str, float]) -> Optional[Tuple[float, float, Tuple]]:
+    """
+    Phase 1 (sans KS) : ajustement de la loi `name`, renvoie (bic, tail, params)
+    ou None si la loi est rejetée.
+    """
+    n = ss["n"]
     dist = LAWS[name]
     try:
         if name == "uniform":
@@ -56,20 +93,20 @@ def _fit_one(name: str, x: np.ndarray) -> Tuple[str, Optional[float], Optional[T
             logL, tail = _loglik_trunc(dist, x, p)
         elif name == "truncnorm":
             # Ajustement d'une normale tronquée sur [A,B] = [0,24]
-            mu, sigma = st.norm.fit(x)
+            mu, sigma = ss["mu"], ss["sigma"]
             a = (A - mu) / sigma
             b = (B - mu) / sigma
             p = (a, b, mu, sigma)
             k = 2  # mu et sigma estimés
             logL, tail = _loglik_trunc(dist, x, p)
         elif name == "vonmises":
-            th = x * TWOPI_24
-            κ, μ = _dir_est_vonmises(th)
+            κ, μ = _dir_est_vonmises_cs(ss["C"], ss["S"])
             if κ < .1:  # quasi-uniforme
-                return name, None, None
+                return None
             p = (κ, μ, 1.0)
             k = 2
-            logL = κ * np.cos(th - μ).sum() - n * math.log(2 * math.pi * sps.iv(0, κ)) + n * math.log(TWOPI_24)
+            # Σ cos(θ − μ) = n·R pour μ = direction moyenne
+            logL = κ * n * ss["R"] - n * math.log(2 * math.pi * sps.iv(0, κ)) + n * math.log(TWOPI_24)
             tail = 0.0
         elif name == "logistic":
             p = dist.fit(x)  # loc & scale libres
@@ -82,32 +119,132 @@ def _fit_one(name: str, x: np.ndarray) -> Tuple[str, Optional[float], Optional[T
             k = len(p)
             logL, tail = _loglik_trunc(dist, x, p)
         else:
-            return name, None, None
+            return None
         if not math.isfinite(logL):
-            return name, None, None
-        bic = k * math.log(n) - 2 * logL
-        ks = st.kstest(x, dist.cdf, args=p).statistic
-        score = bic + 0.5 * n * ks + 50 * tail
-        return name, score, p
+            return None
+        return k * math.log(n) - 2 * logL, tail, p
     except Exception:
+        return None
+
+
+def _ks(name: str, x: np.ndarray, p: Tuple) -> float:
+    return st.kstest(x, LAWS[name].cdf, args=p).statistic
+
+
+def _fit_one(name: str, x: np.ndarray) -> Tuple[str, Optional[float], Optional[Tuple]]:
+    fit = _fit_mle(name, x, _sample_stats(x))
+    if fit is None:
         return name, None, None
+    bic, tail, p = fit
+    return name, bic + 0.5 * len(x) * _ks(name, x, p) + 50 * tail, p
+
+
+def _fit_laws_cached(x: np.ndarray, laws: Dict[str, st.rv_continuous], kind: str,
+                     fit: Callable[[str], object]) -> Dict[str, object]:
+    """
+    Ajuste les lois absentes du cache disque `fits`, clé = (empreinte de
+    l'échantillon, famille, loi). Renvoie {loi: résultat}.
+    En série : un ajustement prend quelques ms et tient le GIL (optimiseurs
+    scipy en Python) ; mesuré sur 4 lois × 400 heures, 14 ms en série, pas
+    de gain avec des threads, ~9 s avec un pool de processus (démarrage et
+    import de scipy dans chaque processus).
+    """
+    keys = {name: digest(x, kind=kind, law=name) for name in laws}
+    todo = [name for name in laws if keys[name] not in _FIT_CACHE]
+    if todo:
+        for name in todo:
+            _FIT_CACHE[keys[name]] = fit(name)
+        _FIT_CACHE.save()
+    return {name: _FIT_CACHE[keys[name]] for name in laws}
 
 
 # ------------------------------------------------------------ fit (global)
 def fit_distributions_hours(hours: np.ndarray) -> Tuple[str, Tuple]:
+    """
+    Meilleure loi (score = BIC + 0.5·n·KS + 50·tail) pour des heures dans [0,24].
+    Les ajustements MLE de toutes les lois sont mis en cache ; le test KS n'est
+    calculé que pour les lois dont la borne inférieure du score (BIC + 50·tail,
+    KS ≥ 0) peut encore battre la meilleure loi.
+    """
     x = np.asarray(hours[np.isfinite(hours)])
     if len(x) < 10:
         raise ValueError("échantillon trop petit (<10)")
+    ss = _sample_stats(x)
+    fits = _fit_laws_cached(x, LAWS, "hours", lambda name: _fit_mle(name, x, ss))
+
+    order = sorted((f[0] + 50 * f[1], i, name) for i, (name, f) in enumerate(fits.items())
+                   if f is not None)
     best_name, best_score, best_params = None, math.inf, None
-    for name in LAWS:
-        _, score, pars = _fit_one(name, x)
-        if score is not None and score < best_score:
-            best_name, best_score, best_params = name, score, pars
+    for lower, _, name in order:
+        if lower >= best_score:
+            break  # rejet anticipé : aucune loi restante ne peut gagner
+        ks_key = digest(x, kind="hours-ks", law=name)
+        if ks_key not in _FIT_CACHE:
+            _FIT_CACHE[ks_key] = _ks(name, x, fits[name][2])
+        score = lower + 0.5 * ss["n"] * _FIT_CACHE[ks_key]
+        if score < best_score:
+            best_name, best_score, best_params = name, score, fits[name][2]
+    _FIT_CACHE.save()
     if best_name is None:
         raise RuntimeError("Aucune loi valide")
     return best_name, best_params
 
 
+def _fit_best_values(data: np.ndarray) -> Tuple[Optional[str], Optional[Tuple]]:
+    """Meilleure loi (critère BIC) parmi VALUE_LAWS, ajustements en cache."""
+    n = len(data)
+
+    def _fit(name: str) -> Optional[Tuple[float, Tuple]]:
+        dist = VALUE_LAWS[name]
+        try:
+            params = dist.fit(data)
+            logL = np.sum(dist.logpdf(data, *params))
+            return len(params) * np.log(n) - 2 * logL, params
+        except Exception:
+            return None
+
+    fits = _fit_laws_cached(data, VALUE_LAWS, "values", _fit)
+    best_name, best_bic, best_params = None, float('inf'), None
+    for name, f in fits.items():
+        if f is not None and f[0] < best_bic:
+            best_name, best_bic, best_params = name, f[0], f[1]
+    return best_name, best_params
+
+
+# ------------------------------------------------------- moteur bootstrap
+def _bootstrap_engine(draw: Callable[[Tuple[int, int]], np.ndarray],
+                      n: int,
+                      n_rep: int,
+                      stats: Tuple[str, ...] = ("mean",),
+                      max_cells: int = BOOT_MAX_CELLS) -> Dict[str, np.ndarray]:
+    """
+    Bootstrap vectorisé : `draw(shape)` renvoie une matrice (répétitions × n)
+    de tirages ; les statistiques demandées ("mean", "median", "std") sont
+    calculées le long de l'axe 1. Les répétitions sont traitées par blocs d'au
+    plus `max_cells` valeurs pour borner la mémoire.
+    """
+    rows = max(1, max_cells // max(n, 1))
+    out: Dict[str, list] = {k: [] for k in stats}
+    for start in range(0, n_rep, rows):
+        m = draw((min(rows, n_rep - start), n))
+        for k in stats:
+            out[k].append(_BOOT_STATS[k](m))
+    return {k: np.concatenate(v) for k, v in out.items()}
+
+
+def _truncated_sampler(dist: st.rv_continuous, params: Tuple, law: str,
+                       rng: np.random.Generator) -> Callable[[Tuple[int, int]], np.ndarray]:
+    """
+    Tirages de la loi ajustée restreinte à [0,24) par inversion de la CDF :
+    u ~ U(F(0), F(24)) puis x = F⁻¹(u), sans boucle de rejet.
+    Pour vonmises (loi circulaire en radians), conversion directe en heures.
+    """
+    if law == "vonmises":
+        return lambda shape: dist.rvs(*params, size=shape, random_state=rng) * 24 / (2 * math.pi)
+    f_lo, f_hi = dist.cdf([A, B], *params)
+    return lambda shape: dist.ppf(rng.uniform(f_lo, f_hi, size=shape), *params)
+
+
 # --------------------------------------------------- bootstrap (mean, sigma)
 def _bootstrap_mean_sigma(
         sample: np.ndarray,
@@ -115,7 +252,8 @@ def _bootstrap_mean_sigma(
         params: Tuple,
         law: str,
         n_rep: int = 2000,
-        seed: int = 0
+        seed: int = 0,
+        max_cells: int = BOOT_MAX_CELLS
 ) -> dict[str, float]:
     """
     Bootstrap pour estimer IC95 de la moyenne, de la médiane et de l'écart-type
@@ -126,40 +264,23 @@ def _bootstrap_mean_sigma(
     - law    : nom de la loi ("vonmises", "truncnorm", etc.)
     - n_rep  : nombre de répétitions bootstrap
     - seed   : graine pour la reproductibilité
+    - max_cells : taille maximale (valeurs) d'un bloc de tirages
 
     Retourne un dict avec les bornes inférieure/supérieure à 95 % pour mean, median, sigma.
     """
     n = len(sample)
     rng = np.random.default_rng(seed)
-
-    def _rvs(size: int) -> np.ndarray:
-        # Tirages respectant la tronquature sur [0,24] ou la circularité pour vonmises
-        if law == "vonmises":
-            # convertit de radians (0–2π) en heures (0–24)
-            return dist.rvs(*params, size=size) * 24 / (2 * math.pi)
-        out = []
-        while len(out) < size:
-            d = dist.rvs(*params, size=size)
-            # on ne conserve que les valeurs dans [0,24)
-            valid = d[(0 <= d) & (d < 24)]
-            out.extend(valid.tolist())
-        return np.asarray(out[:size])
-
-    means, medians, sigmas = [], [], []
-    for _ in range(n_rep):
-        s = _rvs(n)
-        means.append(s.mean())
-        medians.append(np.median(s))
-        sigmas.append(s.std(ddof=1))
+    res = _bootstrap_engine(_truncated_sampler(dist, params, law, rng), n, n_rep,
+                            stats=("mean", "median", "std"), max_cells=max_cells)
 
     pct = np.percentile
     return {
-        "mean_lo": pct(means, 2.5),
-        "mean_hi": pct(means, 97.5),
-        "median_lo": pct(medians, 2.5),
-        "median_hi": pct(medians, 97.5),
-        "sigma_lo": pct(sigmas, 2.5),
-        "sigma_hi": pct(sigmas, 97.5),
+        "mean_lo": pct(res["mean"], 2.5),
+        "mean_hi": pct(res["mean"], 97.5),
+        "median_lo": pct(res["median"], 2.5),
+        "median_hi": pct(res["median"], 97.5),
+        "sigma_lo": pct(res["std"], 2.5),
+        "sigma_hi": pct(res["std"], 97.5),
     }
 
 
@@ -174,8 +295,8 @@ def compute_confidence_intervals_hours(hours: np.ndarray,
     if n < 5:
         return {"ic_boot_mean_lo": np.nan, "ic_boot_mean_hi": np.nan}
 
-    means = [rng.choice(hours, size=n, replace=True).mean() for _ in range(n_boot)]
-    lo, hi = np.percentile(means, [2.5, 97.5])
+    res = _bootstrap_engine(lambda shape: rng.choice(hours, size=shape, replace=True), n, n_boot)
+    lo, hi = np.percentile(res["mean"], [2.5, 97.5])
     return {"ic_boot_mean_lo": lo, "ic_boot_mean_hi": hi}
 
 
@@ -239,48 +360,79 @@ def compute_parametric_ci(law: str, params: Tuple, alpha: float = 0.05) -> dict[
     return {"lo": float(lo), "hi": float(hi), "mode": float(mode)}
 
 
-def compute_hdi(sample: np.ndarray, cred_mass: float = 0.95) -> dict[str, float]:
+def compute_hdi(sample: np.ndarray, cred_mass: float = 0.95,
+                period: Optional[float] = None) -> dict[str, float]:
     """
     Calcule l'intervalle HDI (Highest Density Interval) de masse cred_mass
-    et le mode principal (via KDE).
+    et le mode principal (via la KDE partagée du module kde).
+    Pour des heures, period=24.0 : l'intervalle est le plus court arc du
+    cercle (hi peut alors dépasser period, hi - lo restant la largeur) et la
+    densité est circulaire.
     """
     arr = np.sort(sample[~np.isnan(sample)])
+    if period is not None:
+        arr = np.sort(np.mod(arr, period))
     N = len(arr)
     if N < 3:
         return {"lo": np.nan, "hi": np.nan, "mode": np.nan}
 
     k = int(np.floor(cred_mass * N))
-    widths = arr[k:] - arr[:N - k]
+    ext = arr if period is None else np.r_[arr, arr + period]  # arcs passant par minuit
+    n_start = N - k if period is None else N
+    widths = ext[k:k + n_start] - ext[:n_start]
     idx = np.argmin(widths)
-    lo, hi = arr[idx], arr[idx + k]
+    lo, hi = ext[idx], ext[idx + k]
 
-    kde = gaussian_kde(arr)
+    kde = kde_density(arr, period=period)
     grid = np.linspace(lo, hi, 200)
-    dens = kde(grid)
-    mode = grid[np.argmax(dens)]
+    mode = grid[np.argmax(kde(grid))] if kde is not None else lo
+    if period is not None:
+        mode = mode % period
 
     return {"lo": float(lo), "hi": float(hi), "mode": float(mode)}
 
 
 def get_primary_peak_hours(hours: np.ndarray,
                            grid_steps: int = 1000,
-                           window_half_width: float = 1.0) -> np.ndarray:
+                           window_half_width: float = 1.0,
+                           period: Optional[float] = 24.0) -> np.ndarray:
     """
     Isole le cluster d'heures autour du pic principal de la densité (KDE),
     puis renvoie uniquement les heures situées à ±window_half_width/2 h autour de ce pic.
+    Les heures sont circulaires (période 24 h) ; period=None pour une variable
+    linéaire (valeurs extrêmes, voir compute_value_clusters), la densité étant
+    alors évaluée sur l'étendue de l'échantillon.
+    Même règle dans les deux cas : le pic principal est le plus haut maximum
+    local de la densité (voisins circulaires si period est donné), à défaut
+    la moyenne (circulaire) de l'échantillon.
     """
     arr = np.sort(hours[~np.isnan(hours)])
     if len(arr) < 3:
         return arr
 
-    kde = gaussian_kde(arr)
-    grid = np.linspace(0, 24, grid_steps)
-    density = kde(grid)
-
-    peaks, _ = find_peaks(density)
-    center = grid[peaks[np.argmax(density[peaks])]] if len(peaks) else np.mean(arr)
-
-    diff = np.abs(((arr - center + 12) % 24) - 12)
+    kde = kde_density(arr, period=period)
+    if kde is None:
+        return arr
+    if period is not None:
+        grid = np.linspace(0, period, grid_steps, endpoint=False)
+        density = kde(grid)
+        peaks = find_peaks(np.r_[density[-1], density, density[0]])[0] - 1
+    else:
+        grid = np.linspace(kde.grid[0], kde.grid[-1], grid_steps)
+        density = kde(grid)
+        peaks = find_peaks(density)[0]
+
+    if len(peaks):
+        center = grid[peaks[np.argmax(density[peaks])]]
+    elif period is not None:
+        angles = 2 * np.pi * arr / period
+        center = (np.arctan2(np.sin(angles).mean(), np.cos(angles).mean()) * period / (2 * np.pi)) % period
+    else:
+        center = np.mean(arr)
+    if period is not None:
+        diff = np.abs(((arr - center + period / 2) % period) - period / 2)
+    else:
+        diff = np.abs(arr - center)
     mask = diff <= (window_half_width / 2)
     return arr[mask]
 
@@ -290,31 +442,11 @@ def compute_value_extremes_stats(daily_stats: pd.DataFrame) -> dict[str, dict]:
     Ajuste les meilleures lois (par critère BIC) aux valeurs max & min journalières.
     Renvoie {'max': {'law': nom, 'params': tuple}, 'min': {...}}.
     """
-
-    def _fit_best(data: np.ndarray):
-        best_name, best_bic, best_params = None, float('inf'), None
-        n = len(data)
-        for name, dist in {
-            'norm': norm,
-            'logistic': logistic,
-            'weibull_min': weibull_min,
-            'truncnorm': truncnorm
-        }.items():
-            try:
-                params = dist.fit(data)
-                logL = np.sum(dist.logpdf(data, *params))
-                bic = len(params) * np.log(n) - 2 * logL
-                if bic < best_bic:
-                    best_name, best_bic, best_params = name, bic, params
-            except Exception:
-                continue
-        return best_name, best_params
-
     arr_max = daily_stats['max'].dropna().values
     arr_min = daily_stats['min'].dropna().values
 
-    law_max, params_max = _fit_best(arr_max)
-    law_min, params_min = _fit_best(arr_min)
+    law_max, params_max = _fit_best_values(arr_max)
+    law_min, params_min = _fit_best_values(arr_min)
 
     return {
         'max': {'law': law_max, 'params': params_max},
@@ -331,8 +463,12 @@ def compute_value_clusters(daily_stats: pd.DataFrame, window_half_width: float)
     arr_max = daily_stats['max'].dropna().values
     arr_min = daily_stats['min'].dropna().values
 
-    cluster_max = get_primary_peak_hours(arr_max, window_half_width=window_half_width)
-    cluster_min = get_primary_peak_hours(arr_min, window_half_width=window_half_width)
+    # Valeurs linéaires : densité évaluée sur l'étendue de l'échantillon. La
+    # version d'origine réutilisait la grille 0–24 des heures (pas de 0,024 inch,
+    # comparable à l'étendue des extrêmes) : le centre des clusters est désormais
+    # résolu à l'échelle des valeurs et peut différer de l'ancien.
+    cluster_max = get_primary_peak_hours(arr_max, window_half_width=window_half_width, period=None)
+    cluster_min = get_primary_peak_hours(arr_min, window_half_width=window_half_width, period=None)
 
     center_max = float(np.mean(cluster_max)) if cluster_max.size else np.nan
     center_min = float(np.mean(cluster_min)) if cluster_min.size else np.nan
@@ -355,27 +491,8 @@ def compute_value_cluster_stats(daily_stats: pd.DataFrame,
     arr_max_cl = clusters['cluster_max']
     arr_min_cl = clusters['cluster_min']
 
-    def _fit_best(data: np.ndarray):
-        best_name, best_bic, best_params = None, float('inf'), None
-        n = len(data)
-        for name, dist in {
-            'norm': norm,
-            'logistic': logistic,
-            'weibull_min': weibull_min,
-            'truncnorm': truncnorm
-        }.items():
-            try:
-                params = dist.fit(data)
-                logL = np.sum(dist.logpdf(data, *params))
-                bic = len(params) * np.log(n) - 2 * logL
-                if bic < best_bic:
-                    best_name, best_bic, best_params = name, bic, params
-            except Exception:
-                continue
-        return best_name, best_params
-
-    law_max_cl, params_max_cl = _fit_best(arr_max_cl)
-    law_min_cl, params_min_cl = _fit_best(arr_min_cl)
+    law_max_cl, params_max_cl = _fit_best_values(arr_max_cl)
+    law_min_cl, params_min_cl = _fit_best_values(arr_min_cl)
 
     return {
         'max': {'law': law_max_cl, 'params': params_max_cl},
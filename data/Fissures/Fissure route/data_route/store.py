@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+Stockage colonne (Parquet) des mesures du comparateur, partitionné par jour.
+
+Arborescence : <store_dir>/day=YYYY-MM-DD/part.parquet
+  - timestamp : timestamp[us] (naïf, heure locale du Raspberry Pi),
+  - inch      : float32.
+Le store est alimenté incrémentalement à partir du CSV local : le manifeste
+`_manifest.json` mémorise l'offset (octets) du CSV déjà intégré et la dernière
+ligne lue, ce qui permet de ne parser que les nouvelles lignes et de détecter
+un CSV réécrit (reconstruction complète dans ce cas).
+"""
+import io
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from pyarrow import fs
+
+from config import load_config
+from csv_delta import read_new_lines
+from timestamps import parse_timestamps
+
+cfg = load_config()
+
+SCHEMA = pa.schema([("timestamp", pa.timestamp("us")), ("inch", pa.float32())])
+PARTITIONING = ds.partitioning(pa.schema([("day", pa.string())]), flavor="hive")
+MANIFEST = "_manifest.json"
+# float32 garde ~7 chiffres significatifs : l'arrondi au 1e-6 inch à la lecture
+# restitue la valeur décimale écrite dans le CSV.
+INCH_DECIMALS = 6
+
+
+def default_store_dir() -> Path:
+    """`paths.store_dir` de config.yaml, sinon dossier `store` à côté du CSV local."""
+    store_dir = cfg["paths"].get("store_dir")
+    if store_dir:
+        return Path(store_dir)
+    return Path(cfg["paths"]["local_csv"]).parent / "store"
+
+
+def _load_manifest(store_dir: Path) -> Dict[str, Any]:
+    path = store_dir / MANIFEST
+    if not path.exists():
+        return {"csv_offset": 0, "tail": ""}
+    with path.open(encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _save_manifest(store_dir: Path, offset: int, tail: bytes) -> None:
+    with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=store_dir, prefix=".manifest-",
+                                     suffix=".tmp", delete=False) as f:
+        json.dump({"csv_offset": offset, "tail": tail.decode("utf-8")}, f)
+    os.replace(f.name, store_dir / MANIFEST)
+
+
+def _partition_path(store_dir: Path, day: str) -> Path:
+    return store_dir / f"day={day}" / "part.parquet"
+
+
+def _parse_csv_bytes(raw: bytes) -> pd.DataFrame:
+    """Parse un bloc de lignes `timestamp,inch` (sans en-tête)."""
+    df = pd.read_csv(io.BytesIO(raw), header=None, names=["timestamp", "inch"],
+                     dtype={"timestamp": "S27"})
+    df["inch"] = pd.to_numeric(df["inch"], errors="coerce")
+    df["timestamp"] = parse_timestamps(df["timestamp"].to_numpy(), source="store")
+    return df.dropna(subset=["timestamp"])
+
+
+def _write_day(store_dir: Path, day: str, new_rows: pd.DataFrame) -> None:
+    """
+    Fusionne `new_rows` dans la partition du jour (réécriture d'un seul fichier,
+    via un fichier temporaire remplacé atomiquement). Un horodatage n'apparaît
+    qu'une fois : si un bloc est réintégré après une interruption entre
+    l'écriture des partitions et celle du manifeste, les lignes déjà présentes
+    sont conservées et les doublons écartés.
+    """
+    path = _partition_path(store_dir, day)
+    rows = new_rows[["timestamp", "inch"]]
+    if path.exists():
+        rows = pd.concat([pq.read_table(path, schema=SCHEMA).to_pandas(), rows], ignore_index=True)
+    rows = rows.sort_values("timestamp", kind="stable").drop_duplicates("timestamp", keep="first")
+    table = pa.Table.from_pandas(rows, schema=SCHEMA, preserve_index=False)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Préfixe "." : un fichier temporaire orphelin est ignoré par pyarrow.dataset
+    with tempfile.NamedTemporaryFile(dir=path.parent, prefix=".part-", suffix=".tmp", delete=False) as f:
+        pq.write_table(table, f)
+    os.replace(f.name, path)
+
+
+def update_store(csv_path: Optional[Union[str, Path]] = None,
+                 store_dir: Optional[Union[str, Path]] = None) -> int:
+    """
+    Intègre au store les lignes complètes du CSV postérieures au dernier offset
+    traité ; seules les partitions des jours concernés sont réécrites.
+    Renvoie le nombre de lignes ajoutées.
+    """
+    csv_path = Path(csv_path or cfg["paths"]["local_csv"])
+    store_dir = Path(store_dir or default_store_dir())
+    store_dir.mkdir(parents=True, exist_ok=True)
+
+    manifest = _load_manifest(store_dir)
+    offset = int(manifest["csv_offset"])
+    tail = manifest["tail"].encode("utf-8")
+    size = csv_path.stat().st_size
+
+    with csv_path.open("rb") as f:
+        new = read_new_lines(f, size, offset, tail)
+        if new is None:
+            # CSV raccourci ou réécrit → reconstruction complète du store
+            print("Store Parquet incohérent avec le CSV local → reconstruction complète.")
+            shutil.rmtree(store_dir)
+            store_dir.mkdir(parents=True)
+            offset = 0
+            new = read_new_lines(f, size, 0, b"")
+
+    raw, last_line = new
+    if not raw:
+        return 0
+
+    df = _parse_csv_bytes(raw)
+    days = df["timestamp"].dt.normalize()
+    for day, part in df.groupby(days, sort=True):
+        _write_day(store_dir, day.strftime("%Y-%m-%d"), part)
+
+    _save_manifest(store_dir, offset + len(raw), last_line)
+    return len(df)
+
+
+def read_store(start_day: pd.Timestamp, end_day: pd.Timestamp,
+               store_dir: Optional[Union[str, Path]] = None) -> pd.DataFrame:
+    """
+    Lit les mesures des jours [start_day, end_day] (bornes incluses).
+    Le filtre porte sur la clé de partition `day` : seuls les fichiers des jours
+    demandés sont ouverts (en mémoire mappée).
+    """
+    store_dir = Path(store_dir or default_store_dir())
+    dataset = ds.dataset(
+        str(store_dir), format="parquet", partitioning=PARTITIONING,
+        filesystem=fs.LocalFileSystem(use_mmap=True)
+    )
+    day_filter = (
+        (ds.field("day") >= start_day.strftime("%Y-%m-%d"))
+        & (ds.field("day") <= end_day.strftime("%Y-%m-%d"))
+    )
+    df = dataset.to_table(columns=["timestamp", "inch"], filter=day_filter).to_pandas()
+    df["inch"] = np.round(df["inch"].astype("float64"), INCH_DECIMALS)
+    return df.sort_values("timestamp").reset_index(drop=True)
@@ -5,14 +5,17 @@ from statsmodels.nonparametric.smoothers_lowess import lowess
 from datetime import datetime
 import os
 
+from timestamps import parse_timestamps
+
 # --- Chargement des données (inch & timestamp) ---
 def load_data(local_path, start_day_str, end_day_str):
     start = pd.to_datetime(start_day_str)
     end   = pd.to_datetime(end_day_str) + pd.Timedelta(days=1)
-    df = pd.read_csv(local_path, header=None)
+    df = pd.read_csv(local_path, header=None, dtype={0: 'S27'})
     df.columns = ['timestamp','inch']
     df['inch'] = pd.to_numeric(df['inch'], errors='coerce')
-    df['timestamp'] = pd.to_datetime(df['timestamp'])
+    df['timestamp'] = parse_timestamps(df['timestamp'].to_numpy(), source=local_path)
+    df = df.dropna(subset=['timestamp'])
     df = df.sort_values('timestamp')
     df = df[(df['timestamp'] >= start) & (df['timestamp'] < end)]
     df = df[(df['timestamp'].diff() >= pd.Timedelta(seconds=10)) | df['timestamp'].diff().isna()]
@@ -1,10 +1,19 @@
 # time_calculator.py
 # -*- coding: utf-8 -*-
 
+import os
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+
 import numpy as np
 import pandas as pd
 from statsmodels.nonparametric.smoothers_lowess import lowess
 
+from cache import DiskCache, cached_per_day, day_bounds
+from config import load_config, preload_config
+cfg = load_config()
+
 
 def calculate_central_times(df, daily_stats=None):
     """
@@ -25,6 +34,193 @@ def calculate_central_times(df, daily_stats=None):
     return np.array(min_times, dtype=float), np.array(max_times, dtype=float)
 
 
+EXTREMA_COLUMNS = ['day', 'time_max', 'val_max', 'time_min', 'val_min']
+# Paramètres LOWESS / raffinage (la marge vient de `neighbor_layers`)
+EXTREMA_PARAMS = dict(frac=0.05, tol_cand=1e-3, tol_plateau=1e-6, window_min=20)
+_EXTREMA_CACHE = DiskCache("extrema")
+
+
+def _pick_first(groups: np.ndarray, *keys: np.ndarray) -> np.ndarray:
+    """
+    Pour chaque groupe, position (dans les tableaux d'entrée) du premier élément
+    selon l'ordre lexicographique croissant de `keys` ; `groups` doit être trié.
+    """
+    if groups.size == 0:
+        return np.empty(0, dtype=int)
+    order = np.lexsort(tuple(reversed(keys)) + (groups,))
+    g = groups[order]
+    return order[np.r_[True, g[1:] != g[:-1]]]
+
+
+def _runs(mask: np.ndarray, seg: np.ndarray):
+    """
+    Encodage par plages (RLE) d'un masque booléen, sans plage à cheval sur deux
+    jours : renvoie les indices de début et de fin (inclus) de chaque plage.
+    """
+    same_day = seg[1:] == seg[:-1]
+    prev = np.r_[False, mask[:-1] & same_day]
+    nxt = np.r_[mask[1:] & same_day, False]
+    return np.flatnonzero(mask & ~prev), np.flatnonzero(mask & ~nxt)
+
+
+def _refine_extrema(ts, vals, seg, seg_lo, seg_hi, idx, is_max,
+                    tol_cand, tol_plateau, window):
+    """
+    Raffinage, pour tous les jours à la fois, des extrêmes LOWESS `idx` (un
+    indice global par jour) :
+      - recherche dans ±window d'un candidat plus extrême (tol_cand) ;
+      - s'il existe, plateau de ce candidat (tol_plateau) restreint à la fenêtre,
+        sinon plateau de la valeur initiale sur toute la journée ;
+      - run retenu : celui contenant le point initial, sinon le plus long ;
+      - horodatage recentré au milieu du run.
+    """
+    n_days = idx.size
+    t0, v0 = ts[idx], vals[idx]
+    day = seg[idx]
+    raw = np.searchsorted(ts, t0, side='left')
+    lo = np.maximum(np.searchsorted(ts, t0 - window, side='left'), seg_lo[day])
+    hi = np.minimum(np.searchsorted(ts, t0 + window, side='right'), seg_hi[day])
+
+    ufunc = np.maximum if is_max else np.minimum
+    ext = ufunc.reduceat(np.r_[vals, np.nan], np.c_[lo, hi].ravel())[::2]
+    has_cand = ext > v0 + tol_cand if is_max else ext < v0 - tol_cand
+    target = np.where(has_cand, ext, v0)
+
+    # Jour → rang dans idx (−1 pour les jours sans extrême)
+    slot_of_day = np.full(seg_lo.size, -1)
+    slot_of_day[day] = np.arange(n_days)
+    slot = slot_of_day[seg]
+    ok = slot >= 0
+    slot = np.where(ok, slot, 0)
+    rows = np.arange(ts.size)
+    in_win = (rows >= lo[slot]) & (rows < hi[slot])
+    mask = ok & np.isclose(vals, target[slot], atol=tol_plateau) & (~has_cand[slot] | in_win)
+
+    run_s, run_e = _runs(mask, seg)
+    run_slot = slot[run_s]
+    contains = (run_s <= raw[run_slot]) & (run_e >= raw[run_slot])
+    pick = _pick_first(run_slot, ~contains, run_s - run_e, run_s)
+
+    t_out, v_out = t0.copy(), v0.copy()
+    s, e, k = run_s[pick], run_e[pick], run_slot[pick]
+    t_out[k] = ts[s] + (ts[e] - ts[s]) // 2
+    v_out[k] = target[k]
+    return t_out, v_out
+
+
+def _extrema_batch(ts: np.ndarray, vals: np.ndarray, lengths: np.ndarray,
+                   frac: float, tol_cand: float, tol_plateau: float,
+                   margin: int, window_min: float):
+    """
+    Moteur vectorisé : `ts`/`vals` sont les mesures triées de journées contiguës
+    de tailles `lengths`. Renvoie, par journée, (trouvé, t_max, v_max, t_min, v_min).
+    """
+    n_days = lengths.size
+    seg = np.repeat(np.arange(n_days), lengths)
+    seg_lo = np.r_[0, np.cumsum(lengths)[:-1]]
+    seg_hi = seg_lo + lengths
+
+    # Lissage LOWESS par journée
+    trend = np.empty(vals.size)
+    for a, b in zip(seg_lo, seg_hi):
+        trend[a:b] = lowess(vals[a:b], np.arange(b - a), frac=frac, return_sorted=False)
+
+    # Pics / creux de la tendance, hors bords de journée
+    d = np.diff(trend)
+    pos = np.arange(vals.size) - seg_lo[seg]
+    edge = max(margin, 1)
+    interior = (pos >= edge) & (pos < lengths[seg] - edge)
+    is_peak = interior & np.r_[False, d > 0] & np.r_[d < 0, False]
+    is_valley = interior & np.r_[False, d < 0] & np.r_[d > 0, False]
+
+    peaks, valleys = np.flatnonzero(is_peak), np.flatnonzero(is_valley)
+    max_i = peaks[_pick_first(seg[peaks], -vals[peaks], peaks)]
+    min_i = valleys[_pick_first(seg[valleys], vals[valleys], valleys)]
+    both = np.intersect1d(seg[max_i], seg[min_i])
+    max_i = max_i[np.isin(seg[max_i], both)]
+    min_i = min_i[np.isin(seg[min_i], both)]
+
+    found = np.zeros(n_days, dtype=bool)
+    t_max = np.full(n_days, np.datetime64('NaT'), dtype=ts.dtype)
+    t_min = t_max.copy()
+    v_max = np.full(n_days, np.nan)
+    v_min = v_max.copy()
+    if both.size:
+        window = np.timedelta64(window_min, 'm')
+        found[both] = True
+        t_max[both], v_max[both] = _refine_extrema(ts, vals, seg, seg_lo, seg_hi, max_i, True,
+                                                   tol_cand, tol_plateau, window)
+        t_min[both], v_min[both] = _refine_extrema(ts, vals, seg, seg_lo, seg_hi, min_i, False,
+                                                   tol_cand, tol_plateau, window)
+    return found, t_max, v_max, t_min, v_min
+
+
+def _extrema_workers() -> int:
+    """`analysis.extrema_workers` de config.yaml (1 = série, 0 = tous les cœurs)."""
+    n = int(cfg.get("analysis", {}).get("extrema_workers", 1))
+    return (os.cpu_count() or 1) if n <= 0 else n
+
+
+def _attach(name: str) -> SharedMemory:
+    try:
+        return SharedMemory(name=name, track=False)  # Python ≥ 3.13
+    except TypeError:
+        return SharedMemory(name=name)
+
+
+def _extrema_worker(task):
+    """
+    Exécuté dans un processus du pool : lit sans copie, dans la mémoire partagée,
+    la tranche [lo, hi) des journées qui lui sont confiées.
+    """
+    ts_name, vals_name, ts_dtype, lo, hi, lengths, params = task
+    shm_ts, shm_vals = _attach(ts_name), _attach(vals_name)
+    try:
+        ts = np.frombuffer(shm_ts.buf, dtype='i8', count=hi)[lo:hi].view(ts_dtype)
+        vals = np.frombuffer(shm_vals.buf, dtype=float, count=hi)[lo:hi]
+        res = _extrema_batch(ts, vals, lengths, **params)
+        del ts, vals  # libère les vues avant fermeture du segment
+    finally:
+        shm_ts.close()
+        shm_vals.close()
+    return res
+
+
+def _run_extrema(ts: np.ndarray, vals: np.ndarray, lengths: np.ndarray, params: dict):
+    """
+    Lance `_extrema_batch`, en série ou réparti sur un pool de processus.
+    Les journées sont découpées en blocs contigus ; les mesures sont placées une
+    fois en mémoire partagée et chaque tâche n'en reçoit que les bornes. Les
+    résultats sont concaténés dans l'ordre des blocs (fusion déterministe).
+    """
+    workers = min(_extrema_workers(), lengths.size)
+    if workers <= 1:
+        return _extrema_batch(ts, vals, lengths, **params)
+
+    bounds = np.r_[0, np.cumsum(lengths)]
+    chunks = np.array_split(np.arange(lengths.size), min(lengths.size, workers * 2))
+    ts_i8 = ts.view('i8')
+    shm_ts = SharedMemory(create=True, size=ts_i8.nbytes)
+    shm_vals = SharedMemory(create=True, size=vals.nbytes)
+    try:
+        np.frombuffer(shm_ts.buf, dtype='i8', count=ts_i8.size)[:] = ts_i8
+        np.frombuffer(shm_vals.buf, dtype=float, count=vals.size)[:] = vals
+        tasks = [(shm_ts.name, shm_vals.name, ts.dtype.str,
+                  int(bounds[c[0]]), int(bounds[c[-1] + 1]), lengths[c], params)
+                 for c in chunks]
+        # Pas de fork : le processus principal a des threads (Dash, sonde SSH,
+        # rafraîchissement live) dont les verrous seraient copiés dans l'enfant
+        method = "forkserver" if "forkserver" in mp.get_all_start_methods() else "spawn"
+        with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context(method),
+                                 initializer=preload_config, initargs=(cfg,)) as ex:
+            parts = list(ex.map(_extrema_worker, tasks))
+    finally:
+        for shm in (shm_ts, shm_vals):
+            shm.close()
+            shm.unlink()
+    return tuple(np.concatenate(col) for col in zip(*parts))
+
+
 def compute_daily_extrema_timestamps(
         df: pd.DataFrame,
         neighbor_layers: int = 4
@@ -33,6 +229,15 @@ def compute_daily_extrema_timestamps(
     Calcule pour chaque jour (sauf premier et dernier) les extrema (min et max)
     en utilisant LOWESS pour lisser et un raffinage local autour de chaque extrême.
 
+    Toutes les journées sont traitées en une passe sur un unique tableau trié :
+    bornes de journées par recherche dichotomique, détection des pics/creux et
+    raffinage des plateaux (RLE) vectorisés ; seul le lissage LOWESS reste un
+    appel par journée.
+    Les résultats sont mémorisés par journée dans le cache disque `extrema`,
+    sous l'empreinte des mesures du jour et des paramètres : seules les journées
+    nouvelles ou modifiées sont recalculées, en parallèle si
+    `analysis.extrema_workers` > 1.
+
     Paramètres
     ----------
     df : pd.DataFrame
@@ -46,149 +251,51 @@ def compute_daily_extrema_timestamps(
     pd.DataFrame
         Colonnes ['day','time_max','val_max','time_min','val_min'].
     """
-    # -- Paramètres internes pour LOWESS et raffinage --
-    frac = 0.05
-    tol_cand = 1e-3
-    tol_plateau = 1e-6
-    margin = neighbor_layers
-    window_min = 20
-
-    def refine_window_extremum(res, vals, times):
-        """
-        Raffine les extrêmes initiaux en cherchant, dans une fenêtre de ±window_min
-        minutes, un candidat plus extrême (tol_cand) sur un plateau (tol_plateau),
-        ou en recentrant sur le run global.
-        """
-        def center_of_run(s, e):
-            t0, t1 = times.iloc[s], times.iloc[e]
-            return t0 + (t1 - t0) / 2
-
-        def find_runs(idxs):
-            runs = []
-            if not idxs:
-                return runs
-            start = prev = idxs[0]
-            for i in idxs[1:]:
-                if i == prev + 1:
-                    prev = i
-                else:
-                    runs.append((start, prev))
-                    start = prev = i
-            runs.append((start, prev))
-            return runs
-
-        for key_t, key_v, is_max in [("t_max","v_max",True), ("t_min","v_min",False)]:
-            diffs = (times - res[key_t]).abs().values
-            raw_i = int(np.argmin(diffs))
-            v0 = res[key_v]
-
-            t_center = res[key_t]
-            lower = t_center - pd.Timedelta(minutes=window_min)
-            upper = t_center + pd.Timedelta(minutes=window_min)
-            mask = (times >= lower) & (times <= upper)
-            win_idxs = np.nonzero(mask)[0]
-
-            v_cand = None
-            if win_idxs.size:
-                seg = vals[win_idxs]
-                extremum = seg.max() if is_max else seg.min()
-                cond = (is_max and extremum > v0 + tol_cand) or (not is_max and extremum < v0 - tol_cand)
-                if cond:
-                    v_cand = extremum
-
-            if v_cand is not None:
-                cand_mask = mask & np.isclose(vals, v_cand, atol=tol_plateau)
-                idxs_ext = np.nonzero(cand_mask)[0].tolist()
-                runs = find_runs(idxs_ext)
-                run = next((r for r in runs if r[0] <= raw_i <= r[1]), None) \
-                      or (max(runs, key=lambda r: r[1]-r[0]) if runs else None)
-                if run:
-                    s, e = run
-                    res[key_v] = v_cand
-                    res[key_t] = center_of_run(s, e)
-            else:
-                plateaus = np.nonzero(np.isclose(vals, v0, atol=tol_plateau))[0].tolist()
-                runs0 = find_runs(plateaus)
-                run = next((r for r in runs0 if r[0] <= raw_i <= r[1]), None) \
-                      or (max(runs0, key=lambda r: r[1]-r[0]) if runs0 else None)
-                if run:
-                    s, e = run
-                    res[key_v] = v0
-                    res[key_t] = center_of_run(s, e)
-        return res
-
-    def method_lowess(vals, times):
-        trend = lowess(vals, np.arange(len(vals)), frac=frac, return_sorted=False)
-        d = np.diff(trend)
-        idx_max = [i+1 for i in range(len(d)-1) if d[i]>0 and d[i+1]<0]
-        idx_min = [i+1 for i in range(len(d)-1) if d[i]<0 and d[i+1]>0]
-        interior = range(margin, len(vals)-margin)
-        peaks   = [i for i in idx_max if i in interior]
-        valleys = [i for i in idx_min if i in interior]
-        if not peaks or not valleys:
-            return None
-        max_i = max(peaks, key=lambda i: vals[i])
-        min_i = min(valleys, key=lambda i: vals[i])
-        res = {'t_max': times.iloc[max_i], 'v_max': vals[max_i],
-               't_min': times.iloc[min_i], 'v_min': vals[min_i]}
-        return refine_window_extremum(res, vals, times)
-
-    # Préparation
-    df2 = df.copy()
-    df2['timestamp'] = pd.to_datetime(df2['timestamp'])
-    df2 = df2.sort_values('timestamp')
-    df2['day'] = df2['timestamp'].dt.date
-
-    days = sorted(df2['day'].unique())
-    if len(days) <= 2:
-        return pd.DataFrame(columns=['day','time_max','val_max','time_min','val_min'])
-
-    first_day, last_day = days[0], days[-1]
-    records = []
-
-    for day, grp in df2.groupby('day'):
-        if day in (first_day, last_day):
-            continue
-        sub = grp.sort_values('timestamp').reset_index(drop=True)
-        if len(sub) < margin*2 + 3:
-            continue
-        vals = sub['inch'].to_numpy()
-        times = sub['timestamp']
-        out = method_lowess(vals, times)
-        if out is None:
-            continue
-        records.append({
-            'day': day,
-            'time_max': out['t_max'],
-            'val_max': out['v_max'],
-            'time_min': out['t_min'],
-            'val_min': out['v_min']
-        })
-
-    return pd.DataFrame(records)
+    # -- Paramètres LOWESS et raffinage (font partie de la clé de cache) --
+    params = dict(EXTREMA_PARAMS, margin=neighbor_layers)
+
+    # Préparation : un seul tri (stable) de toutes les mesures
+    ts, vals, days, day_lo, day_hi = day_bounds(pd.to_datetime(df['timestamp']).to_numpy(),
+                                                df['inch'].to_numpy(dtype=float))
+    if day_lo.size <= 2:
+        return pd.DataFrame(columns=EXTREMA_COLUMNS)
+
+    # Jours retenus : ni premier ni dernier, et assez de points
+    day_lo, day_hi = day_lo[1:-1], day_hi[1:-1]
+    keep = (day_hi - day_lo) >= params['margin'] * 2 + 3
+    day_lo, day_hi = day_lo[keep], day_hi[keep]
+    if day_lo.size == 0:
+        return pd.DataFrame(columns=EXTREMA_COLUMNS)
+
+    # Cache : empreinte de chaque journée, calcul groupé des seules manquantes
+    per_day = cached_per_day(_EXTREMA_CACHE, ts, vals, day_lo, day_hi,
+                             lambda t, v, lengths: list(zip(*_run_extrema(t, v, lengths, params))), **params)
+    found, t_max, v_max, t_min, v_min = (np.array(col) for col in zip(*per_day))
+    found = found.astype(bool)
+    return pd.DataFrame({
+        'day': pd.DatetimeIndex(days[day_lo[found]]).date,
+        'time_max': t_max[found],
+        'val_max': v_max[found].astype(float),
+        'time_min': t_min[found],
+        'val_min': v_min[found].astype(float),
+    })
 
 
 def get_extreme_half_hours(df_day_half_mean, df_day_half_median):
     """
     Récupère, pour chaque jour, l'heure (en demi-heure décimale) où se produit
-    le max/min dans df_day_half_mean et df_day_half_median.
-    """
-    max_half_times_mean = df_day_half_mean.groupby('day').apply(
-        lambda grp: grp.loc[grp['inch'].idxmax(), 'half_hour']
-    )
-    min_half_times_mean = df_day_half_mean.groupby('day').apply(
-        lambda grp: grp.loc[grp['inch'].idxmin(), 'half_hour']
-    )
-    max_half_times_median = df_day_half_median.groupby('day').apply(
-        lambda grp: grp.loc[grp['inch'].idxmax(), 'half_hour']
-    )
-    min_half_times_median = df_day_half_median.groupby('day').apply(
-        lambda grp: grp.loc[grp['inch'].idxmin(), 'half_hour']
-    )
-
-    return {
-        "max_half_times_mean": max_half_times_mean,
-        "min_half_times_mean": min_half_times_mean,
-        "max_half_times_median": max_half_times_median,
-        "min_half_times_median": min_half_times_median
-    }
+    le max/min dans df_day_half_mean et df_day_half_median. Les tables longues
+    sont remises en cube jour × 48 demi-heures puis réduites par argmax/argmin
+    (voir aggregation.HalfHourCube, qui fournit directement ce résultat).
+    """
+    out = {}
+    for name, frame in (("mean", df_day_half_mean), ("median", df_day_half_median)):
+        day_codes, days = pd.factorize(frame['day'], sort=True)
+        slots = (frame['half_hour'].to_numpy() * 2).astype(int)
+        cube = np.full((len(days), 48), np.nan)
+        cube[day_codes, slots] = frame['inch'].to_numpy(dtype=float)
+        index = pd.Index(days, name='day')
+        for lab, fill, arg in (("max", -np.inf, np.argmax), ("min", np.inf, np.argmin)):
+            slot = arg(np.where(np.isnan(cube), fill, cube), axis=1)
+            out[f"{lab}_half_times_{name}"] = pd.Series(slot * 0.5, index=index)
+    return out
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+Analyse vectorisée des horodatages du comparateur, au format ISO-8601 fixe
+`YYYY-MM-DDTHH:MM:SS.ffffff` (ou sans fraction lorsque les microsecondes sont
+nulles, comme le produit `datetime.isoformat()`), en entiers int64 de
+nanosecondes sans passer par l'inférence de format de `pd.to_datetime`. Les
+lignes non conformes sont écartées (NaT) et signalées.
+
+Benchmark (une année synthétique de mesures toutes les 10 s) :
+    python timestamps.py
+"""
+import time
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+
+WIDTH = 26                       # len("2025-05-25T13:18:06.391823")
+NAT = np.iinfo(np.int64).min     # représentation int64 de NaT
+_DAYS_IN_MONTH = np.array([0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+
+
+def _codes(values: np.ndarray) -> np.ndarray:
+    """
+    Matrice (n, WIDTH + 1) des codes de caractères : octets ASCII, ou UCS-4 si
+    une valeur n'est pas ASCII. Un code non nul en colonne WIDTH signale une
+    chaîne trop longue. Un tableau d'octets (dtype S, p. ex. lu par
+    `pd.read_csv(..., dtype={'timestamp': 'S27'})`) évite la conversion objet.
+    """
+    if values.dtype.kind == "S":
+        text = values.astype(f"S{WIDTH + 1}")
+        return text.view(np.uint8).reshape(len(text), WIDTH + 1)
+    try:
+        text = values.astype(f"S{WIDTH + 1}")
+        dtype = np.uint8
+    except UnicodeEncodeError:
+        text = values.astype(f"U{WIDTH + 1}")
+        dtype = np.uint32
+    return text.view(dtype).reshape(len(text), WIDTH + 1)
+
+
+def _number(codes: np.ndarray, start: int, stop: int):
+    """Entier (int32) formé des chiffres codes[:, start:stop], et masque « que des chiffres »."""
+    digit = codes[:, start] - codes.dtype.type(48)  # arithmétique non signée : < 0 → très grand
+    ok = digit <= 9
+    value = digit.astype(np.int32)
+    for k in range(start + 1, stop):
+        digit = codes[:, k] - codes.dtype.type(48)
+        ok &= digit <= 9
+        value *= 10
+        value += digit
+    return value, ok
+
+
+def _structure_ok(codes: np.ndarray) -> np.ndarray:
+    """Séparateurs et longueur du format fixe (fraction absente ou de 6 chiffres)."""
+    c = codes
+    ok = (c[:, 4] == 45) & (c[:, 7] == 45)                          # '-'
+    ok &= (c[:, 10] == 84) | (c[:, 10] == 32)                       # 'T' ou ' '
+    ok &= (c[:, 13] == 58) & (c[:, 16] == 58)                       # ':'
+    ok &= c[:, WIDTH] == 0
+    last = c[:, WIDTH - 1] - c.dtype.type(48)
+    ok &= ((c[:, 19] == 46) & (last <= 9)) | ((c[:, 19] == 0) & (c[:, 18] != 0))
+    return ok
+
+
+def _fields_ok(codes: np.ndarray) -> np.ndarray:
+    """Chiffres et bornes des champs (mois, jour selon le mois, heure, minute, seconde)."""
+    year, ok = _number(codes, 0, 4)
+    month, ok_mo = _number(codes, 5, 7)
+    day, ok_d = _number(codes, 8, 10)
+    hour, ok_h = _number(codes, 11, 13)
+    minute, ok_mi = _number(codes, 14, 16)
+    sec, ok_s = _number(codes, 17, 19)
+    _, ok_us = _number(codes, 20, 26)
+    ok &= ok_mo & ok_d & ok_h & ok_mi & ok_s & (ok_us | (codes[:, 19] == 0))
+
+    leap = (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+    month_ok = (month >= 1) & (month <= 12)
+    dim = _DAYS_IN_MONTH[np.where(month_ok, month, 0)] + (leap & (month == 2))
+    return ok & month_ok & (day >= 1) & (day <= dim) & (hour < 24) & (minute < 60) & (sec < 60)
+
+
+def parse_iso_us(values) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Convertit des chaînes ISO-8601 à la microseconde en nanosecondes depuis
+    l'epoch (int64). Renvoie (ns, valid) : les lignes invalides (séparateurs,
+    longueur, chiffres ou date/heure hors bornes) valent NAT et valid=False.
+
+    Après contrôle du format fixe, la conversion est confiée à l'analyseur C de
+    numpy (datetime64[us]) ; les contrôles champ par champ ne sont évalués que
+    si numpy rejette une ligne au format correct (p. ex. 2025-02-30).
+    """
+    values = np.asarray(values)
+    if values.dtype.kind not in "SU":
+        values = values.astype(object)
+    codes = _codes(values)
+    valid = _structure_ok(codes)
+    try:
+        micro = values[valid].astype("datetime64[us]")
+    except ValueError:
+        valid &= _fields_ok(codes)
+        micro = values[valid].astype("datetime64[us]")
+
+    # Bornes de datetime64[ns] (années 1677 à 2262)
+    micro = micro.view(np.int64)
+    in_range = np.abs(micro) < -NAT // 1000
+    valid[valid] = in_range
+
+    ns = np.full(len(values), NAT, dtype=np.int64)
+    ns[valid] = micro[in_range] * 1000
+    return ns, valid
+
+
+def parse_timestamps(values, source: str = "") -> np.ndarray:
+    """
+    Horodatages du comparateur → datetime64[ns] (NaT pour les lignes invalides,
+    signalées en console avec quelques exemples).
+    """
+    values = np.asarray(values)
+    ns, valid = parse_iso_us(values)
+    n_bad = int((~valid).sum())
+    if n_bad:
+        examples = ", ".join(repr(v) for v in values[~valid][:3])
+        print(f"[AVERTISSEMENT] {source or 'horodatages'} : {n_bad} ligne(s) mal formée(s) ignorée(s) ({examples})")
+    return ns.view("datetime64[ns]")
+
+
+# ---------------------------------------------------------- benchmark
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    n = 365 * 24 * 360  # une année, une mesure toutes les 10 s
+    start = np.datetime64("2025-01-01T00:00:00", "us")
+    ts = start + (np.arange(n) * 10_000_000 + rng.integers(0, 1_000_000, n)).astype("timedelta64[us]")
+    strings = pd.Series(np.datetime_as_string(ts, unit="us")).to_numpy(dtype=object)
+    print(f"{n} horodatages synthétiques")
+
+    timings = {}
+    t0 = time.perf_counter()
+    reference = pd.to_datetime(pd.Series(strings)).to_numpy()
+    timings["pd.to_datetime (inférence)"] = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    pd.to_datetime(pd.Series(strings), format="ISO8601")
+    timings["pd.to_datetime (ISO8601)"] = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    parsed = parse_timestamps(strings)
+    timings["parse_timestamps"] = time.perf_counter() - t0
+
+    raw = strings.astype("S27")
+    t0 = time.perf_counter()
+    parse_timestamps(raw)
+    timings["parse_timestamps (octets)"] = time.perf_counter() - t0
+
+    for label, seconds in timings.items():
+        print(f"  {label:<28} {seconds:6.2f} s")
+    print("Résultats identiques :", bool((parsed == reference.astype("datetime64[ns]")).all()))
@@ -1,66 +1,181 @@
+from collections import OrderedDict
+
+
 def rfe_selection(X, y, n_features_to_select=20):
     from sklearn.linear_model import LinearRegression
     from sklearn.feature_selection import RFE
-    estimator = LinearRegression()
-    selector = RFE(estimator, n_features_to_select=n_features_to_select, step=0.1)
-    selector.fit(X, y)
-    return X.columns[selector.support_].tolist()
+    key = (_data_key(X, y), n_features_to_select)
+    selected = _cache_get(_RFE_SUPPORTS, key)
+    if selected is None:
+        estimator = LinearRegression()
+        selector = RFE(estimator, n_features_to_select=n_features_to_select, step=0.1)
+        selector.fit(X, y)
+        selected = X.columns[selector.support_].tolist()
+        _cache_put(_RFE_SUPPORTS, key, selected, _RFE_CACHE_SIZE)
+    return list(selected)
+
+
+# -------------------------------------------------------------------
+# Stability selection : LassoCV par sous-échantillon (chemins warm-start),
+# sous-échantillons parallèles, graine explicite et cache (LRU) des supports
+# -------------------------------------------------------------------
+_SUPPORTS = OrderedDict()       # (empreinte, taille, graine, itération) -> support (bool par feature)
+_RFE_SUPPORTS = OrderedDict()   # (empreinte, n_features) -> features retenues par RFE (déterministe)
+_SUPPORTS_CACHE_SIZE = 5000     # supports conservés (quelques recherches complètes)
+_RFE_CACHE_SIZE = 32
+
+
+def _cache_get(cache, key):
+    if key in cache:
+        cache.move_to_end(key)
+        return cache[key]
+    return None
+
+
+def _cache_put(cache, key, value, max_size):
+    cache[key] = value
+    cache.move_to_end(key)
+    while len(cache) > max_size:
+        cache.popitem(last=False)
 
 
-def stability_selection(X, y, n_iter=50, sample_fraction=0.75, threshold=0.5):
+def _data_key(X, y):
+    from joblib import hash as joblib_hash
+    return joblib_hash((list(X.columns), X.to_numpy(), y.to_numpy()))
+
+
+def _subsample(n_samples, size, random_state, i):
+    """Sous-échantillon i (sans remise), reproductible et indépendant de l'ordre de calcul."""
     import numpy as np
-    import pandas as pd
+    return np.random.default_rng([random_state, i]).permutation(n_samples)[:size]
+
+
+def _subsample_support(X, y, idx):
+    """
+    Support du LassoCV ajusté sur le sous-échantillon (alpha choisi par
+    validation croisée sur ce seul sous-échantillon, comme à l'origine) ;
+    LassoCV parcourt chaque chemin de régularisation depuis alpha_max, chaque
+    solution initialisant la suivante (warm start).
+    """
     from sklearn.linear_model import LassoCV
+    lasso = LassoCV(cv=5, random_state=42, max_iter=200000)
+    lasso.fit(X[idx], y[idx])
+    return lasso.coef_ != 0
+
+
+def stability_selection(X, y, n_iter=50, sample_fraction=0.75, threshold=0.5, random_state=42, n_jobs=-1):
+    """
+    Fréquence de sélection de chaque feature par LassoCV sur n_iter
+    sous-échantillons (fraction sample_fraction) ; on garde les features de
+    fréquence >= threshold.
+    Les supports déjà calculés (même données, taille de sous-échantillon, graine
+    et itération) sont réutilisés : un candidat de la recherche promu au palier
+    suivant, ou la sélection finale (n_iter plus grand), ne recalcule que les
+    itérations manquantes.
+    """
+    import numpy as np
+    from joblib import Parallel, delayed
+    key = _data_key(X, y)
     n_samples = X.shape[0]
-    counts = pd.Series(0, index=X.columns)
-    for i in range(n_iter):
-        sample_idx = np.random.choice(n_samples, int(n_samples * sample_fraction), replace=False)
-        X_sample = X.iloc[sample_idx]
-        y_sample = y.iloc[sample_idx]
-        lasso = LassoCV(cv=5, random_state=42, max_iter=200000)
-        lasso.fit(X_sample, y_sample)
-        selected = X.columns[lasso.coef_ != 0]
-        counts[selected] += 1
-    freq = counts / n_iter
-    return freq[freq >= threshold].index.tolist()
-
-
-def select_features_combined(X, y, n_features_to_select=20, n_iter=50, sample_fraction=0.75, stability_threshold=0.5):
+    size = int(n_samples * sample_fraction)
+    keys = [(key, size, random_state, i) for i in range(n_iter)]
+    supports = {k: _cache_get(_SUPPORTS, k) for k in keys}
+    missing = [k for k, support in supports.items() if support is None]
+    if missing:
+        X_arr, y_arr = X.to_numpy(dtype=float), y.to_numpy(dtype=float)
+        computed = Parallel(n_jobs=n_jobs)(
+            delayed(_subsample_support)(X_arr, y_arr, _subsample(n_samples, size, random_state, k[3]))
+            for k in missing
+        )
+        for k, support in zip(missing, computed):
+            supports[k] = support
+            _cache_put(_SUPPORTS, k, support, _SUPPORTS_CACHE_SIZE)
+    freq = np.mean([supports[k] for k in keys], axis=0)
+    return X.columns[freq >= threshold].tolist()
+
+
+def select_features_combined(X, y, n_features_to_select=20, n_iter=50, sample_fraction=0.75, stability_threshold=0.5,
+                             random_state=42, n_jobs=-1):
     features_rfe = set(rfe_selection(X, y, n_features_to_select=n_features_to_select))
-    features_stab = set(stability_selection(X, y, n_iter=n_iter, sample_fraction=sample_fraction, threshold=stability_threshold))
+    features_stab = set(stability_selection(X, y, n_iter=n_iter, sample_fraction=sample_fraction, threshold=stability_threshold,
+                                            random_state=random_state, n_jobs=n_jobs))
     if len(features_rfe) >= len(features_stab):
         return list(features_rfe)
     else:
         return list(features_stab)
 
 
-def random_search_selection(X, y, n_search=10):
+def _selection_score(X, y, sel, cv):
+    """R² en validation croisée d'une régression linéaire sur les features 'sel'."""
+    import numpy as np
+    from sklearn.model_selection import cross_val_predict
+    from sklearn.linear_model import LinearRegression
+    from sklearn.metrics import r2_score
+    if len(sel) == 0:
+        return -np.inf
+    y_pred = cross_val_predict(LinearRegression(), X[sel], y, cv=cv, n_jobs=-1)
+    return r2_score(y, y_pred)
+
+
+def random_search_selection(X, y, n_search=10, random_state=42, halving=True, min_iter=10, max_iter=30, eta=3):
+    """
+    Recherche des hyperparamètres (n_features, sample_fraction, threshold) de
+    select_features_combined parmi n_search candidats tirés au hasard.
+
+    halving=True : successive halving. Tous les candidats sont d'abord évalués
+    avec peu d'itérations de stability selection (min_iter), seul le meilleur
+    tiers (1/eta) passe au palier suivant (eta fois plus d'itérations), jusqu'à
+    max_iter. Les sous-échantillons déjà calculés au palier précédent sont
+    réutilisés (cache de stability_selection). halving=False : tous les
+    candidats à max_iter itérations.
+
+    Affiche le tableau des essais et renvoie le tuple (n_feat, sample_fraction,
+    stability_threshold) du meilleur candidat au dernier palier.
+    """
+    import math
     import numpy as np
-    best_params = None
-    best_score = -np.inf
+    from sklearn.model_selection import KFold
+    from rich.console import Console
+    from rich.table import Table
+    rng = np.random.default_rng(random_state)
     param_candidates = []
     for i in range(n_search):
-        n_feat = np.random.choice([20, 30, 40, 50])
-        sample_fraction = np.random.uniform(0.75, 0.95)
-        stability_threshold = np.random.uniform(0.4, 0.7)
+        n_feat = int(rng.choice([20, 30, 40, 50]))
+        sample_fraction = rng.uniform(0.75, 0.95)
+        stability_threshold = rng.uniform(0.4, 0.7)
         param_candidates.append((n_feat, sample_fraction, stability_threshold))
-    from sklearn.model_selection import KFold, cross_val_predict
-    from sklearn.linear_model import LinearRegression
-    from sklearn.metrics import r2_score
     cv = KFold(n_splits=5, shuffle=True, random_state=42)
-    for params in param_candidates:
-        n_feat, sf, thresh = params
-        sel = select_features_combined(X, y, n_features_to_select=n_feat, n_iter=30, sample_fraction=sf, stability_threshold=thresh)
-        if len(sel) == 0:
-            score = -np.inf
-        else:
-            X_sel = X[sel]
-            model = LinearRegression()
-            y_pred = cross_val_predict(model, X_sel, y, cv=cv, n_jobs=-1)
-            score = r2_score(y, y_pred)
-        if score > best_score:
-            best_score = score
-            best_params = params
-    from rich.console import Console
-    Console().print(f"[bold green]Recherche aléatoire sélectionnée:[/bold green] n_features={best_params[0]}, sample_fraction={best_params[1]:.2f}, threshold={best_params[2]:.2f} (R²={best_score:.3f})")
+
+    # Paliers d'itérations : ..., max_iter / eta², max_iter / eta, max_iter
+    budgets = [max_iter]
+    while halving and budgets[0] // eta >= min_iter:
+        budgets.insert(0, budgets[0] // eta)
+
+    trials = []
+    alive = list(range(n_search))
+    for n_iter in budgets:
+        scores = {}
+        for c in alive:
+            n_feat, sf, thresh = param_candidates[c]
+            sel = select_features_combined(X, y, n_features_to_select=n_feat, n_iter=n_iter, sample_fraction=sf,
+                                           stability_threshold=thresh, random_state=random_state)
+            scores[c] = _selection_score(X, y, sel, cv)
+            trials.append((c, n_iter, len(sel), scores[c]))
+        alive = sorted(alive, key=lambda c: scores[c], reverse=True)
+        if n_iter != budgets[-1]:
+            alive = alive[:max(1, math.ceil(len(alive) / eta))]
+    best = alive[0]
+    best_params, best_score = param_candidates[best], scores[best]
+
+    console = Console()
+    table = Table(title=f"Recherche des paramètres de sélection ({len(trials)} essais, paliers {budgets})")
+    for col in ("#", "n_feat", "fraction", "seuil", "itér.", "retenues", "R² CV"):
+        table.add_column(col, justify="right")
+    for c, n_iter, n_sel, score in trials:
+        n_feat, sf, thresh = param_candidates[c]
+        style = "bold green" if c == best and n_iter == budgets[-1] else None
+        table.add_row(str(c), str(n_feat), f"{sf:.2f}", f"{thresh:.2f}", str(n_iter), str(n_sel), f"{score:.3f}",
+                      style=style)
+    console.print(table)
+    console.print(f"[bold green]Recherche aléatoire sélectionnée:[/bold green] n_features={best_params[0]}, sample_fraction={best_params[1]:.2f}, threshold={best_params[2]:.2f} (R²={best_score:.3f})")
     return best_params
@@ -1,6 +1,5 @@
 import os
-import pickle
-import time
+import sys
 from config import RESULTS_DIR
 from data_route.preprocessing import (
     load_mur_data,
@@ -8,13 +7,15 @@ from data_route.preprocessing import (
     load_or_build_hourly_features,
     load_or_build_aggregated_features
 )
-from models import training, penalized
+from features import selection
+from models import training, penalized, folds
 from visualization import plots, stats
 from sklearn.model_selection import KFold
 from rich.console import Console
 from sklearn.exceptions import ConvergenceWarning
 import warnings
 from presentation import ppt_generator
+from utils.cache_utils import StageCache, frame_hash, file_hash
 
 console = Console()
 
@@ -27,97 +28,24 @@ warnings.filterwarnings("ignore", category=ConvergenceWarning)
 # Paramètres globaux
 # -------------------------------------------------------------------
 USE_PARALLEL = True
+# Processus pour les entraînements (modèle × pli de CV) : -1 = tous les cœurs
+N_JOBS = -1 if USE_PARALLEL else 1
 
-##################### A COMMENTER POUR DEMARRER A ZERO ! ############
-# START = 12  # Étape à laquelle on démarre (8 => on refait de 8 à 12)
-#####################################################################
+# Paramètres de sélection de features des étapes 1 à 4
+SELECTION = dict(selection_method="combined", use_random_search=True)
 
-# Nom du fichier où on enregistre le "checkpoint" (étape atteinte)
-CHECKPOINT_FILE = os.path.join(RESULTS_DIR, "checkpoint.pkl")
+# Cache des étapes : chaque résultat est stocké sous l'empreinte de ses entrées
+# (données, cible, CV, paramètres, code, empreintes des résultats amont). Une
+# étape n'est relancée que si une de ses entrées a changé ou si une des figures
+# qu'elle écrit a disparu. Pour forcer une étape (ou plusieurs) :
+#     python main_model.py perf_hourly_delta tests_statistiques
+STAGE_CACHE_DIR = os.path.join(RESULTS_DIR, "stage_cache")
+RERUN = set(sys.argv[1:])
 
-# Fichier où on stocke toutes les variables produites par chaque étape
-PIPELINE_RESULTS_FILE = os.path.join(RESULTS_DIR, "pipeline_results.pkl")
-
-# Dictionnaire global pour stocker/recharger tous les résultats (perf_xxx, etc.)
+# Dictionnaire global des résultats des étapes (perf_xxx, etc.), pour le PPT
 pipeline_results = {}
 
 
-def load_checkpoint():
-    """Charge le numéro d'étape actuel depuis un fichier 'checkpoint.pkl' (ou 0 s'il n'existe pas)."""
-    if os.path.exists(CHECKPOINT_FILE):
-        with open(CHECKPOINT_FILE, "rb") as f:
-            chk = pickle.load(f)
-        return chk
-    else:
-        return 0
-
-
-def save_checkpoint(step):
-    """Sauvegarde le numéro d'étape 'step' dans 'checkpoint.pkl'."""
-    with open(CHECKPOINT_FILE, "wb") as f:
-        pickle.dump(step, f)
-
-
-def load_pipeline_results():
-    """Charge le dictionnaire pipeline_results depuis le fichier pickle, s'il existe."""
-    global pipeline_results
-    if os.path.exists(PIPELINE_RESULTS_FILE):
-        with open(PIPELINE_RESULTS_FILE, "rb") as f:
-            pipeline_results = pickle.load(f)
-    else:
-        pipeline_results = {}
-
-
-def save_pipeline_results():
-    """Sauvegarde le dictionnaire pipeline_results dans le fichier pickle."""
-    with open(PIPELINE_RESULTS_FILE, "wb") as f:
-        pickle.dump(pipeline_results, f)
-
-
-def run_if_needed(current_step, checkpoint, label, func):
-    """
-    Exécute la fonction 'func' si 'checkpoint' < current_step ; sinon on passe.
-    - current_step : numéro d'étape (int)
-    - checkpoint : étape déjà validée
-    - label : libellé pour la console
-    - func() : fonction à exécuter si on n'a pas déjà validé l'étape
-
-    Retourne le nouveau checkpoint (inchangé si on passe, = current_step si on exécute).
-    """
-    if checkpoint >= current_step:
-        console.print(
-            f"[bold blue]Étape {current_step} - {label} déjà validée (checkpoint={checkpoint}), on passe.[/bold blue]"
-        )
-        return checkpoint
-    else:
-        console.print(f"\n[bold underline]Étape {current_step} - {label}[/bold underline]")
-        start_local = time.time()
-        func()  # on exécute la fonction
-        elapsed = time.time() - start_local
-        console.print(f"[green]Étape {current_step} terminée en {elapsed:.2f} secondes.[/green]")
-        save_checkpoint(current_step)
-        return current_step
-
-
-def partially_reset_checkpoint(target_step):
-    """
-    Permet de réinitialiser manuellement le checkpoint à 'target_step'.
-    Exemple d'usage : on définit START=8, on appelle partiellement
-    le script en redémarrant à l'étape 8.
-    """
-    global checkpoint
-    if checkpoint > target_step:
-        console.print(
-            f"[bold yellow]Réinitialisation partielle du checkpoint : de {checkpoint} à {target_step}[/bold yellow]"
-        )
-        save_checkpoint(target_step)
-        checkpoint = target_step
-    else:
-        console.print(
-            f"[bold cyan]Checkpoint actuel ({checkpoint}) est déjà <= {target_step}. Pas de réinitialisation.[/bold cyan]"
-        )
-
-
 # -------------------------------------------------------------------
 # Début du script principal
 # -------------------------------------------------------------------
@@ -146,38 +74,11 @@ def custom_showwarning(message, category, filename, lineno, file=None, line=None
 
 warnings.showwarning = custom_showwarning
 
-# 3) Lecture du checkpoint et du dictionnaire global
-checkpoint = load_checkpoint()
-load_pipeline_results()
-
-# 4) Vérif si le nom du fichier xls a changé OU si la dernière date dans mur_route.xlsx a changé
-current_mur_last_date = df_mur["date"].max()  # Ou "measurement_time" selon vos colonnes
-old_mur_last_date = pipeline_results.get("last_mur_date", None)
-
-old_weather_file = pipeline_results.get("last_weather_file", None)
-
-data_changed = False
-if old_mur_last_date is not None and old_mur_last_date != current_mur_last_date:
-    data_changed = True
-if old_weather_file is not None and old_weather_file != weather_file_name:
-    data_changed = True
-
-if data_changed:
-    console.print(
-        "[bold yellow]Le fichier xls ou la date mur_route.xlsx a changé => reset checkpoint à 0[/bold yellow]"
-    )
-    checkpoint = 0
-    save_checkpoint(0)
-
-pipeline_results["last_mur_date"] = current_mur_last_date
-pipeline_results["last_weather_file"] = weather_file_name
-save_pipeline_results()
+# 3) Cache des étapes (remplace le checkpoint : plus de remise à zéro globale
+#    quand le fichier météo ou les données du mur changent)
+stages = StageCache(STAGE_CACHE_DIR, rerun=RERUN, log=console.print)
 
-# 5) Possibilité de redémarrer partiellement depuis l'étape START (si vous l'avez décommenté)
-if "START" in globals():
-    partially_reset_checkpoint(START - 1)
-
-# 6) Construction (ou chargement depuis cache) des features horaires
+# 4) Construction (ou chargement depuis cache) des features horaires
 console.print("[bold]Construction/Chargement des features horaires...[/bold]")
 df_features, hourly_updated = load_or_build_hourly_features(
     df_mur, df_weather, vars_a_retenir, RESULTS_DIR
@@ -186,7 +87,7 @@ X_hourly = df_features.drop(columns=['date', 'inch', 'delta_inch'])
 y_abs = df_features['inch']
 y_delta = df_features['delta_inch']
 
-# 7) Construction (ou chargement) des features agrégées
+# 5) Construction (ou chargement) des features agrégées
 console.print("[bold]Construction/Chargement des features agrégées...[/bold]")
 df_agg_features, agg_updated = load_or_build_aggregated_features(
     df_mur, df_weather, vars_a_retenir, RESULTS_DIR
@@ -195,129 +96,137 @@ X_agg = df_agg_features.drop(columns=['date', 'inch', 'delta_inch'])
 y_abs_agg = df_agg_features['inch']
 y_delta_agg = df_agg_features['delta_inch']
 
-# 8) Définir la validation croisée
+# 6) Définir la validation croisée
 cv = KFold(n_splits=5, shuffle=True, random_state=42)
 
+# 7) Entrées communes des étapes (empreintes de contenu)
+code_models = file_hash(training.__file__, penalized.__file__, folds.__file__, selection.__file__)
+hourly_inputs = dict(X=frame_hash(X_hourly), cv=repr(cv), code=code_models)
+agg_inputs = dict(X=frame_hash(X_agg), cv=repr(cv), code=code_models)
+mur_inputs = dict(mur=frame_hash(df_mur[['measurement_time', 'inch']]))
+
+
+def run_stage(name, label, func, inputs, outputs=()):
+    """Exécute (ou relit en cache) l'étape 'name' et range son résultat dans pipeline_results."""
+    pipeline_results[name] = stages.run(name, label, func, inputs, outputs)
+    return pipeline_results[name]
+
+
+def model_figures(combo_label, comparison):
+    """
+    Figures écrites par une étape de modélisation (fonction du tableau de
+    performances) : une par modèle ajusté (RMSE non NaN) et la comparaison globale.
+    """
+    def outputs(performance_df):
+        fitted = performance_df.loc[performance_df["RMSE"].notna(), "Model"]
+        return ([os.path.join(RESULTS_DIR, f"model_{combo_label}_{name}.png") for name in fitted]
+                + [os.path.join(RESULTS_DIR, comparison)])
+    return outputs
+
 
 # -------------------------------------------------------------------
 # Étape 1 - Modélisation: Hourly_Absolute
 # -------------------------------------------------------------------
 def step1():
-    result = training.run_modeling(
-        X_hourly, y_abs, "Hourly_Absolute", cv,
-        selection_method="combined",
-        use_random_search=True
-    )
-    pipeline_results["perf_hourly_abs"] = result
-    save_pipeline_results()
+    return training.run_modeling(X_hourly, y_abs, "Hourly_Absolute", cv, n_jobs=N_JOBS, **SELECTION)
 
 
-checkpoint = run_if_needed(1, checkpoint, "Modélisation: Hourly_Absolute", step1)
+run_stage("perf_hourly_abs", "Étape 1 - Modélisation: Hourly_Absolute", step1,
+          dict(hourly_inputs, y=frame_hash(y_abs), selection=SELECTION),
+          outputs=model_figures("Hourly_Absolute", "models_comparison_Hourly_Absolute.png"))
 
 
 # -------------------------------------------------------------------
 # Étape 2 - Modélisation: Hourly_Delta
 # -------------------------------------------------------------------
 def step2():
-    result = training.run_modeling(
-        X_hourly, y_delta, "Hourly_Delta", cv,
-        selection_method="combined",
-        use_random_search=True
-    )
-    pipeline_results["perf_hourly_delta"] = result
-    save_pipeline_results()
+    return training.run_modeling(X_hourly, y_delta, "Hourly_Delta", cv, n_jobs=N_JOBS, **SELECTION)
 
 
-checkpoint = run_if_needed(2, checkpoint, "Modélisation: Hourly_Delta", step2)
+run_stage("perf_hourly_delta", "Étape 2 - Modélisation: Hourly_Delta", step2,
+          dict(hourly_inputs, y=frame_hash(y_delta), selection=SELECTION),
+          outputs=model_figures("Hourly_Delta", "models_comparison_Hourly_Delta.png"))
 
 
 # -------------------------------------------------------------------
 # Étape 3 - Modélisation: Aggregated_Absolute
 # -------------------------------------------------------------------
 def step3():
-    result = training.run_modeling(
-        X_agg, y_abs_agg, "Aggregated_Absolute", cv,
-        selection_method="combined",
-        use_random_search=True
-    )
-    pipeline_results["perf_agg_abs"] = result
-    save_pipeline_results()
+    return training.run_modeling(X_agg, y_abs_agg, "Aggregated_Absolute", cv, n_jobs=N_JOBS, **SELECTION)
 
 
-checkpoint = run_if_needed(3, checkpoint, "Modélisation: Aggregated_Absolute", step3)
+run_stage("perf_agg_abs", "Étape 3 - Modélisation: Aggregated_Absolute", step3,
+          dict(agg_inputs, y=frame_hash(y_abs_agg), selection=SELECTION),
+          outputs=model_figures("Aggregated_Absolute", "models_comparison_Aggregated_Absolute.png"))
 
 
 # -------------------------------------------------------------------
 # Étape 4 - Modélisation: Aggregated_Delta
 # -------------------------------------------------------------------
 def step4():
-    result = training.run_modeling(
-        X_agg, y_delta_agg, "Aggregated_Delta", cv,
-        selection_method="combined",
-        use_random_search=True
-    )
-    pipeline_results["perf_agg_delta"] = result
-    save_pipeline_results()
+    return training.run_modeling(X_agg, y_delta_agg, "Aggregated_Delta", cv, n_jobs=N_JOBS, **SELECTION)
 
 
-checkpoint = run_if_needed(4, checkpoint, "Modélisation: Aggregated_Delta", step4)
+run_stage("perf_agg_delta", "Étape 4 - Modélisation: Aggregated_Delta", step4,
+          dict(agg_inputs, y=frame_hash(y_delta_agg), selection=SELECTION),
+          outputs=model_figures("Aggregated_Delta", "models_comparison_Aggregated_Delta.png"))
 
 
 # -------------------------------------------------------------------
 # Étape 5 - Hourly Absolute : ALL + Penalized
 # -------------------------------------------------------------------
 def step5():
-    result = penalized.run_modeling_all_features_penalized(X_hourly, y_abs, "Hourly_Absolute", cv)
-    pipeline_results["perf_hourly_abs_penalized"] = result
-    save_pipeline_results()
-    # On fait un petit récap, comme demandé
-    console.print(f"[bold magenta]----- Classement (Hourly_Absolute, ALL + Penalized) -----[/bold magenta]")
-    console.print(result[["Model", "RMSE", "MAPE (%)", "R2", "Adjusted_R2", "Pearson_r", "p_value"]])
+    return penalized.run_modeling_all_features_penalized(X_hourly, y_abs, "Hourly_Absolute", cv, n_jobs=N_JOBS)
 
 
-checkpoint = run_if_needed(5, checkpoint, "Hourly Absolute : ALL + Penalized", step5)
+result = run_stage("perf_hourly_abs_penalized", "Étape 5 - Hourly Absolute : ALL + Penalized", step5,
+                   dict(hourly_inputs, y=frame_hash(y_abs), models="penalized"),
+                   outputs=model_figures("Hourly_Absolute_AllPenalized", "models_comparison_AllPenalized_Hourly_Absolute.png"))
+# On fait un petit récap, comme demandé
+console.print(f"[bold magenta]----- Classement (Hourly_Absolute, ALL + Penalized) -----[/bold magenta]")
+console.print(result[["Model", "RMSE", "MAPE (%)", "R2", "Adjusted_R2", "Pearson_r", "p_value"]])
 
 
 # -------------------------------------------------------------------
 # Étape 6 - Hourly Absolute : ALL + Ridge/Lasso
 # -------------------------------------------------------------------
 def step6():
-    result = penalized.run_modeling_all_features_simple(X_hourly, y_abs, "Hourly_Absolute", cv)
-    pipeline_results["perf_hourly_abs_simple"] = result
-    save_pipeline_results()
-    console.print(f"[bold magenta]----- Classement (Hourly_Absolute, ALL + Ridge/Lasso) -----[/bold magenta]")
-    console.print(result[["Model", "RMSE", "MAPE (%)", "R2", "Adjusted_R2", "Pearson_r", "p_value"]])
+    return penalized.run_modeling_all_features_simple(X_hourly, y_abs, "Hourly_Absolute", cv, n_jobs=N_JOBS)
 
 
-checkpoint = run_if_needed(6, checkpoint, "Hourly Absolute : ALL + Ridge/Lasso", step6)
+result = run_stage("perf_hourly_abs_simple", "Étape 6 - Hourly Absolute : ALL + Ridge/Lasso", step6,
+                   dict(hourly_inputs, y=frame_hash(y_abs), models="simple"),
+                   outputs=model_figures("Hourly_Absolute_AllSimple", "models_comparison_AllSimple_Hourly_Absolute.png"))
+console.print(f"[bold magenta]----- Classement (Hourly_Absolute, ALL + Ridge/Lasso) -----[/bold magenta]")
+console.print(result[["Model", "RMSE", "MAPE (%)", "R2", "Adjusted_R2", "Pearson_r", "p_value"]])
 
 
 # -------------------------------------------------------------------
 # Étape 7 - Hourly Delta : ALL + Penalized
 # -------------------------------------------------------------------
 def step7():
-    result = penalized.run_modeling_all_features_penalized(X_hourly, y_delta, "Hourly_Delta", cv)
-    pipeline_results["perf_hourly_delta_penalized"] = result
-    save_pipeline_results()
-    console.print(f"[bold magenta]----- Classement (Hourly_Delta, ALL + Penalized) -----[/bold magenta]")
-    console.print(result[["Model", "RMSE", "MAPE (%)", "R2", "Adjusted_R2", "Pearson_r", "p_value"]])
+    return penalized.run_modeling_all_features_penalized(X_hourly, y_delta, "Hourly_Delta", cv, n_jobs=N_JOBS)
 
 
-checkpoint = run_if_needed(7, checkpoint, "Hourly Delta : ALL + Penalized", step7)
+result = run_stage("perf_hourly_delta_penalized", "Étape 7 - Hourly Delta : ALL + Penalized", step7,
+                   dict(hourly_inputs, y=frame_hash(y_delta), models="penalized"),
+                   outputs=model_figures("Hourly_Delta_AllPenalized", "models_comparison_AllPenalized_Hourly_Delta.png"))
+console.print(f"[bold magenta]----- Classement (Hourly_Delta, ALL + Penalized) -----[/bold magenta]")
+console.print(result[["Model", "RMSE", "MAPE (%)", "R2", "Adjusted_R2", "Pearson_r", "p_value"]])
 
 
 # -------------------------------------------------------------------
 # Étape 8 - Hourly Delta : ALL + Ridge/Lasso
 # -------------------------------------------------------------------
 def step8():
-    result = penalized.run_modeling_all_features_simple(X_hourly, y_delta, "Hourly_Delta", cv)
-    pipeline_results["perf_hourly_delta_simple"] = result
-    save_pipeline_results()
-    console.print(f"[bold magenta]----- Classement (Hourly_Delta, ALL + Ridge/Lasso) -----[/bold magenta]")
-    console.print(result[["Model", "RMSE", "MAPE (%)", "R2", "Adjusted_R2", "Pearson_r", "p_value"]])
+    return penalized.run_modeling_all_features_simple(X_hourly, y_delta, "Hourly_Delta", cv, n_jobs=N_JOBS)
 
 
-checkpoint = run_if_needed(8, checkpoint, "Hourly Delta : ALL + Ridge/Lasso", step8)
+result = run_stage("perf_hourly_delta_simple", "Étape 8 - Hourly Delta : ALL + Ridge/Lasso", step8,
+                   dict(hourly_inputs, y=frame_hash(y_delta), models="simple"),
+                   outputs=model_figures("Hourly_Delta_AllSimple", "models_comparison_AllSimple_Hourly_Delta.png"))
+console.print(f"[bold magenta]----- Classement (Hourly_Delta, ALL + Ridge/Lasso) -----[/bold magenta]")
+console.print(result[["Model", "RMSE", "MAPE (%)", "R2", "Adjusted_R2", "Pearson_r", "p_value"]])
 
 
 # -------------------------------------------------------------------
@@ -327,10 +236,13 @@ def step9():
     console.print("\n[bold underline]Génération de la figure d'évolution de l'inclinaison[/bold underline]")
     df_date = df_mur[['measurement_time', 'inch']].dropna().copy()
     df_date['time_numeric'] = df_date['measurement_time'].apply(lambda x: x.timestamp())
-    plots.plot_evolution_inclinaison(df_date, os.path.join(RESULTS_DIR, "evolution_inclinaison.png"))
+    plots.plot_evolution_inclinaison(df_date, EVOLUTION_PNG)
 
 
-checkpoint = run_if_needed(9, checkpoint, "Figure d'évolution de l'inclinaison", step9)
+# Ne dépend que des mesures du mur (un nouveau fichier météo ne l'invalide pas)
+EVOLUTION_PNG = os.path.join(RESULTS_DIR, "evolution_inclinaison.png")
+run_stage("evolution_inclinaison", "Étape 9 - Figure d'évolution de l'inclinaison", step9,
+          dict(mur_inputs, code=file_hash(plots.__file__)), outputs=[EVOLUTION_PNG])
 
 
 # -------------------------------------------------------------------
@@ -345,9 +257,11 @@ def step10():
     stats.local_regression_analysis(df_date, window_size=5)
     # Comparatif résumé (Mann-Kendall / Spearman / LR)
     stats.compare_tests(df_date, lr_res, mk_res)
+    return {"regression": lr_res, "mann_kendall": mk_res}
 
 
-checkpoint = run_if_needed(10, checkpoint, "Tests statistiques", step10)
+run_stage("tests_statistiques", "Étape 10 - Tests statistiques", step10,
+          dict(mur_inputs, code=file_hash(stats.__file__)))
 
 
 # -------------------------------------------------------------------
@@ -355,11 +269,6 @@ checkpoint = run_if_needed(10, checkpoint, "Tests statistiques", step10)
 # -------------------------------------------------------------------
 def step11():
     console.print("\n[bold underline]Dataviz features explicatives (Aggregated_Absolute)[/bold underline]")
-    if "perf_agg_abs" not in pipeline_results:
-        console.print("[bold red]Impossible de faire la Dataviz : perf_agg_abs indisponible.[/bold red]")
-        console.print("[bold red]Soit l'étape 3 n'a pas été exécutée, soit pipeline_results est incomplet.[/bold red]")
-        return
-
     perf_agg_abs = pipeline_results["perf_agg_abs"]
     best_agg_abs_model = perf_agg_abs.iloc[0]
     best_features = best_agg_abs_model["Top3"]
@@ -375,13 +284,21 @@ def step11():
                 RESULTS_DIR
             )
             console.print("[bold green]Dataviz (Aggregated_Absolute) générée.[/bold green]")
+            return [EXPLANATORY_PNG]
         else:
             console.print("[bold red]Aucune feature Top3 trouvée dans df_agg_features.[/bold red]")
     else:
         console.print("[bold red]Aucune feature Top3 enregistrée pour Aggregated_Absolute.[/bold red]")
+    return []
 
 
-checkpoint = run_if_needed(11, checkpoint, "Dataviz Aggregated_Absolute", step11)
+# Dépend du résultat de l'étape 3 (son empreinte) et des features agrégées ;
+# renvoie la figure écrite (aucune si pas de Top3 exploitable)
+EXPLANATORY_PNG = os.path.join(RESULTS_DIR, "explanatory_evolution_Aggregated_Absolute.png")
+run_stage("dataviz_agg_abs", "Étape 11 - Dataviz Aggregated_Absolute", step11,
+          dict(agg=frame_hash(df_agg_features), perf_agg_abs=stages.result_hashes["perf_agg_abs"],
+               code=file_hash(plots.__file__)),
+          outputs=lambda written: written)
 
 
 # -------------------------------------------------------------------
@@ -389,22 +306,19 @@ checkpoint = run_if_needed(11, checkpoint, "Dataviz Aggregated_Absolute", step11
 # -------------------------------------------------------------------
 def step12():
     console.print("\n[bold underline]Génération de la présentation PowerPoint[/bold underline]")
-    ppt_path = os.path.join(os.path.dirname(RESULTS_DIR), "Synthese_Modelisation.pptx")
-    ppt_generator.create_ppt_from_results(pipeline_results, RESULTS_DIR, ppt_path)
+    ppt_generator.create_ppt_from_results(pipeline_results, RESULTS_DIR, PPT_PATH)
 
 
-checkpoint = run_if_needed(12, checkpoint, "Génération du PPT final", step12)
+# Dépend de toutes les étapes précédentes (empreintes des résultats et des figures)
+PPT_PATH = os.path.join(os.path.dirname(RESULTS_DIR), "Synthese_Modelisation.pptx")
+run_stage("ppt", "Étape 12 - Génération du PPT final", step12,
+          dict(stages=dict(stages.result_hashes), code=file_hash(ppt_generator.__file__)), outputs=[PPT_PATH])
 
 # -------------------------------------------------------------------
 # Fin de script : avertissements de convergence, etc.
 # -------------------------------------------------------------------
-if checkpoint >= 12:
-    if convergence_messages:
-        console.print("[bold red]Attention :[/bold red] Certains modèles n'ont pas convergé. Messages :")
-        for msg in convergence_messages:
-            console.print(f"- {msg}")
-    console.print("[bold green]Script terminé. Résultats et présentation générés.[/bold green]")
-else:
-    console.print(
-        "[bold cyan]Script interrompu avant la fin ? Re-lancez pour continuer les étapes suivantes.[/bold cyan]"
-    )
+if convergence_messages:
+    console.print("[bold red]Attention :[/bold red] Certains modèles n'ont pas convergé. Messages :")
+    for msg in convergence_messages:
+        console.print(f"- {msg}")
+console.print("[bold green]Script terminé. Résultats et présentation générés.[/bold green]")
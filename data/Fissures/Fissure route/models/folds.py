@@ -0,0 +1,153 @@
+"""
+Cache des plis de validation croisée pour les modèles linéaires.
+
+Pour un couple (X, y) et un découpage `cv`, chaque pli d'entraînement est
+standardisé (ou seulement centré, `scale=False`) une seule fois ; on conserve
+les matrices transformées (train et test), la matrice de Gram XᵀX et le produit
+Xᵀy du pli. Les pipelines `StandardScaler + estimateur linéaire` (cache
+standardisé) et les estimateurs linéaires seuls (cache centré) s'ajustent
+ensuite directement sur ces matrices :
+  - Lasso / ElasticNet : `precompute=` Gram du pli,
+  - Ridge : résolution de (XᵀX + αI) w = Xᵀy (même calcul que le solveur cholesky),
+  - OLS, ARD, BayesianRidge : ajustement sur les matrices déjà transformées.
+Un sous-ensemble de colonnes (features sélectionnées) s'extrait du cache sans
+rien recalculer (la standardisation est colonne par colonne).
+"""
+from collections import OrderedDict
+
+import numpy as np
+from joblib import hash as joblib_hash
+from scipy import linalg
+from sklearn.base import clone
+from sklearn.linear_model import LinearRegression, Lasso, Ridge, ElasticNet, ARDRegression, BayesianRidge
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+LINEAR_MODELS = (LinearRegression, Lasso, Ridge, ElasticNet, ARDRegression, BayesianRidge)
+_CACHE_SIZE = 4  # caches complets conservés (un par jeu de features × cible)
+_FOLD_CACHES = OrderedDict()
+
+
+class Fold:
+    """Pli transformé : matrices train/test, Gram et Xᵀy (y centré), moyennes du train."""
+
+    def __init__(self, train_idx, test_idx, X_train, X_test, y_train, gram, xy, x_mean):
+        self.train_idx = train_idx
+        self.test_idx = test_idx
+        self.X_train = X_train
+        self.X_test = X_test
+        self.y_train = y_train
+        self.gram = gram
+        self.xy = xy
+        self.x_mean = x_mean
+
+    @classmethod
+    def build(cls, X, y, train_idx, test_idx, scale=True):
+        scaler = StandardScaler(with_std=scale).fit(X[train_idx])
+        X_train = np.asfortranarray(scaler.transform(X[train_idx]))
+        X_test = scaler.transform(X[test_idx]) if test_idx is not None else None
+        y_train = y[train_idx]
+        gram = X_train.T @ X_train
+        xy = X_train.T @ (y_train - y_train.mean())
+        return cls(train_idx, test_idx, X_train, X_test, y_train, gram, xy, scaler.mean_)
+
+    def subset(self, pos):
+        return Fold(self.train_idx, self.test_idx,
+                    np.asfortranarray(self.X_train[:, pos]),
+                    None if self.X_test is None else self.X_test[:, pos],
+                    self.y_train, self.gram[np.ix_(pos, pos)], self.xy[pos], self.x_mean[pos])
+
+
+class FoldCache:
+    """Plis transformés de `cv` sur (X, y), plus le « pli » complet de l'ajustement final."""
+
+    def __init__(self, columns, n_samples, folds, full, scale=True):
+        self.columns = columns
+        self.n_samples = n_samples
+        self.folds = folds
+        self.full = full
+        self.scale = scale
+
+    @classmethod
+    def build(cls, X, y, cv, scale=True):
+        X_arr, y_arr = X.to_numpy(dtype=float), y.to_numpy(dtype=float)
+        folds = [Fold.build(X_arr, y_arr, train, test, scale) for train, test in cv.split(X, y)]
+        full = Fold.build(X_arr, y_arr, np.arange(len(y_arr)), None, scale)
+        return cls(X.columns, len(y_arr), folds, full, scale)
+
+    def subset(self, columns):
+        """Cache restreint aux colonnes `columns` (dans cet ordre)."""
+        pos = self.columns.get_indexer(columns)
+        if (pos < 0).any():
+            raise KeyError(f"Colonnes absentes du cache de plis : {list(columns[pos < 0])}")
+        return FoldCache(self.columns[pos], self.n_samples,
+                         [f.subset(pos) for f in self.folds], self.full.subset(pos), self.scale)
+
+
+def get_fold_cache(X, y, cv, scale=True):
+    """
+    Cache des plis de (X, y, cv), standardisés (scale=True, pour les pipelines
+    StandardScaler) ou seulement centrés (scale=False, estimateurs seuls),
+    partagé entre les appels (mémoire, LRU) :
+    les étapes qui modélisent la même cible sur le même jeu de features (ou un
+    sous-ensemble de ses colonnes, via `subset`) ne restandardisent rien.
+    """
+    splits = [(train, test) for train, test in cv.split(X, y)]
+    key = joblib_hash((list(X.columns), X.index.to_numpy(), X.to_numpy(), y.to_numpy(), splits, scale))
+    if key in _FOLD_CACHES:
+        _FOLD_CACHES.move_to_end(key)
+    else:
+        _FOLD_CACHES[key] = FoldCache.build(X, y, cv, scale)
+        if len(_FOLD_CACHES) > _CACHE_SIZE:
+            _FOLD_CACHES.popitem(last=False)
+    return _FOLD_CACHES[key]
+
+
+def is_cacheable(model, cache):
+    """
+    Modèle ajustable sur `cache` : pipeline `StandardScaler() + estimateur
+    linéaire` pour un cache standardisé, estimateur linéaire seul pour un cache centré.
+    """
+    if cache.scale:
+        if not (isinstance(model, Pipeline) and len(model.steps) == 2
+                and isinstance(model.steps[0][1], StandardScaler)
+                and model.steps[0][1].get_params() == StandardScaler().get_params()):
+            return False
+        model = model.steps[-1][1]
+    return type(model) in LINEAR_MODELS and model.get_params().get("fit_intercept", True)
+
+
+def _fit_fold(est, fold):
+    """Ajuste une copie de `est` sur un pli transformé, en réutilisant Gram / Xᵀy."""
+    est = clone(est)
+    if type(est) in (Lasso, ElasticNet):
+        return est.set_params(precompute=fold.gram).fit(fold.X_train, fold.y_train)
+    if type(est) is Ridge and est.solver in ("auto", "cholesky") and not est.positive:
+        n_features = fold.gram.shape[0]
+        try:
+            coef = linalg.solve(fold.gram + est.alpha * np.eye(n_features), fold.xy, assume_a="pos")
+        except linalg.LinAlgError:
+            return est.fit(fold.X_train, fold.y_train)
+        # X centré : l'intercept est la moyenne de y
+        est.coef_, est.intercept_, est.n_features_in_ = coef, fold.y_train.mean(), n_features
+        return est
+    return est.fit(fold.X_train, fold.y_train)
+
+
+def fit_cached(model, cache, X):
+    """
+    Équivalent de cross_val_predict + fit final pour un modèle linéaire
+    (`is_cacheable`) : renvoie (y_pred_cv, modèle ajusté sur toutes les données).
+    """
+    est = model.steps[-1][1] if cache.scale else model
+    y_pred = np.empty(cache.n_samples)
+    for fold in cache.folds:
+        y_pred[fold.test_idx] = _fit_fold(est, fold).predict(fold.X_test)
+    final = _fit_fold(est, cache.full)
+    if cache.scale:
+        (scaler_name, _), (est_name, _) = model.steps
+        return y_pred, Pipeline([(scaler_name, StandardScaler().fit(X)), (est_name, final)])
+    # Ajusté sur X centré : intercept ramené à l'échelle de X brut
+    final.intercept_ = final.intercept_ - cache.full.x_mean @ final.coef_
+    final.feature_names_in_ = np.asarray(cache.columns, dtype=object)
+    return y_pred, final
@@ -1,6 +1,7 @@
 import os
 import pandas as pd
-from models.training import train_and_evaluate_model
+from models.training import evaluate_models
+from models.folds import get_fold_cache
 from sklearn.linear_model import LassoCV, ElasticNetCV
 from config import RESULTS_DIR
 from rich.console import Console
@@ -9,7 +10,7 @@ from collections import Counter
 
 console = Console()
 
-def run_modeling_all_features_penalized(X, y, combo_label, cv):
+def run_modeling_all_features_penalized(X, y, combo_label, cv, n_jobs=1):
     """
     Conserver TOUTES les features et entraîner LassoCV et ElasticNetCV.
     Génère la figure "models_comparison_AllPenalized_{combo_label}.png"
@@ -28,10 +29,7 @@ def run_modeling_all_features_penalized(X, y, combo_label, cv):
         "LassoCV": LassoCV(cv=5, random_state=42),
         "ElasticNetCV": ElasticNetCV(cv=5, random_state=42)
     }
-    results = []
-    for name, model in models.items():
-        r = train_and_evaluate_model(name, model, X_clean, y_clean, cv, combo_label + "_AllPenalized")
-        results.append(r)
+    results = evaluate_models(models, X_clean, y_clean, cv, combo_label + "_AllPenalized", n_jobs=n_jobs)
 
     performance_df = pd.DataFrame(results).sort_values(by="RMSE")
 
@@ -72,7 +70,7 @@ def run_modeling_all_features_penalized(X, y, combo_label, cv):
 
     return performance_df
 
-def run_modeling_all_features_simple(X, y, combo_label, cv):
+def run_modeling_all_features_simple(X, y, combo_label, cv, n_jobs=1):
     """
     Conserver TOUTES les features et entraîner Ridge et Lasso (classiques).
     Génère la figure "models_comparison_AllSimple_{combo_label}.png".
@@ -91,10 +89,8 @@ def run_modeling_all_features_simple(X, y, combo_label, cv):
         "Lasso": Lasso(alpha=1e-3, max_iter=10000)
     }
 
-    results = []
-    for name, model in models.items():
-        r = train_and_evaluate_model(name, model, X_clean, y_clean, cv, combo_label + "_AllSimple")
-        results.append(r)
+    results = evaluate_models(models, X_clean, y_clean, cv, combo_label + "_AllSimple", n_jobs=n_jobs,
+                              fold_cache=get_fold_cache(X_clean, y_clean, cv, scale=False))
 
     performance_df = pd.DataFrame(results).sort_values(by="RMSE")
 
@@ -1,13 +1,17 @@
 import matplotlib
 matplotlib.use("Agg")  # pour ne pas invoquer de fenêtre graphique sous Windows
 import os
+import warnings
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 from config import RESULTS_DIR
 from features.selection import select_features_combined, random_search_selection
-from joblib import Parallel, delayed
+from models.folds import get_fold_cache, is_cacheable, fit_cached
+from joblib import Parallel, delayed, cpu_count, effective_n_jobs
+from threadpoolctl import threadpool_limits
+from sklearn.base import clone
 from sklearn.model_selection import cross_val_predict
 from sklearn.pipeline import make_pipeline, Pipeline
 from sklearn.preprocessing import StandardScaler
@@ -18,7 +22,109 @@ from collections import Counter
 
 console = Console()
 
-def train_and_evaluate_model(name, model, X_sel, y_clean, cv, combo_label):
+# -------------------------------------------------------------------
+# Ordonnanceur parallèle (modèle × pli de CV)
+# -------------------------------------------------------------------
+# Paramètres de parallélisme interne des estimateurs (RandomForest, CatBoost, *CV)
+THREAD_PARAMS = ("n_jobs", "thread_count")
+
+
+def _thread_params(model):
+    return [k for k in model.get_params() if k.split("__")[-1] in THREAD_PARAMS]
+
+
+def _fit_task(model, X, y, train_idx, test_idx, n_threads):
+    """
+    Tâche exécutée dans un processus de travail : ajuste une copie de 'model'
+    sur le pli (train_idx) et renvoie les prédictions sur test_idx, ou, si
+    train_idx est None, l'ajuste sur toutes les données et renvoie le modèle.
+    Les threads internes (estimateur + BLAS) sont limités à n_threads ; les
+    warnings sont capturés et renvoyés au processus principal plutôt
+    qu'affichés par chaque processus.
+    """
+    model = clone(model)
+    model.set_params(**{k: n_threads for k in _thread_params(model)})
+    with warnings.catch_warnings(record=True) as caught, threadpool_limits(n_threads):
+        warnings.simplefilter("always")
+        try:
+            if train_idx is None:
+                out = model.fit(X, y)
+            else:
+                model.fit(X.iloc[train_idx], y.iloc[train_idx])
+                out = model.predict(X.iloc[test_idx])
+        except Exception as e:
+            out = e
+    return out, {(str(w.message), w.category) for w in caught}
+
+
+def fit_models_parallel(models, X, y, cv, n_jobs=-1):
+    """
+    Équivalent de cross_val_predict + fit final pour chaque modèle de 'models',
+    réparti en tâches (modèle × pli, plus l'ajustement final) sur un pool de
+    processus (joblib/loky). Chaque processus dispose de cpu_count() // n_workers
+    threads, transmis à n_jobs / thread_count des estimateurs et aux BLAS :
+    RandomForest et CatBoost ne sursouscrivent pas les cœurs. Les tâches des
+    modèles multi-threads (les plus longues) sont lancées en premier.
+
+    Renvoie {nom: (y_pred_cv, modèle ajusté)} ou {nom: exception}.
+    """
+    folds = list(cv.split(X, y))
+    tasks = []
+    for name, model in models.items():
+        tasks += [(name, train, test) for train, test in folds] + [(name, None, None)]
+    tasks.sort(key=lambda t: not _thread_params(models[t[0]]))  # tri stable
+
+    n_workers = max(1, min(effective_n_jobs(n_jobs), len(tasks)))
+    n_threads = max(1, cpu_count() // n_workers)
+    console.print(f"[cyan]{len(models)} modèles × {len(folds)} plis (+ ajustement final) : "
+                  f"{len(tasks)} tâches sur {n_workers} processus, {n_threads} thread(s) chacun[/cyan]")
+
+    outputs = Parallel(n_jobs=n_workers, backend="loky")(
+        delayed(_fit_task)(models[name], X, y, train, test, n_threads) for name, train, test in tasks
+    )
+
+    fitted = {name: [np.empty(len(y)), None] for name in models}
+    messages = set()
+    for (name, train, test), (out, caught) in zip(tasks, outputs):
+        messages |= caught
+        if isinstance(fitted[name], Exception):
+            continue
+        if isinstance(out, Exception):
+            fitted[name] = out
+        elif train is None:
+            fitted[name][1] = out
+        else:
+            fitted[name][0][test] = out
+    # Warnings (ConvergenceWarning...) ré-émis une seule fois, dans le processus principal
+    for message, category in messages:
+        warnings.warn(message, category)
+    return {name: r if isinstance(r, Exception) else tuple(r) for name, r in fitted.items()}
+
+
+def evaluate_models(models, X_sel, y_clean, cv, combo_label, n_jobs=1, fold_cache=None):
+    """
+    Appelle train_and_evaluate_model pour chaque modèle. Les pipelines
+    linéaires s'ajustent sur 'fold_cache' (plis déjà standardisés, Gram / Xᵀy,
+    cf. models.folds) s'il est fourni. Les autres : n_jobs=1 => exécution
+    séquentielle ; sinon entraînements parallèles (fit_models_parallel). Les
+    métriques et figures sont toujours produites dans le processus principal.
+    """
+    fitted = {}
+    if fold_cache is not None:
+        for name, model in models.items():
+            if is_cacheable(model, fold_cache):
+                try:
+                    fitted[name] = fit_cached(model, fold_cache, X_sel)
+                except Exception as e:
+                    fitted[name] = e
+    others = {name: model for name, model in models.items() if name not in fitted}
+    if n_jobs != 1 and others:
+        fitted.update(fit_models_parallel(others, X_sel, y_clean, cv, n_jobs=n_jobs))
+    return [train_and_evaluate_model(name, model, X_sel, y_clean, cv, combo_label, fitted=fitted.get(name))
+            for name, model in models.items()]
+
+
+def train_and_evaluate_model(name, model, X_sel, y_clean, cv, combo_label, fitted=None):
     """
     Entraîne 'model' sur (X_sel, y_clean) avec cross-validation,
     calcule diverses métriques, ET génère une figure :
@@ -29,11 +135,19 @@ def train_and_evaluate_model(name, model, X_sel, y_clean, cv, combo_label):
         - RMSE
         - R²
         - (RMSE / moyenne mesurée)*100 (%)
+
+    'fitted' : résultat de fit_models_parallel pour ce modèle ((y_pred_cv,
+    modèle ajusté) ou exception) ; l'entraînement est alors déjà fait.
     """
     try:
-        # n_jobs=1 pour éviter les warnings qui rendent la console illisible sous Windows
-        y_pred_cv = cross_val_predict(model, X_sel, y_clean, cv=cv, n_jobs=1)
-        model.fit(X_sel, y_clean)
+        if fitted is None:
+            # n_jobs=1 pour éviter les warnings qui rendent la console illisible sous Windows
+            y_pred_cv = cross_val_predict(model, X_sel, y_clean, cv=cv, n_jobs=1)
+            model.fit(X_sel, y_clean)
+        elif isinstance(fitted, Exception):
+            raise fitted
+        else:
+            y_pred_cv, model = fitted
     except Exception as e:
         console.print(f"[bold red]Erreur lors de l'entraînement du modèle {name} ({combo_label}): {e}[/bold red]")
         return {
@@ -160,10 +274,11 @@ def train_and_evaluate_model(name, model, X_sel, y_clean, cv, combo_label):
         "Top3": top3
     }
 
-def run_modeling(X, y, combo_label, cv, selection_method="combined", **sel_params):
+def run_modeling(X, y, combo_label, cv, selection_method="combined", n_jobs=1, **sel_params):
     """
     Lance la modélisation sur plusieurs modèles (OLS, LASSO, etc.),
     + fait la figure de comparaison globale => models_comparison_{combo_label}.png
+    n_jobs : nombre de processus pour les entraînements (modèle × pli), -1 = tous les cœurs.
     """
     data = X.copy()
     data[y.name] = y
@@ -217,10 +332,9 @@ def run_modeling(X, y, combo_label, cv, selection_method="combined", **sel_param
     }
 
     # 3) Pour chaque modèle, on appelle train_and_evaluate_model
-    results = []
-    for name, model in models.items():
-        r = train_and_evaluate_model(name, model, X_sel, y_clean, cv, combo_label)
-        results.append(r)
+    # Plis standardisés partagés (cache sur toutes les features, restreint à la sélection)
+    fold_cache = get_fold_cache(X_clean, y_clean, cv).subset(X_sel.columns)
+    results = evaluate_models(models, X_sel, y_clean, cv, combo_label, n_jobs=n_jobs, fold_cache=fold_cache)
 
     # 4) On compile un DataFrame de performances, on fait la figure de comparaison globale
     performance_df = pd.DataFrame(results).sort_values(by="RMSE")
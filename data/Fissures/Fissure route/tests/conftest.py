@@ -0,0 +1,33 @@
+"""
+Configuration commune des tests : chemins d'import (racine du projet et
+modules plats de data_route) et config.yaml de test, chargée avant tout import
+d'un module de data_route (config.load_config ne lit le fichier qu'une fois).
+"""
+import sys
+import tempfile
+from pathlib import Path
+
+import yaml
+
+ROOT = Path(__file__).resolve().parents[1]
+for path in (ROOT, ROOT / "data_route"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+TEST_DIR = Path(tempfile.mkdtemp(prefix="fissure-tests-"))
+
+import config  # noqa: E402  (data_route/config.py)
+
+_cfg = {
+    "paths": {
+        "local_csv": str(TEST_DIR / "mesures.csv"),
+        "remote_csv": "/dev/null",
+        "local_backup_dir": str(TEST_DIR / "backup"),
+        "store_dir": str(TEST_DIR / "store"),
+        "cache_dir": str(TEST_DIR / "cache"),
+    },
+    "analysis": {"min_interval_seconds": 10, "start_day_default": "2025-03-15", "window_half_width": 3.0},
+    "ssh": {"host": "localhost", "port": 22, "user": "test", "password": ""},
+}
+(TEST_DIR / "config.yaml").write_text(yaml.safe_dump(_cfg), encoding="utf-8")
+config.load_config(TEST_DIR / "config.yaml")
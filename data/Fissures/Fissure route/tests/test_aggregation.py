@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+from scipy.stats import t
+
+import aggregation
+from aggregation import HalfHourCube
+
+
+def _frame(n_days=5, seed=0, step=0.0005):
+    """
+    Mesures (colonnes du chargeur) avec trous : demi-heures vides, jour à deux
+    mesures. `step=None` : valeurs non quantifiées (pas d'égalité exacte entre
+    demi-heures, dont l'arbitrage dépend de l'arrondi de la moyenne).
+    """
+    rng = np.random.default_rng(seed)
+    ts = pd.date_range("2025-03-15", periods=n_days * 24 * 12, freq="5min")
+    ts = ts + pd.to_timedelta(rng.integers(0, 299, len(ts)), unit="s")
+    keep = ~((ts.day == 16) & (ts.hour.isin([3, 4])))          # demi-heures sans mesure
+    keep &= ~((ts.day == 18) & (ts.hour > 0))                   # jour presque vide
+    ts = ts[keep]
+    ts = ts.append(pd.DatetimeIndex(["2025-03-18T00:01:00", "2025-03-18T00:02:00"])).sort_values()
+    inch = 0.5 + 0.01 * np.sin(2 * np.pi * ts.hour / 24) + rng.normal(0, 0.002, len(ts))
+    if step:
+        inch = np.round(inch / step) * step
+    df = pd.DataFrame({"timestamp": ts, "inch": inch}).sample(frac=1, random_state=seed).reset_index(drop=True)
+    df["day"] = df["timestamp"].dt.date
+    df["half_hour"] = df["timestamp"].dt.hour + (df["timestamp"].dt.minute // 30) * 0.5
+    return df
+
+
+def test_daily_base_stats_match_groupby():
+    df = _frame()
+    got = aggregation._daily_base_stats(df)
+    exp = df.groupby("day")["inch"].agg(["mean", "median", "std", "count"]).reset_index()
+    assert list(got["day"]) == list(exp["day"])
+    for col in ("mean", "median", "std", "count"):
+        np.testing.assert_allclose(got[col].to_numpy(float), exp[col].to_numpy(float), rtol=1e-12, equal_nan=True)
+
+
+def test_confidence_intervals_match_loop():
+    df = _frame()
+    daily = aggregation._daily_base_stats(df)
+    got = aggregation.calculate_confidence_intervals(df, daily)
+    lo, hi, normal = [], [], []
+    for _, g in df.groupby("day")["inch"]:
+        n = len(g)
+        if n < 3:
+            lo.append(np.nan), hi.append(np.nan), normal.append(False)
+            continue
+        margin = t.ppf(0.975, n - 1) * g.std(ddof=1) / np.sqrt(n)
+        lo.append(g.mean() - margin), hi.append(g.mean() + margin), normal.append(True)
+    np.testing.assert_allclose(got["ci_lower"], lo, rtol=1e-12, equal_nan=True)
+    np.testing.assert_allclose(got["ci_upper"], hi, rtol=1e-12, equal_nan=True)
+    assert got["normal"].tolist() == normal
+
+
+def test_half_hour_cube_matches_groupby():
+    df = _frame()
+    df_mean, df_median, jour_moyen, jour_median = aggregation.aggregate_by_half_hour(df)
+
+    exp_mean = df.groupby(["day", "half_hour"])["inch"].mean().reset_index()
+    exp_median = df.groupby(["day", "half_hour"])["inch"].median().reset_index()
+    for got, exp in ((df_mean, exp_mean), (df_median, exp_median)):
+        assert list(got["day"]) == list(exp["day"])
+        np.testing.assert_array_equal(got["half_hour"], exp["half_hour"])
+        np.testing.assert_allclose(got["inch"], exp["inch"], rtol=1e-12)
+
+    grid = pd.DataFrame({"half_hour": np.arange(0, 24, 0.5)})
+    exp_jm = grid.merge(exp_mean.groupby("half_hour")["inch"].mean().reset_index(), on="half_hour", how="left")
+    exp_jmed = grid.merge(exp_median.groupby("half_hour")["inch"].median().reset_index(), on="half_hour", how="left")
+    np.testing.assert_allclose(jour_moyen["inch"], exp_jm["inch"], rtol=1e-12)
+    np.testing.assert_allclose(jour_median["inch"], exp_jmed["inch"], rtol=1e-12)
+
+
+
+def test_extreme_half_hours_match_groupby():
+    df = _frame(step=None)
+    ext = HalfHourCube.from_frame(df).extreme_half_hours()
+    for name in ("mean", "median"):
+        frame = df.groupby(["day", "half_hour"])["inch"].agg(name).reset_index()
+        by_day = frame.groupby("day")
+        exp_max = by_day.apply(lambda g: g.loc[g["inch"].idxmax(), "half_hour"])
+        exp_min = by_day.apply(lambda g: g.loc[g["inch"].idxmin(), "half_hour"])
+        pd.testing.assert_series_equal(ext[f"max_half_times_{name}"], exp_max, check_names=False)
+        pd.testing.assert_series_equal(ext[f"min_half_times_{name}"], exp_min, check_names=False)
+
+
+def test_cube_reuses_cached_days():
+    df = _frame(seed=1)
+    first = HalfHourCube.from_frame(df)
+    aggregation._CUBE_CACHE.clear_memory()
+    again = HalfHourCube.from_frame(df)
+    np.testing.assert_array_equal(first.count, again.count)
+    np.testing.assert_allclose(first.median, again.median, equal_nan=True)
@@ -0,0 +1,87 @@
+import math
+
+import numpy as np
+import pytest
+from scipy import stats as st
+
+import stats_calculator as sc
+
+
+def _loop_hours_ci(hours, n_boot=2000, seed=0):
+    """Boucle d'origine de compute_confidence_intervals_hours (une répétition par itération)."""
+    rng = np.random.default_rng(seed)
+    means = [rng.choice(hours, size=len(hours), replace=True).mean() for _ in range(n_boot)]
+    return np.percentile(means, [2.5, 97.5])
+
+
+def _loop_mean_sigma(n, dist, params, n_rep=2000, seed=0):
+    """Boucle d'origine de _bootstrap_mean_sigma : rejet hors de [0, 24) puis statistiques."""
+    rng = np.random.default_rng(seed)
+    means, medians, sigmas = [], [], []
+    for _ in range(n_rep):
+        out = []
+        while len(out) < n:
+            d = dist.rvs(*params, size=n, random_state=rng)
+            out.extend(d[(0 <= d) & (d < 24)].tolist())
+        s = np.asarray(out[:n])
+        means.append(s.mean())
+        medians.append(np.median(s))
+        sigmas.append(s.std(ddof=1))
+    pct = np.percentile
+    return {"mean_lo": pct(means, 2.5), "mean_hi": pct(means, 97.5),
+            "median_lo": pct(medians, 2.5), "median_hi": pct(medians, 97.5),
+            "sigma_lo": pct(sigmas, 2.5), "sigma_hi": pct(sigmas, 97.5)}
+
+
+def test_hours_ci_matches_loop():
+    hours = np.random.default_rng(1).normal(15, 2, 80) % 24
+    got = sc.compute_confidence_intervals_hours(hours, n_boot=2000, seed=0)
+    lo, hi = _loop_hours_ci(hours)
+    # Même flux aléatoire (tirages ligne par ligne) : bornes identiques
+    assert got["ic_boot_mean_lo"] == pytest.approx(lo, abs=1e-12)
+    assert got["ic_boot_mean_hi"] == pytest.approx(hi, abs=1e-12)
+
+
+def test_engine_blocks_do_not_change_result():
+    hours = np.random.default_rng(2).uniform(0, 24, 50)
+
+    def run(max_cells):
+        rng = np.random.default_rng(7)
+        return sc._bootstrap_engine(lambda shape: rng.choice(hours, size=shape), 50, 1000,
+                                    stats=("mean", "median", "std"), max_cells=max_cells)
+
+    whole, blocks = run(10 ** 9), run(1234)
+    for k in ("mean", "median", "std"):
+        np.testing.assert_array_equal(whole[k], blocks[k])
+
+
+@pytest.mark.parametrize("law, params", [("logistic", (22.0, 1.5)), ("truncnorm", (-3.0, 3.0, 3.0, 2.0))])
+def test_mean_sigma_ci_matches_rejection_loop(law, params):
+    dist = sc.LAWS[law]
+    sample = np.zeros(60)  # seule la taille compte
+    got = sc._bootstrap_mean_sigma(sample, dist, params, law, n_rep=4000, seed=0)
+    exp = _loop_mean_sigma(len(sample), dist, params, n_rep=4000, seed=1)
+    for k in exp:
+        assert got[k] == pytest.approx(exp[k], abs=0.08), k
+
+
+@pytest.mark.parametrize("law, params", [("logistic", (22.0, 1.5)), ("logistic", (1.0, 3.0)),
+                                         ("weibull_min", (1.5, -2.0, 6.0))])
+def test_truncated_draws_stay_in_bounds(law, params):
+    draw = sc._truncated_sampler(sc.LAWS[law], params, law, np.random.default_rng(0))
+    x = draw((200, 50))
+    assert x.shape == (200, 50)
+    assert np.all((x >= sc.A) & (x < sc.B))
+    # Loi restreinte à [0, 24) : même moyenne que la loi conditionnée (intégration numérique)
+    dist = sc.LAWS[law]
+    grid = np.linspace(sc.A, sc.B, 20001)
+    pdf = dist.pdf(grid, *params)
+    mean = np.sum(grid * pdf) / np.sum(pdf)
+    assert x.mean() == pytest.approx(mean, abs=0.1)
+
+
+def test_vonmises_draws_are_hours():
+    params = (2.0, math.pi, 1.0)
+    draw = sc._truncated_sampler(st.vonmises, params, "vonmises", np.random.default_rng(0))
+    x = draw((100, 30))
+    np.testing.assert_allclose(x, st.vonmises.rvs(*params, size=(100, 30), random_state=np.random.default_rng(0)) * 24 / (2 * math.pi))
@@ -0,0 +1,75 @@
+import os
+
+import numpy as np
+import pytest
+
+import cache
+from cache import DiskCache, cached_per_day, day_bounds, digest
+
+
+@pytest.fixture(autouse=True)
+def cache_root(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, "cache_dir", lambda: tmp_path)
+    return tmp_path
+
+
+def _days(n_days=4, per_day=6, seed=0):
+    rng = np.random.default_rng(seed)
+    ts = np.datetime64("2025-03-15T00:00", "s") + np.arange(n_days * per_day) * np.timedelta64(86400 // per_day, "s")
+    return day_bounds(ts, rng.normal(size=ts.size))
+
+
+def test_digest_changes_with_data_and_params():
+    a = np.arange(5, dtype=float)
+    assert digest(a, frac=0.05) == digest(a.copy(), frac=0.05)
+    assert digest(a, frac=0.05) != digest(a + 1e-9, frac=0.05)
+    assert digest(a, frac=0.05) != digest(a.astype(np.float32), frac=0.05)
+    assert digest(a, frac=0.05) != digest(a, frac=0.06)
+    assert digest(a, frac=0.05, margin=4) == digest(a, margin=4, frac=0.05)
+
+
+def test_disk_cache_persists_and_prunes_lru(cache_root):
+    c = DiskCache("t", max_entries=3)
+    for i in range(5):
+        c[f"k{i}"] = i
+        c.save()
+        os.utime(cache_root / "t" / f"k{i}.pkl", (i, i))
+    assert sorted(p.stem for p in (cache_root / "t").glob("*.pkl")) == ["k2", "k3", "k4"]
+    assert list(c._mem) == ["k2", "k3", "k4"]
+
+    # Nouvelle instance : lecture disque, qui rafraîchit la date de dernier usage
+    fresh = DiskCache("t", max_entries=3)
+    assert fresh["k2"] == 2 and "k0" not in fresh
+    fresh["k5"] = 5
+    fresh.save()
+    assert sorted(p.stem for p in (cache_root / "t").glob("*.pkl")) == ["k2", "k4", "k5"]
+    assert not list((cache_root / "t").glob("*.tmp"))
+
+
+def test_cached_per_day_recomputes_only_new_or_modified_days():
+    calls = []
+
+    def compute(ts, vals, lengths):
+        calls.append(list(lengths))
+        return [float(v.sum()) for v in np.split(vals, np.cumsum(lengths)[:-1])]
+
+    c = DiskCache("per_day")
+    ts, vals, days, lo, hi = _days()
+    first = cached_per_day(c, ts, vals, lo, hi, compute, frac=0.05)
+    assert calls == [[6, 6, 6, 6]]
+    assert first == pytest.approx([vals[a:b].sum() for a, b in zip(lo, hi)])
+
+    # Jour 2 modifié, jour 5 ajouté : seuls ces deux jours sont recalculés
+    ts2, vals2, _, lo2, hi2 = _days(n_days=5)
+    vals2[:hi[-1]] = vals
+    vals2[lo[2]] += 1.0
+    calls.clear()
+    c.clear_memory()  # relu depuis le disque
+    second = cached_per_day(c, ts2, vals2, lo2, hi2, compute, frac=0.05)
+    assert calls == [[6, 6]]
+    assert second == pytest.approx([vals2[a:b].sum() for a, b in zip(lo2, hi2)])
+
+    # Paramètres différents (configuration modifiée) : tout est recalculé
+    calls.clear()
+    cached_per_day(c, ts2, vals2, lo2, hi2, compute, frac=0.06)
+    assert calls == [[6, 6, 6, 6, 6]]
@@ -0,0 +1,117 @@
+import io
+import json
+from types import SimpleNamespace
+
+import pytest
+
+import data_loader
+from csv_delta import read_new_lines
+
+LINES = [f"2025-03-15T10:{m:02d}:00.000000,0.{5000 + m}\n".encode() for m in range(40)]
+
+
+class FakeSFTP:
+    """SFTP en mémoire : un seul fichier distant, contenu modifiable par le test."""
+
+    def __init__(self, data=b""):
+        self.data = data
+
+    def stat(self, path):
+        return SimpleNamespace(st_size=len(self.data))
+
+    def open(self, path, mode="rb"):
+        return io.BytesIO(self.data)
+
+
+@pytest.fixture
+def paths(tmp_path):
+    backup = tmp_path / "backup"
+    backup.mkdir()
+    return tmp_path / "m.csv", backup
+
+
+def _sync(sftp, local, backup):
+    return data_loader._fetch_delta(sftp, "/remote.csv", local, backup)
+
+
+def _state(local):
+    return json.loads(data_loader._sync_state_path(local).read_text(encoding="utf-8"))
+
+
+# ------------------------------------------------------------ read_new_lines
+def test_read_new_lines_watermark():
+    data = b"".join(LINES[:5])
+    offset, tail = len(b"".join(LINES[:3])), LINES[2]
+    assert read_new_lines(io.BytesIO(data), len(data), offset, tail) == (LINES[3] + LINES[4], LINES[4])
+    # Ligne partielle en fin de fichier : non renvoyée, filigrane inchangé
+    partial = data + LINES[5][:10]
+    assert read_new_lines(io.BytesIO(partial), len(partial), len(data), LINES[4]) == (b"", LINES[4])
+    # Rien de neuf
+    assert read_new_lines(io.BytesIO(data), len(data), len(data), LINES[4]) == (b"", LINES[4])
+    # Fichier plus court que l'offset, ligne frontière différente
+    assert read_new_lines(io.BytesIO(data), len(data), len(data) + 1, LINES[4]) is None
+    assert read_new_lines(io.BytesIO(data), len(data), offset, LINES[1]) is None
+
+
+# ------------------------------------------------------------ _fetch_delta
+def test_append_then_noop(paths):
+    local, backup = paths
+    local.write_bytes(b"".join(LINES[:10]))
+    sftp = FakeSFTP(b"".join(LINES[:25]) + LINES[25][:7])
+    assert _sync(sftp, local, backup)
+    assert local.read_bytes() == b"".join(LINES[:25])
+    state = _state(local)
+    assert (state["offset"], state["tail"]) == (local.stat().st_size, LINES[24].decode())
+    assert len(list(backup.glob("*.delta.csv"))) == 1
+
+    assert _sync(sftp, local, backup)  # aucune ligne complète nouvelle
+    assert local.read_bytes() == b"".join(LINES[:25])
+    assert len(list(backup.glob("*.delta.csv"))) == 1
+
+    sftp.data = b"".join(LINES[:40])
+    assert _sync(sftp, local, backup)
+    assert local.read_bytes() == b"".join(LINES[:40])
+
+
+def test_tail_mismatch_requests_full_import(paths):
+    local, backup = paths
+    local.write_bytes(b"".join(LINES[:10]))
+    rewritten = b"".join(LINES[:9]) + b"2025-03-15T10:09:00.000000,0.9999\n" + b"".join(LINES[10:20])
+    assert not _sync(FakeSFTP(rewritten), local, backup)
+    assert local.read_bytes() == b"".join(LINES[:10])
+
+
+def test_remote_shorter_requests_full_import(paths):
+    local, backup = paths
+    local.write_bytes(b"".join(LINES[:10]))
+    assert not _sync(FakeSFTP(b"".join(LINES[:5])), local, backup)
+    assert local.read_bytes() == b"".join(LINES[:10])
+
+
+def test_no_complete_line_requests_full_import(paths):
+    local, backup = paths
+    local.write_bytes(b"x" * 5000)  # aucun saut de ligne dans les 4096 derniers octets
+    assert not _sync(FakeSFTP(b"".join(LINES)), local, backup)
+    assert local.read_bytes() == b"x" * 5000
+    assert not data_loader._sync_state_path(local).exists()
+
+
+def test_state_mismatch_recovers_from_local(paths):
+    local, backup = paths
+    local.write_bytes(b"".join(LINES[:10]))
+    sftp = FakeSFTP(b"".join(LINES[:20]))
+    assert _sync(sftp, local, backup)
+    # Arrêt entre l'ajout et l'écriture de l'état : état resté à l'ancien offset
+    data_loader._save_sync_state(local, len(b"".join(LINES[:10])), LINES[9])
+    sftp.data = b"".join(LINES[:30])
+    assert _sync(sftp, local, backup)
+    assert local.read_bytes() == b"".join(LINES[:30])
+
+
+def test_partial_local_line_is_replaced(paths):
+    local, backup = paths
+    local.write_bytes(b"".join(LINES[:10]) + LINES[10][:12])
+    assert data_loader._state_from_local(local)["offset"] == len(b"".join(LINES[:10]))
+    assert local.read_bytes().endswith(LINES[10][:12])  # état reconstruit sans troncature
+    assert _sync(FakeSFTP(b"".join(LINES[:20])), local, backup)
+    assert local.read_bytes() == b"".join(LINES[:20])
@@ -0,0 +1,118 @@
+import numpy as np
+import pandas as pd
+import pytest
+from statsmodels.nonparametric.smoothers_lowess import lowess
+
+import time_calculator
+from cache import day_bounds
+
+
+def _series(n_days=10, step_s=60, seed=3):
+    """Mesures quantifiées (paliers du comparateur), cycle journalier, ordre d'arrivée mélangé."""
+    rng = np.random.default_rng(seed)
+    ts = pd.date_range("2025-03-15", periods=n_days * 86400 // step_s, freq=f"{step_s}s")
+    ts = ts + pd.to_timedelta(rng.integers(0, 900_000, len(ts)), unit="us")
+    hours = (ts - ts[0]).total_seconds().to_numpy() / 3600
+    inch = 0.5 + 0.004 * np.sin(2 * np.pi * (hours - 9) / 24) + rng.normal(0, 0.0003, len(ts))
+    df = pd.DataFrame({"timestamp": ts, "inch": np.round(inch / 0.0005) * 0.0005})
+    return df.sample(frac=1, random_state=seed).reset_index(drop=True)
+
+
+def _reference(df, margin=4, frac=0.05, tol_cand=1e-3, tol_plateau=1e-6, window_min=20):
+    """Boucle jour par jour d'origine (avant le calcul vectorisé), recopiée pour comparaison."""
+    def find_runs(idxs):
+        runs = []
+        if not idxs:
+            return runs
+        start = prev = idxs[0]
+        for i in idxs[1:]:
+            if i == prev + 1:
+                prev = i
+            else:
+                runs.append((start, prev))
+                start = prev = i
+        runs.append((start, prev))
+        return runs
+
+    def pick(runs, raw_i):
+        return next((r for r in runs if r[0] <= raw_i <= r[1]), None) \
+            or (max(runs, key=lambda r: r[1] - r[0]) if runs else None)
+
+    def refine(res, vals, times):
+        for key_t, key_v, is_max in [("t_max", "v_max", True), ("t_min", "v_min", False)]:
+            raw_i = int(np.argmin((times - res[key_t]).abs().values))
+            v0 = res[key_v]
+            mask = (times >= res[key_t] - pd.Timedelta(minutes=window_min)) & \
+                   (times <= res[key_t] + pd.Timedelta(minutes=window_min))
+            win = np.nonzero(mask)[0]
+            v_cand = None
+            if win.size:
+                ext = vals[win].max() if is_max else vals[win].min()
+                if (is_max and ext > v0 + tol_cand) or (not is_max and ext < v0 - tol_cand):
+                    v_cand = ext
+            if v_cand is not None:
+                run = pick(find_runs(np.nonzero(mask & np.isclose(vals, v_cand, atol=tol_plateau))[0].tolist()), raw_i)
+                value = v_cand
+            else:
+                run = pick(find_runs(np.nonzero(np.isclose(vals, v0, atol=tol_plateau))[0].tolist()), raw_i)
+                value = v0
+            if run:
+                s, e = run
+                res[key_v] = value
+                res[key_t] = times.iloc[s] + (times.iloc[e] - times.iloc[s]) / 2
+        return res
+
+    df2 = df.sort_values("timestamp").assign(day=lambda d: d["timestamp"].dt.date)
+    days = sorted(df2["day"].unique())
+    records = []
+    for day, grp in df2.groupby("day"):
+        if day in (days[0], days[-1]):
+            continue
+        sub = grp.sort_values("timestamp").reset_index(drop=True)
+        if len(sub) < margin * 2 + 3:
+            continue
+        vals, times = sub["inch"].to_numpy(), sub["timestamp"]
+        d = np.diff(lowess(vals, np.arange(len(vals)), frac=frac, return_sorted=False))
+        peaks = [i + 1 for i in range(len(d) - 1) if d[i] > 0 and d[i + 1] < 0 and margin <= i + 1 < len(vals) - margin]
+        valleys = [i + 1 for i in range(len(d) - 1) if d[i] < 0 and d[i + 1] > 0 and margin <= i + 1 < len(vals) - margin]
+        if not peaks or not valleys:
+            continue
+        max_i, min_i = max(peaks, key=lambda i: vals[i]), min(valleys, key=lambda i: vals[i])
+        res = refine({"t_max": times.iloc[max_i], "v_max": vals[max_i],
+                      "t_min": times.iloc[min_i], "v_min": vals[min_i]}, vals, times)
+        records.append({"day": day, "time_max": res["t_max"], "val_max": res["v_max"],
+                        "time_min": res["t_min"], "val_min": res["v_min"]})
+    return pd.DataFrame(records)
+
+
+def _assert_same(got, exp):
+    assert list(got["day"]) == list(exp["day"])
+    for col in ("time_max", "time_min"):
+        np.testing.assert_array_equal(pd.to_datetime(got[col]).to_numpy("datetime64[ns]"),
+                                      pd.to_datetime(exp[col]).to_numpy("datetime64[ns]"))
+    for col in ("val_max", "val_min"):
+        np.testing.assert_array_equal(got[col].to_numpy(float), exp[col].to_numpy(float))
+
+
+def test_matches_reference_loop():
+    df = _series()
+    exp = _reference(df)
+    assert len(exp) == 8
+    _assert_same(time_calculator.compute_daily_extrema_timestamps(df), exp)
+    # Second appel : toutes les journées viennent du cache disque
+    _assert_same(time_calculator.compute_daily_extrema_timestamps(df), exp)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_run_extrema_serial_and_pool(monkeypatch, workers):
+    df = _series(n_days=6, seed=5)
+    exp = _reference(df)
+    ts, vals, days, lo, hi = day_bounds(df["timestamp"].to_numpy(), df["inch"].to_numpy(float))
+    lo, hi = lo[1:-1], hi[1:-1]
+    monkeypatch.setattr(time_calculator, "_extrema_workers", lambda: workers)
+    params = dict(time_calculator.EXTREMA_PARAMS, margin=4)
+    # Journées contiguës (bornes lo/hi consécutives) : tranche unique du tableau trié
+    found, t_max, v_max, t_min, v_min = time_calculator._run_extrema(ts[lo[0]:hi[-1]], vals[lo[0]:hi[-1]], hi - lo, params)
+    got = pd.DataFrame({"day": pd.DatetimeIndex(days[lo]).date, "time_max": t_max, "val_max": v_max,
+                        "time_min": t_min, "val_min": v_min})[found.astype(bool)]
+    _assert_same(got.reset_index(drop=True), exp)
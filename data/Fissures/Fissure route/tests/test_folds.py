@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import ARDRegression, BayesianRidge, ElasticNet, Lasso, LinearRegression, Ridge
+from sklearn.model_selection import KFold, cross_val_predict
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+
+from models.folds import get_fold_cache, fit_cached, is_cacheable
+
+ESTIMATORS = [
+    LinearRegression(),
+    Ridge(alpha=1.0),
+    Lasso(alpha=1e-2, max_iter=200000),
+    ElasticNet(alpha=1e-2, l1_ratio=0.5, max_iter=200000),
+    ARDRegression(),
+    BayesianRidge(),
+]
+
+
+@pytest.fixture(scope="module")
+def data():
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.normal(size=(200, 12)) * rng.uniform(0.1, 10, 12) + rng.normal(size=12),
+                     columns=[f"x{i}" for i in range(12)])
+    y = pd.Series(X.to_numpy() @ rng.normal(size=12) + rng.normal(size=200), name="y")
+    return X, y, KFold(n_splits=5, shuffle=True, random_state=42)
+
+
+@pytest.mark.parametrize("scale", [True, False])
+@pytest.mark.parametrize("estimator", ESTIMATORS, ids=lambda e: type(e).__name__)
+def test_fit_cached_matches_cross_val_predict(data, estimator, scale):
+    X, y, cv = data
+    model = make_pipeline(StandardScaler(), estimator) if scale else estimator
+    cols = X.columns[[0, 2, 3, 7, 11]]  # sous-ensemble : cache restreint sans recalcul
+    cache = get_fold_cache(X, y, cv, scale=scale).subset(cols)
+    assert is_cacheable(model, cache)
+
+    y_pred, fitted = fit_cached(model, cache, X[cols])
+    expected = cross_val_predict(model, X[cols], y, cv=cv)
+    np.testing.assert_allclose(y_pred, expected, rtol=0, atol=1e-11)
+    reference = model.fit(X[cols], y)
+    np.testing.assert_allclose(fitted.predict(X[cols]), reference.predict(X[cols]), rtol=0, atol=1e-11)
+
+
+def test_non_linear_or_mismatched_models_are_not_cacheable(data):
+    from sklearn.ensemble import RandomForestRegressor
+    X, y, cv = data
+    scaled, centred = get_fold_cache(X, y, cv), get_fold_cache(X, y, cv, scale=False)
+    assert not is_cacheable(make_pipeline(StandardScaler(), RandomForestRegressor()), scaled)
+    assert not is_cacheable(Ridge(), scaled)                                   # pas de StandardScaler
+    assert not is_cacheable(make_pipeline(StandardScaler(), Ridge()), centred)  # cache non standardisé
+    assert not is_cacheable(make_pipeline(StandardScaler(), Ridge(fit_intercept=False)), scaled)
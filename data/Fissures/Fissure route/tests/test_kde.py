@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+from scipy.stats import gaussian_kde
+
+import kde
+
+
+def _scipy_with_bandwidth(sample, bandwidth):
+    return gaussian_kde(sample, bw_method=bandwidth / np.std(sample, ddof=1))
+
+
+@pytest.mark.parametrize("seed", [0, 1])
+def test_linear_density_matches_gaussian_kde(seed):
+    rng = np.random.default_rng(seed)
+    sample = np.r_[rng.normal(0.50, 0.004, 150), rng.normal(0.52, 0.002, 60)]
+    density = kde.kde_density(sample)
+    reference = gaussian_kde(sample)
+    assert density.bandwidth == pytest.approx(np.sqrt(reference.covariance[0, 0]), rel=1e-12)
+    x = np.linspace(sample.min() - 0.01, sample.max() + 0.01, 500)
+    expected = reference(x)
+    np.testing.assert_allclose(density(x), expected, atol=1e-3 * expected.max())
+
+
+def test_circular_density_wraps_around_midnight():
+    rng = np.random.default_rng(2)
+    sample = np.mod(rng.normal(23.6, 0.8, 200), 24)  # cluster à cheval sur minuit
+    density = kde.kde_density(sample, period=24.0)
+    # Référence : noyau gaussien de même largeur, replié sur ±1 période
+    reference = _scipy_with_bandwidth(sample, density.bandwidth)
+    x = np.linspace(0, 24, 481)
+    expected = sum(reference(x + k * 24) for k in (-1, 0, 1))
+    np.testing.assert_allclose(density(x), expected, atol=1e-3 * expected.max())
+    assert density(0.0) == pytest.approx(density(24.0))
+    assert density.mode == pytest.approx(23.6, abs=0.3)
+    # Masse totale sur une période
+    grid = np.linspace(0, 24, 4801)
+    assert np.sum(density(grid)[:-1]) * (grid[1] - grid[0]) == pytest.approx(1.0, abs=1e-3)
+
+
+def test_densities_are_shared_per_sample():
+    sample = np.random.default_rng(3).normal(12, 2, 50)
+    assert kde.kde_density(sample, period=24.0) is kde.kde_density(sample[::-1].copy(), period=24.0)
+    assert kde.kde_density(sample) is not kde.kde_density(sample, period=24.0)
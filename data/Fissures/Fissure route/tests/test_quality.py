@@ -0,0 +1,64 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import quality
+
+K = quality.HAMPEL_HALF_WINDOW
+
+
+def _lines(n, spikes=(), start="2025-03-15"):
+    rng = np.random.default_rng(0)
+    ts = pd.date_range(start, periods=n, freq="15s") + pd.to_timedelta(rng.integers(0, 999999, n), unit="us")
+    inch = 0.5 + rng.normal(0, 0.0005, n)
+    inch[list(spikes)] += 0.1  # ~2.5 mm
+    return [f"{t.isoformat(timespec='microseconds')},{v:.6f}\n" for t, v in zip(ts, inch)], ts
+
+
+def _excluded(csv_path, reason="hampel"):
+    return json.loads(quality.index_path(csv_path).read_text(encoding="utf-8"))["excluded"][reason]
+
+
+@pytest.mark.parametrize("cuts", [[200], [57, 58, 120, 200], list(range(3, 201, 7)) + [200]])
+def test_blocks_match_single_pass(tmp_path, cuts):
+    spikes = [20, 55, 56 + K - 1, 150, 200 - K - 1]
+    lines, ts = _lines(200, spikes)
+    csv_path = tmp_path / "mesures.csv"
+    csv_path.write_text("", encoding="utf-8")
+    start = 0
+    for cut in cuts:
+        with csv_path.open("a", encoding="utf-8") as f:
+            f.writelines(lines[start:cut])
+        quality.update_exclusions(csv_path)
+        start = cut
+    found = sorted(pd.Timestamp(s) for s in _excluded(csv_path))
+    assert found == sorted(ts[spikes])
+
+
+def test_trailing_rows_wait_for_next_block(tmp_path):
+    lines, ts = _lines(120, spikes=[97])
+    csv_path = tmp_path / "mesures.csv"
+    csv_path.write_text("".join(lines[:98]), encoding="utf-8")
+    quality.update_exclusions(csv_path)
+    assert _excluded(csv_path) == []  # pic dans les k dernières lignes : en attente
+    assert quality.pending_since(csv_path) == ts[98 - K]
+    with csv_path.open("a", encoding="utf-8") as f:
+        f.writelines(lines[98:])
+    quality.update_exclusions(csv_path)
+    assert [pd.Timestamp(s) for s in _excluded(csv_path)] == [ts[97]]
+    assert quality.pending_since(csv_path) == ts[120 - K]
+
+
+def test_partial_last_line_and_rewrite(tmp_path):
+    lines, ts = _lines(60, spikes=[30])
+    csv_path = tmp_path / "mesures.csv"
+    csv_path.write_text("".join(lines[:50]) + lines[50][:10], encoding="utf-8")
+    quality.update_exclusions(csv_path)
+    index = json.loads(quality.index_path(csv_path).read_text(encoding="utf-8"))
+    assert index["csv_offset"] == len("".join(lines[:50]).encode())
+    # CSV réécrit (contenu différent) : nouvelle analyse complète, sans doublon
+    csv_path.write_text("".join(lines), encoding="utf-8")
+    quality.update_exclusions(csv_path)
+    assert [pd.Timestamp(s) for s in _excluded(csv_path)] == [ts[30]]
@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LassoCV
+
+from features import selection
+
+
+def _data(n=120, p=12, seed=0):
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame(rng.normal(size=(n, p)), columns=[f"f{j}" for j in range(p)])
+    y = pd.Series(2 * X["f0"] - 1.5 * X["f3"] + 0.8 * X["f7"] + rng.normal(0, 0.5, n))
+    return X, y
+
+
+def test_stability_selection_matches_per_subsample_lassocv():
+    X, y = _data()
+    n_iter, fraction, threshold = 6, 0.8, 0.5
+    size = int(len(y) * fraction)
+    counts = np.zeros(X.shape[1])
+    for i in range(n_iter):
+        idx = selection._subsample(len(y), size, 42, i)
+        counts += LassoCV(cv=5, random_state=42, max_iter=200000).fit(X.iloc[idx], y.iloc[idx]).coef_ != 0
+    expected = X.columns[counts / n_iter >= threshold].tolist()
+    got = selection.stability_selection(X, y, n_iter=n_iter, sample_fraction=fraction, threshold=threshold, n_jobs=1)
+    assert got == expected
+    assert {"f0", "f3", "f7"} <= set(got)
+
+
+def test_support_caches_are_bounded(monkeypatch):
+    X, y = _data(n=60, p=8, seed=1)
+    monkeypatch.setattr(selection, "_SUPPORTS", selection.OrderedDict())
+    monkeypatch.setattr(selection, "_SUPPORTS_CACHE_SIZE", 4)
+    first = selection.stability_selection(X, y, n_iter=3, n_jobs=1)
+    assert len(selection._SUPPORTS) == 3
+    selection.stability_selection(X, y, n_iter=6, n_jobs=1)
+    assert len(selection._SUPPORTS) == 4
+    # Itérations 0 à 2 évincées : recalculées à l'identique
+    assert selection.stability_selection(X, y, n_iter=3, n_jobs=1) == first
+    assert len(selection._SUPPORTS) == 4
+
+
+def _fake_search(monkeypatch, **kwargs):
+    """
+    Recherche avec sélection et score factices : le score d'un candidat est son
+    seuil de stabilité. Renvoie (meilleurs paramètres, appels (paramètres, n_iter)).
+    """
+    calls = []
+
+    def select(X, y, n_features_to_select, n_iter, sample_fraction, stability_threshold, random_state):
+        calls.append(((n_features_to_select, sample_fraction, stability_threshold), n_iter))
+        return [stability_threshold]
+
+    monkeypatch.setattr(selection, "select_features_combined", select)
+    monkeypatch.setattr(selection, "_selection_score", lambda X, y, sel, cv: sel[0])
+    X, y = _data(n=20, p=8)
+    return selection.random_search_selection(X, y, **kwargs), calls
+
+
+def test_successive_halving_promotes_best_and_honours_budgets(monkeypatch):
+    best, calls = _fake_search(monkeypatch, n_search=9, min_iter=10, max_iter=90, eta=3)
+    rungs = {}
+    for params, n_iter in calls:
+        rungs.setdefault(n_iter, []).append(params)
+    assert list(rungs) == [10, 30, 90]
+    assert [len(rungs[b]) for b in (10, 30, 90)] == [9, 3, 1]
+    by_score = sorted(rungs[10], key=lambda p: p[2], reverse=True)
+    assert sorted(rungs[30]) == sorted(by_score[:3])
+    assert rungs[90] == by_score[:1]
+    assert best == by_score[0]
+    # Tirage d'origine : fraction continue dans [0.75, 0.95)
+    assert len({p[1] for p in rungs[10]}) == 9
+    assert all(0.75 <= p[1] < 0.95 for p in rungs[10])
+
+
+def test_without_halving_every_candidate_gets_max_iter(monkeypatch):
+    best, calls = _fake_search(monkeypatch, n_search=5, halving=False, max_iter=30)
+    assert [n_iter for _, n_iter in calls] == [30] * 5
+    assert best == max((p for p, _ in calls), key=lambda p: p[2])
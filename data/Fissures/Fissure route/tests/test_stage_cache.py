@@ -0,0 +1,57 @@
+import pandas as pd
+
+from utils.cache_utils import StageCache, frame_hash
+
+
+def _pipeline(tmp_path, data, calls, upstream_result=None, rerun=()):
+    """Deux étapes : 'amont' (dépend de data) -> 'aval' (dépend du résultat amont)."""
+    stages = StageCache(str(tmp_path / "stages"), rerun=rerun, log=lambda *a, **k: None)
+    figure = tmp_path / "aval.png"
+
+    def amont():
+        calls.append("amont")
+        return float(data.sum()) if upstream_result is None else upstream_result
+
+    def aval():
+        calls.append("aval")
+        figure.write_text("figure")
+        return res * 2
+
+    res = stages.run("amont", "amont", amont, dict(data=frame_hash(data)))
+    out = stages.run("aval", "aval", aval, dict(amont=stages.result_hashes["amont"]), outputs=[str(figure)])
+    return out, figure
+
+
+def test_unchanged_inputs_hit_cache(tmp_path):
+    data, calls = pd.Series([1.0, 2.0], name="x"), []
+    assert _pipeline(tmp_path, data, calls)[0] == 6.0
+    assert _pipeline(tmp_path, data, calls)[0] == 6.0
+    assert calls == ["amont", "aval"]
+
+
+def test_changed_input_invalidates_downstream(tmp_path):
+    calls = []
+    _pipeline(tmp_path, pd.Series([1.0, 2.0], name="x"), calls)
+    out, _ = _pipeline(tmp_path, pd.Series([1.0, 3.0], name="x"), calls)
+    assert out == 8.0
+    assert calls == ["amont", "aval"] * 2
+    # un seul résultat conservé par étape
+    assert len(list((tmp_path / "stages").glob("amont-*.pkl"))) == 1
+
+
+def test_same_upstream_result_keeps_downstream(tmp_path):
+    calls = []
+    _pipeline(tmp_path, pd.Series([1.0, 2.0], name="x"), calls)
+    # entrées amont différentes, même résultat : l'aval reste en cache
+    _pipeline(tmp_path, pd.Series([2.0, 1.0], name="x"), calls, upstream_result=3.0)
+    assert calls == ["amont", "aval", "amont"]
+
+
+def test_missing_output_or_rerun_recomputes(tmp_path):
+    data, calls = pd.Series([1.0, 2.0], name="x"), []
+    _, figure = _pipeline(tmp_path, data, calls)
+    figure.unlink()
+    _pipeline(tmp_path, data, calls)
+    assert calls == ["amont", "aval", "aval"]
+    _pipeline(tmp_path, data, calls, rerun={"amont"})
+    assert calls == ["amont", "aval", "aval", "amont"]
@@ -0,0 +1,77 @@
+import io
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import store
+
+ALL = (pd.Timestamp("2000-01-01"), pd.Timestamp("2100-01-01"))
+
+
+def _lines(n, start="2025-03-15T22:00:00"):
+    ts = pd.date_range(start, periods=n, freq="37s")
+    inch = np.round(0.5 + 0.001 * np.sin(np.arange(n) / 10), 4)
+    return [f"{t.isoformat(timespec='microseconds')},{v}\n" for t, v in zip(ts, inch)]
+
+
+def _expected(lines):
+    df = pd.read_csv(io.StringIO("".join(lines)), header=None, names=["timestamp", "inch"])
+    df["timestamp"] = pd.to_datetime(df["timestamp"], format="ISO8601")
+    return df
+
+
+def _check(store_dir, lines):
+    got = store.read_store(*ALL, store_dir=store_dir).reset_index(drop=True)
+    exp = _expected(lines)
+    assert not got["timestamp"].duplicated().any()
+    np.testing.assert_array_equal(got["timestamp"].to_numpy("datetime64[us]"), exp["timestamp"].to_numpy("datetime64[us]"))
+    np.testing.assert_allclose(got["inch"].to_numpy(float), exp["inch"].to_numpy(float), atol=1e-6)
+
+
+def test_incremental_updates_and_partial_line(tmp_path):
+    lines = _lines(300)  # 22:00 → ~01:05 : deux partitions journalières
+    csv_path, store_dir = tmp_path / "m.csv", tmp_path / "store"
+    csv_path.write_text("".join(lines[:100]) + lines[100][:12], encoding="utf-8")
+    assert store.update_store(csv_path, store_dir) == 100
+    with csv_path.open("a", encoding="utf-8") as f:
+        f.write(lines[100][12:] + "".join(lines[101:]))
+    assert store.update_store(csv_path, store_dir) == 200
+    assert store.update_store(csv_path, store_dir) == 0
+    assert sorted(p.parent.name for p in store_dir.glob("day=*/part.parquet")) == ["day=2025-03-15", "day=2025-03-16"]
+    _check(store_dir, lines)
+
+
+def test_resume_after_crash_before_manifest(tmp_path, monkeypatch):
+    lines = _lines(300)
+    csv_path, store_dir = tmp_path / "m.csv", tmp_path / "store"
+    csv_path.write_text("".join(lines[:150]), encoding="utf-8")
+    store.update_store(csv_path, store_dir)
+    with csv_path.open("a", encoding="utf-8") as f:
+        f.writelines(lines[150:])
+
+    def crash(*args):
+        raise OSError("arrêt simulé")
+
+    # Partitions réécrites, manifeste non mis à jour : le bloc sera relu
+    with monkeypatch.context() as m:
+        m.setattr(store, "_save_manifest", crash)
+        with pytest.raises(OSError):
+            store.update_store(csv_path, store_dir)
+    assert store.update_store(csv_path, store_dir) == 150
+    _check(store_dir, lines)
+    assert not list(store_dir.rglob("*.tmp"))
+
+
+def test_rewritten_csv_rebuilds_store(tmp_path):
+    csv_path, store_dir = tmp_path / "m.csv", tmp_path / "store"
+    csv_path.write_text("".join(_lines(120)), encoding="utf-8")
+    store.update_store(csv_path, store_dir)
+    other = _lines(80, start="2025-04-01T10:00:00")
+    csv_path.write_text("".join(other), encoding="utf-8")
+    assert store.update_store(csv_path, store_dir) == 80
+    _check(store_dir, other)
+    manifest = json.loads((store_dir / store.MANIFEST).read_text(encoding="utf-8"))
+    assert manifest["csv_offset"] == csv_path.stat().st_size
+    assert manifest["tail"] == other[-1]
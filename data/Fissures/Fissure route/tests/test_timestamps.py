@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from timestamps import NAT, parse_iso_us
+
+
+def _expected(stamps):
+    return pd.to_datetime(stamps, format="ISO8601").to_numpy("datetime64[ns]").view(np.int64)
+
+
+@pytest.mark.parametrize("dtype", [object, "U", "S27"])
+def test_valid_with_and_without_fraction(dtype):
+    stamps = ["2025-05-25T13:18:06.391823", "2025-05-25T13:18:07", "2024-02-29T23:59:59.999999"]
+    ns, valid = parse_iso_us(np.array(stamps, dtype=dtype))
+    assert valid.all()
+    np.testing.assert_array_equal(ns, _expected(stamps))
+
+
+@pytest.mark.parametrize("stamp", [
+    "2025-02-30T00:00:00.000000",   # jour inexistant
+    "2025-13-01T00:00:00.000000",   # mois hors bornes
+    "2025-05-25T24:00:00.000000",   # heure hors bornes
+    "2023-02-29T12:00:00",          # 29 février d'une année non bissextile
+    "2025-05-25T13:18:06.39182",    # fraction tronquée
+    "2025-05-25_13:18:06.391823",   # séparateur
+    "2025-05-25T13:18:06.3918231",  # trop long
+    "2025-05-25T13:18:0a.391823",
+    "",
+])
+def test_invalid_rows_are_flagged(stamp):
+    good = "2025-05-25T13:18:06.391823"
+    ns, valid = parse_iso_us(np.array([good, stamp, good], dtype=object))
+    np.testing.assert_array_equal(valid, [True, False, True])
+    assert ns[1] == NAT
+    assert ns[0] == ns[2] == _expected([good])[0]
+
+
+def test_utc_suffix_is_rejected():
+    # Le comparateur écrit des heures locales sans fuseau : un suffixe 'Z'
+    # (ou un décalage) n'est pas du format attendu
+    ns, valid = parse_iso_us(np.array(["2025-05-25T13:18:06Z", "2025-05-25T13:18:06.391823Z"], dtype=object))
+    assert not valid.any()
+    assert (ns == NAT).all()
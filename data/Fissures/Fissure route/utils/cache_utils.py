@@ -15,3 +15,103 @@ def save_if_not_exists(filename, save_func, *args, **kwargs):
         save_func(*args, **kwargs)
         return True
     return False
+
+
+# -------------------------------------------------------------------
+# Cache d'étapes adressé par le contenu des entrées
+# -------------------------------------------------------------------
+def frame_hash(obj):
+    """Empreinte du contenu d'un DataFrame ou d'une Series (valeurs, index, colonnes / nom)."""
+    import pandas as pd
+    from joblib import hash as joblib_hash
+    values = pd.util.hash_pandas_object(obj, index=True).to_numpy()
+    labels = list(obj.columns) if isinstance(obj, pd.DataFrame) else obj.name
+    return joblib_hash((labels, values))
+
+
+def file_hash(*paths):
+    """Empreinte du contenu de fichiers (ex. sources d'un module : code modifié => étape invalidée)."""
+    import hashlib
+    h = hashlib.sha1()
+    for path in paths:
+        with open(path, "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+
+class StageCache:
+    """
+    Cache des résultats d'étapes d'un pipeline (graphe de dépendances).
+
+    Chaque étape déclare ses entrées (empreintes des données, cible, config de
+    CV, paramètres, empreintes des résultats des étapes dont elle dépend...) et
+    les fichiers qu'elle écrit ; son résultat est stocké (pickle) sous
+    `<nom>-<empreinte des entrées>.pkl` dans cache_dir, avec l'empreinte du
+    résultat et de ses fichiers de sortie. Une étape n'est relancée que si ses
+    entrées ont changé, si un de ses fichiers de sortie a disparu, ou si elle
+    figure dans `rerun`. Une étape qui dépend d'une autre inclut
+    `result_hashes[autre]` dans ses entrées : une étape amont relancée sans que
+    son résultat ne change (ex. code modifié sans effet) n'invalide pas l'aval.
+    """
+
+    def __init__(self, cache_dir, rerun=(), log=print):
+        self.cache_dir = cache_dir
+        self.rerun = set(rerun)
+        self.log = log
+        self.keys = {}
+        self.result_hashes = {}
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, name, key):
+        return os.path.join(self.cache_dir, f"{name}-{key}.pkl")
+
+    def _load(self, path):
+        import pickle
+        try:
+            with open(path, "rb") as f:
+                entry = pickle.load(f)
+        except Exception:
+            return None
+        if not (isinstance(entry, dict) and {"result", "result_hash"} <= set(entry)):
+            return None  # ancien format (résultat seul) : étape recalculée
+        return entry
+
+    def run(self, name, label, func, inputs, outputs=()):
+        """
+        Renvoie le résultat de func() pour ces entrées : lu en cache s'il existe,
+        sinon calculé puis enregistré (les résultats périmés de l'étape sont supprimés).
+
+        `outputs` : fichiers écrits par l'étape, ou fonction du résultat qui
+        les renvoie (ex. une figure par modèle effectivement ajusté).
+        """
+        import pickle
+        import tempfile
+        import time
+        from joblib import hash as joblib_hash
+        key = joblib_hash((name, inputs))
+        self.keys[name] = key
+        path = self._path(name, key)
+        entry = self._load(path) if name not in self.rerun and file_exists(path) else None
+        if entry is not None and all(file_exists(p) for p in self._outputs(outputs, entry["result"])):
+            self.log(f"[bold blue]{label} : entrées inchangées ({key[:8]}), résultat en cache.[/bold blue]")
+            self.result_hashes[name] = entry["result_hash"]
+            return entry["result"]
+
+        self.log(f"\n[bold underline]{label}[/bold underline]")
+        start = time.time()
+        result = func()
+        self.log(f"[green]{label} terminée en {time.time() - start:.2f} secondes.[/green]")
+        files = [p for p in self._outputs(outputs, result) if file_exists(p)]
+        result_hash = joblib_hash((result, file_hash(*files) if files else None))
+        self.result_hashes[name] = result_hash
+        with tempfile.NamedTemporaryFile(dir=self.cache_dir, suffix=".tmp", delete=False) as f:
+            pickle.dump({"result": result, "result_hash": result_hash}, f)
+        os.replace(f.name, path)
+        for fn in os.listdir(self.cache_dir):
+            if fn.startswith(f"{name}-") and fn.endswith(".pkl") and fn != os.path.basename(path):
+                os.remove(os.path.join(self.cache_dir, fn))
+        return result
+
+    @staticmethod
+    def _outputs(outputs, result):
+        return list(outputs(result) if callable(outputs) else outputs)